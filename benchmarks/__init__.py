@@ -0,0 +1 @@
+"""Benchmarks for the Connect module. Run with python -m Connect.benchmarks.<name>"""
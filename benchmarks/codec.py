@@ -0,0 +1,77 @@
+"""
+Benchmark: JSON loads and dumps per codec backend, over typical payload sizes
+(one record, a page of 100 records, a page of 10k records).
+
+Reports MB/s per backend and the speedup over the stdlib json. Backends that aren't
+installed are skipped.
+
+    python -m Connect.benchmarks.codec --out bench_codec.json
+"""
+
+import json
+import time
+import argparse
+
+from .. import codec
+from ..buffers import json_default
+from .mock_server import make_records
+from .results import save_results, load_results, print_comparison
+
+MB = 1024 * 1024
+
+PAYLOADS = {
+    "record": 1,
+    "page": 100,
+    "bulk": 10000,
+}
+
+def timeit(fn, min_seconds: float) -> float:
+    """Seconds per call of fn, repeated for at least min_seconds."""
+    fn()
+    calls, start = 0, time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < min_seconds:
+        fn()
+        calls += 1
+    return elapsed / calls
+
+def measure(backend: str, records: list, min_seconds: float) -> dict:
+    c = codec.CODECS[backend]()
+    obj = {"data": records}
+    body = c.dumpb(obj, default=json_default)
+    assert c.loads(body) == json.loads(body)
+
+    mb = len(body) / MB
+    return {
+        "loads_mb_s": mb / timeit(lambda: c.loads(body), min_seconds),
+        "dumps_mb_s": mb / timeit(lambda: c.dumps(obj, default=json_default), min_seconds),
+        "dumpb_mb_s": mb / timeit(lambda: c.dumpb(obj, default=json_default), min_seconds),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payloads", nargs="+", default=list(PAYLOADS), choices=list(PAYLOADS))
+    parser.add_argument("--backends", nargs="+", default=list(codec.available_backends()), choices=list(codec.BACKENDS))
+    parser.add_argument("--seconds", type=float, default=0.5, help="minimum time per measurement")
+    parser.add_argument("--out", default="bench_codec.json")
+    parser.add_argument("--compare", default=None, help="previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    old = load_results(args.compare) if args.compare else None
+
+    results = {}
+    for payload in args.payloads:
+        records = make_records(PAYLOADS[payload])
+        results[payload] = {b: measure(b, records, args.seconds) for b in args.backends}
+
+        base = results[payload].get("json")
+        for b, r in results[payload].items():
+            if base is not None and b != "json":
+                r.update({f"{k[:-5]}_speedup": r[k] / base[k] for k in base})
+            print(f"{payload:<8}{b:<8}", {k: round(v, 2) for k, v in r.items()})
+
+    new = save_results(args.out, "codec", vars(args), results)
+    if old is not None:
+        print_comparison(old, new)
+
+if __name__ == "__main__":
+    main()
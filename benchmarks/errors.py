@@ -0,0 +1,89 @@
+"""
+Micro-benchmark: per-call overhead of the error handling layer on the happy path.
+Compares the current ErrorHandlingMeta / add_error with the previous implementation,
+which wrapped every method and wrapped decorated methods a second time.
+
+    python -m Connect.benchmarks.errors --number 200000 --out bench_errors.json
+"""
+
+import argparse
+import timeit
+from functools import wraps
+
+from ..errors import add_error, ErrorHandlingMeta, APIConnectorError
+from ..connection import Callables
+from .results import save_results
+
+def legacy_add_error(message, code):
+    """add_error as it was: no marker, so the metaclass wrapped decorated methods again."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                raise APIConnectorError(message, code, e) from e
+        return wrapper
+    return decorator
+
+class LegacyErrorHandlingMeta(type):
+    """ErrorHandlingMeta as it was: wraps every callable attribute."""
+    def __new__(cls, name, bases, attrs):
+        for attr_name, attr_value in attrs.items():
+            if callable(attr_value):
+                attrs[attr_name] = legacy_add_error(f"Error executing {attr_name}", 472)(attr_value)
+        return super().__new__(cls, name, bases, attrs)
+
+class Legacy(metaclass=LegacyErrorHandlingMeta):
+    def censor(self, value: str):
+        return value
+
+    @legacy_add_error("Error calling function", 472)
+    def _request(self, url=None):
+        return url
+
+    def _combine(self, base: str, end: str=""):
+        return base + end
+
+class Current(metaclass=ErrorHandlingMeta):
+    def censor(self, value: str):
+        return value
+
+    @add_error("Error calling function", 472)
+    def _request(self, url=None):
+        return url
+
+    def _combine(self, base: str, end: str=""):
+        return base + end
+
+def per_call_ns(stmt, number: int) -> float:
+    """Best-of-5 time per call, in nanoseconds."""
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200000)
+    parser.add_argument("--out", default="bench_errors.json")
+    args = parser.parse_args(argv)
+
+    legacy, current, callables = Legacy(), Current(), Callables()
+    results = {}
+    for method, call in (
+        ("censor", lambda o: o.censor("value")),
+        ("_request", lambda o: o._request(url="https://example.com")),
+        ("_combine", lambda o: o._combine("https://example.com/", "users")),
+    ):
+        results[method] = {
+            "legacy_ns": per_call_ns(lambda: call(legacy), args.number),
+            "current_ns": per_call_ns(lambda: call(current), args.number),
+        }
+        results[method]["speedup"] = results[method]["legacy_ns"] / results[method]["current_ns"]
+        print(f"{method:<10}", {k: round(v, 2) for k, v in results[method].items()})
+
+    # the real Callables.censor, which is no longer wrapped
+    results["Callables.censor_ns"] = per_call_ns(lambda: callables.censor("value"), args.number)
+
+    save_results(args.out, "errors", vars(args), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Import-time benchmark: cold-start cost of importing the connector in a fresh interpreter,
+and which heavy backends get imported along with it.
+
+    python -m Connect.benchmarks.imports --repeat 10 --out bench_imports.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+from .results import save_results
+
+# modules that should only be imported when they are used
+HEAVY_MODULES = ("requests", "supabase", "gotrue", "pydantic", "glom", "xmltodict")
+
+# package name of the connector (e.g. "Connect"), and the directory to import it from
+PACKAGE = __package__.rsplit(".", 1)[0]
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+duration = time.perf_counter() - start
+print(json.dumps({{"seconds": duration, "modules": len(sys.modules), "heavy": [m for m in {heavy} if m in sys.modules]}}))
+"""
+
+def probe(module: str) -> dict:
+    """Import module in a fresh interpreter. Returns seconds, module count and loaded heavy modules."""
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, check=True, cwd=PACKAGE_PARENT
+        ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--modules", nargs="+", default=["connection", "inference"])
+    parser.add_argument("--out", default="bench_imports.json")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.modules:
+        runs = [probe(f"{PACKAGE}.{name}") for _ in range(args.repeat)]
+        results[name] = {
+            "seconds": statistics.median(r["seconds"] for r in runs),
+            "modules": runs[-1]["modules"],
+            "heavy": runs[-1]["heavy"]
+        }
+        print(f"{name:<12}", results[name])
+
+    save_results(args.out, "imports", vars(args), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Local HTTP stand-in for the APIs we connect to.
+Serves JSON, XML, CSV, NDJSON and paginated endpoints with configurable latency and payload size,
+plus a minimal PostgREST-compatible endpoint so writeables can run without Supabase.
+
+Endpoints (n = number of records, defaults to MockAPIServer.records):
+    GET  /json?n=100
+    GET  /xml?n=100
+    GET  /csv?n=100
+    GET  /ndjson?n=100
+    GET  /paginated?page=1&pages=5&n=100
+    GET  /rest/v1/<table>
+    POST /rest/v1/<table>
+    POST <any other path>           echoes the body
+    PUT|PATCH|DELETE <any path>     returns the method and body size
+
+With compress, responses are gzipped for clients that accept it.
+"""
+
+import gzip
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# tld returned by the PostgREST stand-in for the "organization" table
+MOCK_TLD = "bench"
+
+def make_records(n: int) -> list:
+    """Return n deterministic records with nested values."""
+    return [
+        {
+            "id": i,
+            "name": f"item-{i}",
+            "price": i * 1.5,
+            "tags": ["a", "b"],
+            "meta": {
+                "created": "2024-01-01T00:00:00",
+                "active": i % 2 == 0
+            }
+        } for i in range(n)
+    ]
+
+def records_to_xml(records: list) -> str:
+    """Serialise flat records to xml."""
+    items = "".join(
+        "<item>" + "".join(
+            f"<{k}>{v}</{k}>" for k, v in record.items() if not isinstance(v, dict | list)
+        ) + "</item>"
+        for record in records
+    )
+    return f"<?xml version=\"1.0\"?><items>{items}</items>"
+
+def records_to_csv(records: list) -> str:
+    """Serialise flat records to csv."""
+    keys = [k for k, v in records[0].items() if not isinstance(v, dict | list)] if records else []
+    lines = [",".join(keys)] + [
+        ",".join(str(record[k]) for k in keys) for record in records
+    ]
+    return "\n".join(lines) + "\n"
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+    """Request handler. Configuration lives on the server object."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        """Silence default request logging."""
+
+    def send_body(self, body: str | bytes, content_type: str, status: int = 200):
+        """Send a response body after the configured latency."""
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+        if isinstance(body, str):
+            body = body.encode()
+
+        # gzip if enabled on the server and accepted by the client
+        encoding = None
+        if self.server.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=6)
+            encoding = "gzip"
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def read_body(self) -> bytes:
+        """Read the request body, if any (also with chunked transfer encoding)."""
+        if "chunked" in self.headers.get("Transfer-Encoding", ""):
+            chunks = []
+            while (size := int(self.rfile.readline().split(b";")[0], 16)) > 0:
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            self.rfile.readline()
+            return b"".join(chunks)
+
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        n = int(query.get("n", self.server.records))
+        self.server.count(url.path)
+
+        # some clients send a body with GET; drain it so keep-alive connections stay in sync
+        self.read_body()
+
+        match url.path.split("/")[1:]:
+            case ["json"]:
+                self.send_body(json.dumps({"data": make_records(n)}), "application/json")
+            case ["xml"]:
+                self.send_body(records_to_xml(make_records(n)), "application/xml")
+            case ["csv"]:
+                self.send_body(records_to_csv(make_records(n)), "text/csv")
+            case ["ndjson"]:
+                self.send_body("".join(json.dumps(r) + "\n" for r in make_records(n)), "application/x-ndjson")
+            case ["paginated"]:
+                page = int(query.get("page", 1))
+                pages = int(query.get("pages", 5))
+                next_url = (
+                    f"{self.server.url}/paginated?page={page + 1}&pages={pages}&n={n}"
+                    if page < pages else None
+                )
+                self.send_body(json.dumps({
+                    "page": page,
+                    "data": make_records(n),
+                    "next": next_url
+                    }), "application/json")
+            case ["rest", "v1", "organization"]:
+                body = {"tld": MOCK_TLD}
+                if "vnd.pgrst.object" not in self.headers.get("Accept", ""):
+                    body = [body]
+                self.send_body(json.dumps(body), "application/json")
+            case ["rest", "v1", table]:
+                self.send_body(json.dumps(self.server.tables.get(table, [])), "application/json")
+            case _:
+                self.send_body(json.dumps({"error": "not found"}), "application/json", 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self.server.count(url.path)
+        body = self.read_body()
+
+        match url.path.split("/")[1:]:
+            case ["rest", "v1", table]:
+                rows = json.loads(body or b"[]")
+                rows = rows if isinstance(rows, list) else [rows]
+                self.server.insert(table, rows)
+                self.send_body(json.dumps(rows), "application/json", 201)
+            case _:
+                # echo the body for non-PostgREST endpoints
+                self.send_body(body, self.headers.get("Content-Type", "application/octet-stream"))
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_ECHO(self):
+        """PUT, PATCH and DELETE echo the method and the size of the body."""
+        self.server.count(urlparse(self.path).path)
+        body = self.read_body()
+        self.send_body(json.dumps({"method": self.command, "bytes": len(body)}), "application/json")
+
+    do_PUT = do_PATCH = do_DELETE = do_ECHO
+
+class MockAPIServer(ThreadingHTTPServer):
+    """
+    Threaded local server. Use as a context manager:
+        with MockAPIServer(latency=0.01, records=1000) as server:
+            requests.get(server.url + "/json")
+    """
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, records: int = 100, host: str = "127.0.0.1", port: int = 0, compress: bool = False):
+        super().__init__((host, port), MockAPIHandler)
+        self.latency = latency
+        self.records = records
+        self.compress = compress
+        self.url = f"http://{host}:{self.server_address[1]}"
+
+        # PostgREST stand-in storage and request counters
+        self.tables = {}
+        self.hits = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def count(self, path: str):
+        """Count requests per path."""
+        with self.lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+
+    def insert(self, table: str, rows: list):
+        """Store rows posted to the PostgREST stand-in."""
+        with self.lock:
+            self.tables.setdefault(table, []).extend(rows)
+
+    def start(self):
+        """Serve in a background thread."""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,123 @@
+"""
+Benchmark: memory allocated and time spent parsing response bodies, per MB of payload.
+
+Compares the old text path (res.text, then parse_text) with Callables.parse_doctype, which
+parses the bytes as received. Bodies are served with the Content-Type of the mock server
+(no charset), so the text path sniffs the charset of xml bodies.
+
+    python -m Connect.benchmarks.parsing --mb 8 --out bench_parsing.json
+"""
+
+import io
+import json
+import time
+import argparse
+import tracemalloc
+import contextlib
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from .. import codec, parsing
+from ..connection import Callables
+from .mock_server import make_records, records_to_xml, records_to_csv
+from .results import save_results, load_results, print_comparison
+
+MB = 1024 * 1024
+
+DOCTYPES = {
+    "json": "application/json",
+    "xml": "application/xml",
+    "csv": "text/csv",
+}
+
+def make_body(kind: str, mb: float) -> bytes:
+    """A body of about mb megabytes."""
+    encode = {
+        "json": lambda records: json.dumps({"data": records}),
+        "xml": records_to_xml,
+        "csv": records_to_csv,
+    }[kind]
+    sample = len(encode(make_records(1000)).encode())
+    return encode(make_records(int(1000 * mb * MB / sample))).encode()
+
+def make_response(body: bytes, content_type: str) -> Response:
+    res = Response()
+    res._content = body
+    res.status_code = 200
+    res.headers = CaseInsensitiveDict({"Content-Type": content_type})
+    return res
+
+def parse_text(text: str, doctype: str) -> dict | list | str:
+    """The old text path: parse a decoded response body according to its doctype."""
+    match doctype:
+        case "application/xml":
+            return parsing.parse_xml(text)
+        case "application/json":
+            try: return codec.loads(text)
+            except ValueError: return text
+        case "application/x-ndjson":
+            try: return [codec.loads(line) for line in text.splitlines() if line.strip()]
+            except ValueError: return text
+        case "text/csv":
+            return parsing.parse_csv(text)
+        case "application/html":
+            # the xml parser also works for html (food for thought)
+            return parsing.parse_html(text)
+        case _:
+            return text
+
+def text_path(res: Response, doctype: str):
+    return parse_text(res.text, doctype)
+
+def bytes_path(res: Response, doctype: str):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Callables().parse_doctype(res, doctype)
+
+def measure(path, body: bytes, doctype: str) -> dict:
+    """
+    Allocations (with tracemalloc) and duration (without) of parsing body, per MB of body:
+    transient is allocated while parsing but freed afterwards (decoded copies, line lists),
+    retained is the parsed result.
+    """
+    res = make_response(body, doctype)
+    tracemalloc.start()
+    data = path(res, doctype)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+
+    start = time.perf_counter()
+    path(make_response(body, doctype), doctype)
+    seconds = time.perf_counter() - start
+
+    mb = len(body) / MB
+    return {
+        "transient_mb_per_mb": (peak - retained) / MB / mb,
+        "retained_mb_per_mb": retained / MB / mb,
+        "seconds_per_mb": seconds / mb
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=4, help="payload size per body")
+    parser.add_argument("--kinds", nargs="+", default=list(DOCTYPES), choices=list(DOCTYPES))
+    parser.add_argument("--out", default="bench_parsing.json")
+    parser.add_argument("--compare", default=None, help="previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    old = load_results(args.compare) if args.compare else None
+
+    results = {}
+    for kind in args.kinds:
+        body = make_body(kind, args.mb)
+        for name, path in (("text", text_path), ("bytes", bytes_path)):
+            results[f"{kind}_{name}"] = measure(path, body, DOCTYPES[kind])
+            print(f"{kind + '_' + name:<12}", {k: round(v, 4) for k, v in results[f"{kind}_{name}"].items()})
+
+    new = save_results(args.out, "parsing", vars(args), results)
+    if old is not None:
+        print_comparison(old, new)
+
+if __name__ == "__main__":
+    main()
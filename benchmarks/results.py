@@ -0,0 +1,62 @@
+"""Machine-readable benchmark results, so runs can be compared between commits."""
+
+import json
+import time
+import platform
+import subprocess
+
+def git_commit() -> str | None:
+    """Return the current git commit hash, if available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+            ).stdout.strip()
+    except Exception:
+        return None
+
+def save_results(path: str, benchmark: str, params: dict, results: dict) -> dict:
+    """Write results to path as json, along with commit and environment info."""
+    obj = {
+        "benchmark": benchmark,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": params,
+        "results": results
+    }
+    with open(path, "wt") as f:
+        json.dump(obj, f, indent=2)
+
+    print("Results written to:", path)
+    return obj
+
+def load_results(path: str) -> dict:
+    """Load results written by save_results."""
+    with open(path, "rt") as f:
+        return json.load(f)
+
+def flatten_results(results: dict, prefix: str = "") -> dict:
+    """Flatten nested results into {"a.b.c": number}."""
+    flat = {}
+    for k, v in results.items():
+        if isinstance(v, dict):
+            flat.update(flatten_results(v, prefix + k + "."))
+        elif isinstance(v, int | float) and not isinstance(v, bool):
+            flat[prefix + k] = v
+    return flat
+
+def compare_results(old: dict, new: dict) -> dict:
+    """Return {metric: new / old} for all numeric metrics present in both results."""
+    old_flat = flatten_results(old["results"])
+    new_flat = flatten_results(new["results"])
+    return {
+        k: new_flat[k] / old_flat[k]
+        for k in new_flat if k in old_flat and old_flat[k]
+    }
+
+def print_comparison(old: dict, new: dict):
+    """Print a comparison between two result files."""
+    print(f"Comparing {old.get('commit')} -> {new.get('commit')}")
+    for k, ratio in compare_results(old, new).items():
+        print(f"  {k:<50} x{ratio:.2f}")
@@ -0,0 +1,219 @@
+"""
+End-to-end benchmark: drives Connection.run against the local mock server and times each stage.
+
+    python -m Connect.benchmarks.run --records 1000 --latency 0.005 --out bench.json
+    python -m Connect.benchmarks.run --compare old.json --out new.json
+    python -m Connect.benchmarks.run --port 8765 --record traffic.log
+    python -m Connect.benchmarks.run --port 8765 --replay traffic.log
+    python -m Connect.benchmarks.run --scenarios repeated --parse-memo 64
+    python -m Connect.benchmarks.run --scenarios fanout --latency 0.02 --write-workers 8
+
+Stages:
+    planning        spec traversal, template unpacking, flattening (total minus the stages below)
+    requests        Callables._request, excluding parse_doctype
+    parse_doctype   parsing response bodies
+    locate_in_dict  extracting {variables} from response data
+    hypothesis      inference.Hypothesis over each response
+    writes          Writeables.toSupa_ through the PostgREST stand-in
+                    (the fanout scenario writes the response to --pages tables)
+
+Response bytes are reported on the wire and decoded (see --compress).
+"""
+
+import os
+import io
+import time
+import argparse
+import statistics
+import contextlib
+from types import SimpleNamespace
+from functools import wraps
+
+from ..connection import Connection
+from ..inference import Hypothesis
+from ..replay import RecordTransport, ReplayTransport
+from ..memo import get_parse_memo
+from .mock_server import MockAPIServer
+from .results import save_results, load_results, print_comparison
+
+SCENARIOS = ("json", "xml", "csv", "ndjson", "paginated", "repeated", "fanout")
+
+def make_spec(base: str, scenario: str, records: int, pages: int) -> dict:
+    """Return a connector spec that fetches the scenario endpoint and writes it to supabase."""
+
+    match scenario:
+        case "json":
+            urls = f"{base}/json?n={records}"
+            doctype = "application/json"
+            extract = [{"data": [{"name": "{names}"}]}]
+        case "xml":
+            urls = f"{base}/xml?n={records}"
+            doctype = "application/xml"
+            extract = [{"items": {"item": [{"name": "{names}"}]}}]
+        case "csv":
+            urls = f"{base}/csv?n={records}"
+            doctype = "text/csv"
+            extract = None
+        case "ndjson":
+            # the request asks for json, the response Content-Type decides
+            urls = f"{base}/ndjson?n={records}"
+            doctype = "application/json"
+            extract = None
+        case "paginated":
+            urls = [f"{base}/paginated?page={p}&pages={pages}&n={records}" for p in range(1, pages + 1)]
+            doctype = "application/json"
+            extract = [{"data": [{"name": "{names}"}]}]
+        case "repeated":
+            # different requests, identical xml bodies (see --parse-memo)
+            urls = [f"{base}/xml?n={records}&copy={p}" for p in range(1, pages + 1)]
+            doctype = "application/xml"
+            extract = [{"items": {"item": [{"name": "{names}"}]}}]
+        case "fanout":
+            # one response, written to many tables (see --write-workers)
+            urls = f"{base}/json?n={records}"
+            doctype = "application/json"
+            extract = None
+        case _:
+            raise ValueError(f"unknown scenario {scenario}")
+
+    spec = {
+        "_request": {
+            "url": urls,
+            "method": "GET",
+            "headers": {
+                "Content-Type": doctype
+            }
+        }
+    }
+    if extract is not None:
+        spec["extract"] = extract
+    spec["toSupa_"] = {
+        "data": "{_request}"
+    }
+    if scenario == "fanout":
+        spec["toSupa_"]["table"] = [f"bench_{p}" for p in range(1, pages + 1)]
+    return spec
+
+def timed(timings: dict, stage: str, func):
+    """Wrap func so that its (inclusive) duration is added to timings[stage].
+    Recursive calls are only counted once, at the outermost level.
+    """
+    depth = [0]
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        depth[0] += 1
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            depth[0] -= 1
+            if depth[0] == 0:
+                timings[stage] += time.perf_counter() - start
+    return wrapper
+
+def run_once(server: MockAPIServer, scenario: str, records: int, pages: int, transport=None, parse_memo=None, write_workers=None) -> dict:
+    """Run a scenario once. Returns durations per stage in seconds."""
+
+    timings = dict.fromkeys(("requests", "parse_doctype", "locate_in_dict", "writes"), 0.0)
+
+    c = Connection(
+        spec=make_spec(server.url, scenario, records, pages),
+        transport=transport,
+        parse_memo=parse_memo,
+        write_workers=write_workers,
+        decoded=SimpleNamespace(token="bench-token", sub="bench-user"),
+        metadata={"run_id": "bench-run", "connection_id": "bench-connection"}
+    )
+
+    # instance attributes shadow the class methods, so the traversal picks up the timed versions
+    c.functions._request = timed(timings, "requests", c.functions._request)
+    c.functions.parse_doctype = timed(timings, "parse_doctype", c.functions.parse_doctype)
+    c.locate_in_dict = timed(timings, "locate_in_dict", c.locate_in_dict)
+    c.writeables.toSupa_ = timed(timings, "writes", c.writeables.toSupa_)
+
+    start = time.perf_counter()
+    c.run()
+    total = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for payload in c.config._request:
+        Hypothesis(payload if isinstance(payload, dict) else {"data": payload})
+    timings["hypothesis"] = time.perf_counter() - start
+
+    # parse_doctype runs inside _request
+    timings["requests"] -= timings["parse_doctype"]
+    timings["planning"] = total - sum(
+        timings[k] for k in ("requests", "parse_doctype", "locate_in_dict", "writes")
+        )
+    timings["total"] = total
+
+    bandwidth = c.functions.bandwidth.stats()
+    timings["wire_bytes"] = bandwidth["wire_bytes"]
+    timings["decoded_bytes"] = bandwidth["decoded_bytes"]
+    return timings
+
+def run_scenario(server: MockAPIServer, scenario: str, records: int, pages: int, repeat: int, verbose: bool, transport=None, parse_memo=None, write_workers=None) -> dict:
+    """Run a scenario repeat times. Returns the median duration per stage."""
+
+    runs = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(None if verbose else io.StringIO()):
+            # a fresh memo per run, so repeats don't hit each other's results
+            runs.append(run_once(server, scenario, records, pages, transport, parse_memo and get_parse_memo(parse_memo), write_workers))
+
+    result = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+    result["records"] = records * (pages if scenario in ("paginated", "repeated") else 1)
+    result["records_per_sec"] = result["records"] / result["total"] if result["total"] else None
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1000, help="records per response")
+    parser.add_argument("--pages", type=int, default=5, help="pages for the paginated scenario")
+    parser.add_argument("--latency", type=float, default=0.0, help="server latency per response (s)")
+    parser.add_argument("--compress", action="store_true", help="gzip responses")
+    parser.add_argument("--port", type=int, default=0, help="mock server port (use the same port to replay)")
+    parser.add_argument("--record", default=None, help="append the HTTP traffic to this log")
+    parser.add_argument("--replay", default=None, help="replay HTTP traffic from this log instead of the server")
+    parser.add_argument("--replay-latency", action="store_true", help="replay with the recorded latency")
+    parser.add_argument("--parse-memo", type=float, default=None, help="memoize parsed responses (MB)")
+    parser.add_argument("--write-workers", type=int, default=None, help="threads for list-valued writeables")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", default=None, help="previous results file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show connector output")
+    args = parser.parse_args(argv)
+
+    # load before running, in case --out overwrites the same file
+    old = load_results(args.compare) if args.compare else None
+
+    transport = None
+    if args.record:
+        transport = RecordTransport(args.record)
+    elif args.replay:
+        transport = ReplayTransport(args.replay, latency=args.replay_latency)
+
+    with MockAPIServer(latency=args.latency, records=args.records, compress=args.compress, port=args.port) as server:
+
+        # point the supabase client at the PostgREST stand-in
+        os.environ["SUPABASE_URL"] = server.url
+        os.environ["SUPABASE_KEY"] = "bench.key.local"
+
+        results = {}
+        for scenario in args.scenarios:
+            results[scenario] = run_scenario(
+                server, scenario, args.records, args.pages, args.repeat, args.verbose, transport, args.parse_memo,
+                args.write_workers
+                )
+            print(f"{scenario:<10} total={results[scenario]['total']:.4f}s", {
+                k: round(v, 4) for k, v in results[scenario].items() if k != "total"
+                })
+
+    new = save_results(args.out, "run", vars(args), results)
+    if old is not None:
+        print_comparison(old, new)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Record buffers that spill to disk.
+
+RecordBuffer keeps the first limit bytes of records in memory, and appends the rest to an
+append-only spill file (length-prefixed pickle frames). It can be iterated multiple times,
+indexed, and passed to writeables wherever a list of records is accepted.
+
+    buffer = RecordBuffer(limit=64 * MB)
+    buffer.extend(records)
+    for record in buffer: ...
+"""
+
+import os
+import pickle
+import struct
+import weakref
+import tempfile
+from array import array
+
+from .helpers import locate_in_dict
+
+MB = 1024 * 1024
+
+# default in-memory size before spilling
+DEFAULT_BUFFER_LIMIT = 64 * MB
+
+# record sizes are estimated from a sample (every SAMPLE_EVERY-th record), pickling them all is expensive
+SAMPLE_EVERY = 64
+
+FRAME_HEADER = struct.Struct("<Q")
+
+def remove_spill_file(file, path):
+    """Close and remove a spill file."""
+    file.close()
+    if os.path.exists(path):
+        os.remove(path)
+
+class RecordBuffer():
+    """A list of records that keeps the first limit bytes in memory and spills the rest to disk."""
+
+    def __init__(self, records=None, limit: int = DEFAULT_BUFFER_LIMIT, spill_dir: str = None):
+        self.limit = limit
+        self.spill_dir = spill_dir
+        self.memory = []
+
+        # estimated size of the records in memory
+        self.size = 0
+        self.sampled_bytes = 0
+        self.sampled_records = 0
+
+        # spill file, created when the limit is exceeded
+        self.file = None
+        self.path = None
+        self.offsets = array("q")
+        self.end = 0
+        self.finalizer = None
+
+        if records is not None:
+            self.extend(records)
+
+    def estimate(self, record) -> int:
+        """Estimated size of a record, from a running sample."""
+        if self.sampled_records == 0 or len(self.memory) % SAMPLE_EVERY == 0:
+            self.sampled_bytes += len(pickle.dumps(record, pickle.HIGHEST_PROTOCOL))
+            self.sampled_records += 1
+        return self.sampled_bytes // self.sampled_records
+
+    def spill(self):
+        """Open the spill file."""
+        fd, self.path = tempfile.mkstemp(prefix="connect-", suffix=".spill", dir=self.spill_dir)
+        self.file = os.fdopen(fd, "w+b")
+        self.finalizer = weakref.finalize(self, remove_spill_file, self.file, self.path)
+
+    def write(self, record):
+        """Append a record to the spill file."""
+        frame = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+        self.offsets.append(self.end)
+        self.file.write(FRAME_HEADER.pack(len(frame)))
+        self.file.write(frame)
+        self.end += FRAME_HEADER.size + len(frame)
+
+    def append(self, record):
+        """Add a record."""
+        if self.file is None:
+            size = self.estimate(record)
+            if self.size + size <= self.limit:
+                self.memory.append(record)
+                self.size += size
+                return
+            self.spill()
+        self.write(record)
+
+    def extend(self, records):
+        """Add records from any iterable."""
+        for record in records:
+            self.append(record)
+        return self
+
+    def read(self, f, offset: int):
+        """Read the record at offset from an open spill file."""
+        f.seek(offset)
+        (length,) = FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))
+        return pickle.loads(f.read(length))
+
+    def __iter__(self):
+        yield from self.memory
+        if self.file is None:
+            return
+
+        self.file.flush()
+        count = len(self.offsets)
+        with open(self.path, "rb") as f:
+            for _ in range(count):
+                (length,) = FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))
+                yield pickle.loads(f.read(length))
+
+    def __len__(self) -> int:
+        return len(self.memory) + len(self.offsets)
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += len(self)
+        if index < len(self.memory):
+            return self.memory[index]
+        if not 0 <= index < len(self):
+            raise IndexError("RecordBuffer index out of range")
+
+        self.file.flush()
+        with open(self.path, "rb") as f:
+            return self.read(f, self.offsets[index - len(self.memory)])
+
+    def __repr__(self) -> str:
+        return (
+            f"RecordBuffer({len(self)} records, {len(self.memory)} in memory, "
+            f"{len(self.offsets)} spilled ({self.end / MB:.1f}MB))"
+        )
+
+    def extract(self, path: list) -> "RecordBuffer":
+        """locate_in_dict over every record (path without the leading list index), into a new buffer."""
+        extracted = RecordBuffer(limit=self.limit, spill_dir=self.spill_dir)
+        for record in self:
+            res = locate_in_dict(path, record)
+            if isinstance(res, list):
+                extracted.extend(res)
+            else:
+                extracted.append(res)
+        return extracted
+
+    def to_list(self) -> list:
+        """Load all records into memory."""
+        return list(self)
+
+    def close(self):
+        """Remove the spill file. The buffer can't be used afterwards."""
+        if self.finalizer is not None:
+            self.finalizer()
+        self.memory = []
+        self.offsets = array("q")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def json_default(o):
+    """json.dumps default that serialises RecordBuffers as lists."""
+    if isinstance(o, RecordBuffer):
+        return o.to_list()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+def json_preview(o):
+    """json.dumps default that shows RecordBuffers by their repr, for logging."""
+    if isinstance(o, RecordBuffer):
+        return repr(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
@@ -0,0 +1,155 @@
+"""
+JSON codec for the hot paths (parsing, snapshots, logging, sinks, request bodies).
+
+Uses orjson or ujson when installed, the stdlib json otherwise. Pick one explicitly with
+set_backend("json") or the CONNECT_JSON environment variable.
+
+    from . import codec
+    codec.loads(res.content)
+    codec.dumps(records, default=json_default)
+
+All backends give the same values back, but not byte-identical text: output is compact
+(no spaces after separators) and non-ascii characters aren't escaped. So don't use codec
+for anything that is hashed (spec hashes, fingerprints, session keys use json directly).
+Other differences are smoothed over:
+    - non-string keys (int, float, bool, None) become strings, like json.dumps
+    - datetimes and dataclasses go through default, like json.dumps
+    - input orjson/ujson reject but json accepts (NaN, big integers, a BOM) is parsed by json
+    - indents other than 2 are written by json
+    - NaN and +-Infinity are written as null (orjson does, json would write invalid JSON)
+"""
+
+import os
+import math
+import json
+import importlib.util
+
+BACKENDS = ("orjson", "ujson", "json")
+
+def finite(obj):
+    """obj with NaN and +-Infinity floats in dicts and lists replaced by None."""
+    match obj:
+        case float():
+            return obj if math.isfinite(obj) else None
+        case dict():
+            return {k: finite(v) for k, v in obj.items()}
+        case list() | tuple():
+            return [finite(v) for v in obj]
+        case _:
+            return obj
+
+class JSONCodec():
+    """The stdlib json."""
+    name = "json"
+
+    def loads(self, data: bytes | str):
+        return json.loads(data)
+
+    def dumps(self, obj, default=None, indent: int = None, sort_keys: bool = False) -> str:
+        options = dict(default=default, indent=indent, sort_keys=sort_keys, ensure_ascii=False, separators=None if indent else (",", ":"))
+        try:
+            return json.dumps(obj, allow_nan=False, **options)
+        except ValueError as e:
+            if "Out of range float" not in str(e):
+                raise
+            # rare, so only then do we walk obj
+            return json.dumps(finite(obj), **options)
+
+    def dumpb(self, obj, default=None, indent: int = None, sort_keys: bool = False) -> bytes:
+        return JSONCodec.dumps(self, obj, default, indent, sort_keys).encode()
+
+class OrjsonCodec(JSONCodec):
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+        self.options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def loads(self, data: bytes | str):
+        try:
+            return self.orjson.loads(data)
+        except self.orjson.JSONDecodeError:
+            return json.loads(data)
+
+    def dumpb(self, obj, default=None, indent: int = None, sort_keys: bool = False) -> bytes:
+        if indent not in (None, 2):
+            return super().dumpb(obj, default, indent, sort_keys)
+
+        options = self.options
+        if indent:
+            options |= self.orjson.OPT_INDENT_2
+        if sort_keys:
+            options |= self.orjson.OPT_SORT_KEYS
+        try:
+            return self.orjson.dumps(obj, default=default, option=options)
+        except self.orjson.JSONEncodeError:
+            # integers over 64 bits, or unsupported objects: json raises the same TypeError as usual
+            return super().dumpb(obj, default, indent, sort_keys)
+
+    def dumps(self, obj, default=None, indent: int = None, sort_keys: bool = False) -> str:
+        return self.dumpb(obj, default, indent, sort_keys).decode()
+
+class UjsonCodec(JSONCodec):
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+        self.ujson = ujson
+
+    def loads(self, data: bytes | str):
+        try:
+            return self.ujson.loads(data)
+        except ValueError:
+            return json.loads(data)
+
+    def dumps(self, obj, default=None, indent: int = None, sort_keys: bool = False) -> str:
+        if indent not in (None, 2):
+            return super().dumps(obj, default, indent, sort_keys)
+        try:
+            return self.ujson.dumps(
+                obj, default=default, indent=indent or 0, sort_keys=sort_keys,
+                ensure_ascii=False, escape_forward_slashes=False, reject_bytes=True, allow_nan=False
+                )
+        except OverflowError:
+            # NaN or +-Infinity: json writes them as null
+            return super().dumps(obj, default, indent, sort_keys)
+
+    def dumpb(self, obj, default=None, indent: int = None, sort_keys: bool = False) -> bytes:
+        return self.dumps(obj, default, indent, sort_keys).encode()
+
+CODECS = {"orjson": OrjsonCodec, "ujson": UjsonCodec, "json": JSONCodec}
+
+CODEC = None
+
+def available_backends() -> tuple:
+    """Backends that can be used here, fastest first."""
+    return tuple(b for b in BACKENDS if b == "json" or importlib.util.find_spec(b) is not None)
+
+def set_backend(name: str = None) -> JSONCodec:
+    """Use backend name, or the fastest available one (None)."""
+    global CODEC
+    name = name or os.environ.get("CONNECT_JSON") or available_backends()[0]
+    if name not in CODECS:
+        raise ValueError(f"JSON backend must be one of {BACKENDS}, got {name}")
+    CODEC = CODECS[name]()
+    return CODEC
+
+def get_codec() -> JSONCodec:
+    """The codec in use, selected on first use."""
+    return CODEC or set_backend()
+
+def backend() -> str:
+    return get_codec().name
+
+def loads(data: bytes | str):
+    """Parse JSON from bytes or str. Raises ValueError for invalid JSON."""
+    return get_codec().loads(data)
+
+def dumps(obj, default=None, indent: int = None, sort_keys: bool = False) -> str:
+    """Serialise obj to a JSON str. default is called for unsupported objects, like json.dumps."""
+    return get_codec().dumps(obj, default, indent, sort_keys)
+
+def dumpb(obj, default=None, indent: int = None, sort_keys: bool = False) -> bytes:
+    """Serialise obj to utf-8 JSON bytes (the fastest for files and request bodies)."""
+    return get_codec().dumpb(obj, default, indent, sort_keys)
@@ -0,0 +1,167 @@
+"""
+Typed column layouts, for writing records as rows instead of one json blob per response.
+
+The schema of a batch of records is inferred with inference.Hypothesis (dynamic keys collapsed)
+and turned into a glom spec with glom_spec_cascase_dynamic_keyname_downwards_return_list_recursive.
+The spec is flattened into columns: nested objects become <parent>__<child> columns, lists,
+dynamic-key objects and mixed types become jsonb.
+
+A ColumnLayout maps records to rows with getters compiled from the column paths (no glom
+at write time). Layouts are cached by the fingerprint of their columns, so they are only
+compiled once per distinct schema.
+
+    layout = infer_layout(records)
+    print(layout.ddl("__acme_contacts"))
+    rows = layout.rows(records, run_id=run_id)
+"""
+
+import json
+import hashlib
+import threading
+from types import NoneType, UnionType
+from typing import get_args, TYPE_CHECKING
+from dataclasses import dataclass
+if TYPE_CHECKING:
+    from .schemas import SchemaRegistry
+
+SQL_TYPES = {
+    bool: "boolean",
+    int: "bigint",
+    float: "double precision",
+    str: "text",
+}
+JSONB = "jsonb"
+
+# nested column names are joined with this
+SEPARATOR = "__"
+
+def sql_type(t) -> str:
+    """Postgres type for a type inferred by Hypothesis. Anything not scalar is jsonb."""
+    if isinstance(t, UnionType):
+        args = set(get_args(t)) - {NoneType}
+        if args == {int, float}:
+            return SQL_TYPES[float]
+        if len(args) == 1:
+            return sql_type(args.pop())
+        return JSONB
+    return SQL_TYPES.get(t, JSONB) if isinstance(t, type) else JSONB
+
+@dataclass(frozen=True)
+class Column():
+    """A column, the path to its value in a record and its postgres type."""
+    name: str
+    path: tuple
+    type: str
+
+def flatten_spec(spec, prefix: tuple = ()) -> list[Column]:
+    """Flatten a (cascaded) schema spec into columns."""
+    if not isinstance(spec, dict):
+        # the whole record has dynamic keys
+        return [Column(SEPARATOR.join(prefix) or "data", prefix, JSONB)]
+
+    columns = []
+    for key, value in spec.items():
+        path = prefix + (key,)
+        if isinstance(value, dict) and value:
+            columns.extend(flatten_spec(value, path))
+        else:
+            columns.append(Column(SEPARATOR.join(path), path, sql_type(value)))
+    return columns
+
+def project(record: dict) -> dict:
+    """
+    Replace list values by their type, so Hypothesis doesn't infer them (they're jsonb anyway).
+    Nulls are left out, every column is nullable.
+    """
+    return {
+        k: project(v) if isinstance(v, dict) else list if isinstance(v, list) else v
+        for k, v in record.items() if v is not None
+    }
+
+def compile_path(path: tuple):
+    """Compile Coalesce(Path(*path), default=None) into a plain getter."""
+    if len(path) == 1:
+        key = path[0]
+        return lambda record: record.get(key)
+
+    def get(record):
+        for key in path:
+            if not isinstance(record, dict):
+                return None
+            record = record.get(key)
+        return record
+    return get
+
+def fingerprint(columns: list[Column]) -> str:
+    """Order-independent hash of the columns."""
+    key = json.dumps(sorted((c.name, c.type) for c in columns))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+class ColumnLayout():
+    """Flat, typed columns and the getters that map records to rows."""
+
+    def __init__(self, columns: list[Column]):
+        self.columns = columns
+        self.fingerprint = fingerprint(columns)
+
+        # the column paths compiled to getters; missing or null parents give None.
+        # Interpreting the equivalent glom spec ({name: Coalesce(Path(*path), default=None)})
+        # costs ~100us per record for a few columns.
+        self.compiled = [(c.name, compile_path(c.path)) for c in columns]
+
+    def __repr__(self) -> str:
+        return f"ColumnLayout({len(self.columns)} columns, {self.fingerprint[:8]})"
+
+    def row(self, record: dict) -> dict:
+        """Map a record to a row."""
+        return {name: get(record) for name, get in self.compiled}
+
+    def rows(self, records, **extra) -> list[dict]:
+        """Map records to rows. extra is added to every row."""
+        compiled = self.compiled
+        return [{**{name: get(record) for name, get in compiled}, **extra} for record in records]
+
+    def ddl(self, table: str, schema: str = "etl", extra: dict = None) -> str:
+        """CREATE TABLE statement for this layout. extra maps additional column names to types."""
+        columns = {**(extra or {}), **{c.name: c.type for c in self.columns}}
+        body = ",\n".join(f'    "{name}" {type}' for name, type in columns.items())
+        return f'CREATE TABLE IF NOT EXISTS "{schema}"."{table}" (\n{body}\n);'
+
+# layouts by fingerprint
+LAYOUTS = {}
+LAYOUTS_LOCK = threading.Lock()
+
+def get_layout(columns: list[Column]) -> ColumnLayout:
+    """Return the cached layout for these columns, building it on first use."""
+    key = fingerprint(columns)
+    with LAYOUTS_LOCK:
+        if key not in LAYOUTS:
+            LAYOUTS[key] = ColumnLayout(columns)
+        return LAYOUTS[key]
+
+def infer_columns(records) -> list[Column]:
+    """Infer the columns of records."""
+    from .inference import Hypothesis, glom_spec_cascase_dynamic_keyname_downwards_return_list_recursive
+
+    hypothesis = Hypothesis()
+    for record in records:
+        hypothesis.update(project(record))
+    hypothesis.collapse_nested_dicts()
+
+    spec = glom_spec_cascase_dynamic_keyname_downwards_return_list_recursive(hypothesis.current.structure)
+    return flatten_spec(spec)
+
+def infer_layout(records, key=None, registry: "SchemaRegistry" = None) -> ColumnLayout:
+    """
+    Infer the column layout of records. With a key, the columns are looked up in registry
+    (schemas.SCHEMAS by default) and only re-inferred when the shape of the records changed.
+    Every record is fingerprinted, not a sample: a cached layout is only reused for records
+    with exactly its keys and types, so no key is dropped and no value sent to a wrong type.
+    """
+    if key is None:
+        return get_layout(infer_columns(records))
+
+    if registry is None:
+        from .schemas import SCHEMAS as registry
+    records = records if isinstance(records, list) else list(records)
+    return get_layout(registry.schema(("columns", *key), records, infer=infer_columns, sample_size=max(1, len(records))))
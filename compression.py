@@ -0,0 +1,84 @@
+"""
+Response compression and bandwidth accounting.
+
+_request advertises every content encoding that urllib3 can decode in this environment
+(gzip and deflate always, br with brotli or brotlicffi, zstd with zstandard). urllib3 decodes
+bodies chunk by chunk while they are read, so compressed bodies are never held twice.
+
+Bandwidth counts the bytes received on the wire (compressed) and after decoding, per run:
+
+    c = Connection(spec=spec)
+    c.run()
+    print(c.functions.bandwidth.stats())
+"""
+
+import threading
+import importlib.util
+from functools import cache
+
+# encoding -> modules that urllib3 can use to decode it (any of them)
+OPTIONAL_ENCODINGS = {
+    "br": ("brotli", "brotlicffi"),
+    "zstd": ("zstandard",),
+}
+
+@cache
+def available_encodings() -> tuple:
+    """Content encodings that can be decoded here, best first."""
+    optional = [
+        encoding for encoding, modules in OPTIONAL_ENCODINGS.items()
+        if any(importlib.util.find_spec(module) is not None for module in modules)
+    ]
+    return tuple(sorted(optional, key=["zstd", "br"].index)) + ("gzip", "deflate")
+
+@cache
+def accept_encoding() -> str:
+    """Accept-Encoding header value."""
+    return ", ".join(available_encodings())
+
+def wire_bytes(res: "Response") -> int:
+    """Bytes of res received on the wire. Falls back to the decoded size without urllib3."""
+    try:
+        return res.raw.tell()
+    except AttributeError:
+        return len(res.content)
+
+class Bandwidth():
+    """Wire vs decoded byte counters."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self.encodings = {}
+
+    def add(self, wire: int, decoded: int, encoding: str = None):
+        """Count a response."""
+        encoding = encoding or "identity"
+        with self.lock:
+            self.requests += 1
+            self.wire_bytes += wire
+            self.decoded_bytes += decoded
+            counts = self.encodings.setdefault(encoding, {"requests": 0, "wire_bytes": 0, "decoded_bytes": 0})
+            counts["requests"] += 1
+            counts["wire_bytes"] += wire
+            counts["decoded_bytes"] += decoded
+
+    def add_response(self, res: "Response") -> tuple[int, int]:
+        """Count res. Returns (wire, decoded) bytes."""
+        decoded = len(res.content)
+        wire = wire_bytes(res)
+        self.add(wire, decoded, res.headers.get("Content-Encoding"))
+        return wire, decoded
+
+    def stats(self) -> dict:
+        """Totals, the compression ratio (decoded / wire) and totals per content encoding."""
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "wire_bytes": self.wire_bytes,
+                "decoded_bytes": self.decoded_bytes,
+                "ratio": self.decoded_bytes / self.wire_bytes if self.wire_bytes else None,
+                "encodings": {k: dict(v) for k, v in self.encodings.items()}
+            }
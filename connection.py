@@ -1,28 +1,43 @@
 # system
 # import uuid
 import os
-import inspect
-import json
 import time
 import getpass
+import threading
+from collections import deque
+from contextlib import ExitStack
 
 # data
 import hashlib
 
-# requests
-import requests
-from requests import Response, Session
+# requests (imported on first use, see Callables.new_session)
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from requests import Response, Session
+    from requests.adapters import HTTPAdapter
+    from supabase import Client
 
 # custom
-from . import regex, parsing
-from .errors import add_error, ErrorHandlingMeta
-from .helpers import flatten_dict, date_format
-from .inference import Hypothesis
-
-# supabase-py
-from gotrue import SyncMemoryStorage
-from supabase import create_client, Client
-from supabase.lib.client_options import ClientOptions, DEFAULT_HEADERS
+from . import regex, parsing, codec
+from .errors import add_error, ErrorHandlingMeta, APIConnectorError, PartialWriteError, PARSE_ERROR
+from .helpers import flatten_dict, date_format, locate_in_dict, confine
+from .memo import get_memo, get_parse_memo, call_key, ParseMemo, MISSING
+from .instrumentation import RECORDER, count_records
+from .registry import Registry, is_callable_key, is_writeable_key, function_args
+from .sessions import SessionPool
+from .sharding import ParsePool, DeferredParsing, get_parse_pool, resolve
+from .buffers import RecordBuffer, json_default, MB
+from .sinks import Sink, NDJSONSink, CSVSink, ParquetSink, iter_records
+from .columns import infer_layout
+from .transform import compile_spec, transform_batches
+from .compression import Bandwidth, accept_encoding
+from .uploads import request_body, join_results, RECORD_ARGUMENTS
+from .preview import preview
+from .snapshots import SNAPSHOT_WRITER, Pending
+from .writers import WriteExecutor, get_write_executor, split_write_options
+
+# supabase-py, gotrue and inference (pydantic, glom) are heavy, and most runs never use them.
+# They are imported on first use, to keep cold starts of short-lived workers fast.
 # from storage3.types import CreateOrUpdateBucketOptions
 
 # TODO: improve parse_doctype to handle more doctypes more cleanly.
@@ -30,6 +45,19 @@ from supabase.lib.client_options import ClientOptions, DEFAULT_HEADERS
 # Default file size limit = 26MB
 DEFAULT_FILE_SIZE_LIMIT = 26000000
 
+HTTP_METHODS = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE")
+
+def binds_whole(name: str, argument: str) -> bool:
+    """
+    Whether a list bound to argument of callable name is one value instead of fanning out:
+    the record bodies of _request (json, ndjson) send all records in a single request, and
+    _transform gets all records in one call, which transforms them in batches.
+    """
+    return (
+        (name == "_request" and argument in RECORD_ARGUMENTS) or
+        (name == "_transform" and argument == "records")
+    )
+
 # TODO: implement caching strategy when referencing data in config.
 # Right now, we're just unpacking a list and returning it itself.
 # This could introduce bugs if the data contains the {var} syntax. (??)
@@ -40,13 +68,17 @@ DEFAULT_FILE_SIZE_LIMIT = 26000000
 class AnyClient():
     """Client class for any supabase client. Inherits from supabase.Client."""
     def __init__(self, token: str=None, schema: str=None, key: str=None):
+        from gotrue import SyncMemoryStorage
+        from supabase import create_client
+        from supabase.lib.client_options import ClientOptions, DEFAULT_HEADERS
+
         self.url: str = self.get_supabase_url()
         self.key: str = key or self.get_supabase_anon_key()
         
         if token is not None:
             DEFAULT_HEADERS["Authorization"] = f"Bearer {token}"
         
-        self.client: Client = create_client(
+        self.client: "Client" = create_client(
             self.url,
             self.key,
             ClientOptions(
@@ -103,9 +135,39 @@ class Callables(metaclass=ErrorHandlingMeta):
         self.decoded = getattr(self.config, "decoded", None)
         self.metadata = getattr(self.config, "metadata", None)
 
+        # in-memory memo shared by DataOBJ's. Set by Connection.run
+        self.memo = None
+
+        # optional SessionPool shared between runs, and the tenant whose sessions we use. Set by Connection
+        self.sessions = None
+        self.tenant = None
+
+        # optional requests transport adapter for all sessions (see replay). Set by Connection
+        self.transport = None
+
+        # directory that files and upload of _request are read from; None disables them. Set by Connection
+        self.upload_dir = None
+
+        # wire vs decoded bytes of responses, reset by Connection.run
+        self.bandwidth = Bandwidth()
+
+        # optional memo of parsed responses by body hash (see memo.ParseMemo). Set by Connection
+        self.parse_memo = None
+
+        # optional ParsePool. While self.deferred is active, parse_doctype returns Futures.
+        self.parse_pool = None
+        self.deferred = DeferredParsing()
+
+        # cache snapshots of this connection still being written (see snapshots)
+        self.snapshots = Pending()
+
     def caller(self, func, **kwargs):
         """Flatten kwargs and call func on each instance. Return aggregate"""
         q = []
+        kwargs = {
+            k: [join_results(v)] if binds_whole(func.__name__, k) and isinstance(v, list | RecordBuffer) else v
+            for k, v in kwargs.items()
+            }
         for p in flatten_dict(**kwargs):
             q.append(func(**p))
 
@@ -114,6 +176,15 @@ class Callables(metaclass=ErrorHandlingMeta):
     def censor(self, value: str):
         """Censor data in self.data"""
 
+        res = self.redact(value)
+        if res != value:
+            return res
+
+        return value[:100] + " ... " if len(value) > 100 else value
+
+    def redact(self, value: str):
+        """Replace the configured key and password in value with <hidden>."""
+
         if hasattr(self.config, "key"):
             res = regex.censor(value, str(self.config.key))
             if res != value:
@@ -124,30 +195,55 @@ class Callables(metaclass=ErrorHandlingMeta):
             if res != value:
                 return res
 
-        return value[:100] + " ... " if len(value) > 100 else value
+        return value
 
-    @add_error("Unable to parse response (hint: change the Content-Type)", 472)
-    def parse_doctype(self, res: Response, doctype: str) -> dict | str:
-        """Parse a doctype from a string"""
-        
+    @add_error(PARSE_ERROR, 472)
+    def parse_doctype(self, res: "Response", doctype: str = None) -> dict | list | str:
+        """
+        Parse a response. Its doctype is detected from the response Content-Type and the first
+        bytes of the body (see parsing.detect_doctype); doctype (the Content-Type of the request)
+        is used when neither tells.
+        """
+        doctype = parsing.detect_doctype(res.headers.get("Content-Type"), res.content, doctype)
         print("Parsing doctype:", doctype)
         if self.debug: print("Response:", res.text[:100])
-        
-        match doctype:
-            case "application/xml":
-                return parsing.parse_xml(res.text)
-            case "application/json":
-                try: return res.json()
-                except: return res.text
-
-            case "text/csv":
-                return parsing.parse_csv(res.text)
-            
-            case "application/html":
-                # the xml parser also works for html (food for thought)
-                return parsing.parse_html(res.text)
-            case _:
-                return res.text
+
+        # the body is parsed as received. json and xml parsers take bytes, so only a declared charset
+        # is passed on. Text is decoded like res.text, sniffing the charset (slow on big bodies) only
+        # when the response doesn't declare one.
+        if parsing.needs_charset(doctype):
+            encoding = res.encoding
+        else:
+            encoding = parsing.declared_charset(res.headers.get("Content-Type"))
+
+        # identical bodies are parsed once. A sniffed charset only depends on the body, so the declared one keys it
+        memo = self.parse_memo
+        if memo is not None:
+            key = memo.key(res.content, doctype, encoding)
+            data = memo.get(key)
+            if data is not MISSING:
+                return data
+
+        if parsing.needs_charset(doctype) and not encoding:
+            encoding = res.apparent_encoding
+
+        if self.parse_pool is not None and self.deferred.active:
+            future = self.parse_pool.submit(res.content, doctype, encoding)
+            if memo is not None:
+                size = len(res.content)
+                future.add_done_callback(lambda f: f.exception() or memo.put(key, f.result(), size))
+            return future
+
+        start = time.perf_counter() if RECORDER.enabled else None
+
+        data = parsing.parse_bytes(res.content, doctype, encoding)
+
+        if start is not None:
+            RECORDER.emit("parse", doctype, start, bytes=len(res.content), records=count_records(data))
+
+        if memo is not None:
+            memo.put(key, data, len(res.content))
+        return data
 
     @add_error("Error calling function", 472)
     def _request(self,
@@ -156,15 +252,24 @@ class Callables(metaclass=ErrorHandlingMeta):
             data=None,
             method=None,
             auth=None,
-            session: Session=None,
+            session: "Session"=None,
             sleep=0,
             debug=False,
+            json=None,
+            ndjson=None,
+            files: dict=None,
+            upload: str=None,
             ) -> dict | str | list:
         """send a request with the specified parameters
-        (TODO) Currently only GET and POST are implemented.
+        Methods: GET, HEAD, POST, PUT, PATCH and DELETE. HEAD returns the response headers.
+        The body is data (form fields or raw), json, ndjson (records), files ({field: path},
+        multipart) or upload (path of a raw file, under upload_dir). Record streams and files
+        are streamed, see uploads.request_body.
         """
 
         print("Requesting:", url)
+        start = time.perf_counter() if RECORDER.enabled else None
+
         try:
             auth = (auth["user"], auth["password"]) if auth is not None else None
         except Exception as e:
@@ -195,28 +300,25 @@ class Callables(metaclass=ErrorHandlingMeta):
         if sleep > 0:
             time.sleep(sleep)
 
-        if method == "GET":
-            print("GET request")
-            try:
-                res = session.get(url)
-            except Exception as e:                
-                raise e
-        
-            if res is None:
-                print("No response from server")
-            else:
-                print("Response:")
-                print(type(res))
-        elif method == "PUT":
-            print("PUT request")
-            res = session.put(url, data=data)
-        
-        elif method == "POST":
-            print("POST request")
-            res = session.post(url, data=data)
-        else:
+        # ask for compressed responses, unless the spec sets its own Accept-Encoding
+        compress = {} if "Accept-Encoding" in headers else {"Accept-Encoding": accept_encoding()}
+
+        if method not in HTTP_METHODS:
             raise ValueError(f"{method} needs implementation")
 
+        print(method, "request")
+        with ExitStack() as stack:
+            body = request_body(stack, data=data, json=json, ndjson=ndjson, files=files, upload=upload, upload_dir=self.upload_dir)
+            stack.enter_context(RECORDER.active("request"))
+            res = session.request(
+                method, url,
+                headers={**compress, **body.pop("headers", {})},
+                **body
+                )
+
+        if res is None:
+            print("No response from server")
+
         if debug:
             print(
                 "\n Response Headers: \n",
@@ -224,19 +326,61 @@ class Callables(metaclass=ErrorHandlingMeta):
                 )
             with open("./debug.html", "wt") as f:
                 f.write(res.text)
+
+        wire, decoded = self.bandwidth.add_response(res)
+        print(f"Received: {decoded} bytes ({wire} on the wire, {res.headers.get('Content-Encoding', 'identity')})")
+
+        if start is not None:
+            RECORDER.emit(
+                "request", "_request", start,
+                bytes=decoded, wire_bytes=wire, detail=f"{method} {self.censor(str(url))}"
+                )
         
-        return self.parse_doctype(res, headers["Content-Type"])
+        if method == "HEAD":
+            return dict(res.headers)
+
+        return self.parse_doctype(res, headers.get("Content-Type"))
 
-    # def _transform(self, data: list, spec: dict) -> dict | str | list:
-    #     """Transform data according to a glom spec"""
-    #     return parsing.transform(data, spec)
+    def _transform(self, records: object, spec: dict | str, batch_size: int = 1000) -> dict | list | RecordBuffer:
+        """
+        Transform records according to a glom spec (compiled once, see transform.compile_spec).
+        records is bound whole (see binds_whole): a list is transformed record by record, in
+        batches; a RecordBuffer too, into a new RecordBuffer, without loading it into memory.
+        Anything else is one record.
+        """
+        start = time.perf_counter() if RECORDER.enabled else None
+
+        match records:
+            case RecordBuffer():
+                res = RecordBuffer(limit=records.limit, spill_dir=records.spill_dir)
+                for batch in transform_batches(records, spec, batch_size):
+                    res.extend(batch)
+            case list():
+                res = []
+                for batch in transform_batches(records, spec, batch_size):
+                    res.extend(batch)
+            case _:
+                res = compile_spec(spec)(records)
+
+        if start is not None:
+            RECORDER.emit("transform", "_transform", start, records=count_records(res))
+        return res
     
     def new_session(self, auth, headers):
-        """Create a new session"""
+        """Create a new session, or reuse one from the shared session pool"""
+        import requests
 
-        s = requests.Session()
-        s.auth = auth
-        s.headers.update(headers)
+        if self.sessions is not None and self.transport is None:
+            s = self.sessions.get(auth, headers, self.tenant)
+        else:
+            s = requests.Session()
+            s.auth = auth
+            s.headers.update(headers)
+
+            # e.g. replay.RecordTransport or replay.ReplayTransport
+            if self.transport is not None:
+                s.mount("http://", self.transport)
+                s.mount("https://", self.transport)
 
         setattr(self.config, "session", s)
         return s
@@ -312,10 +456,83 @@ class Writeables(metaclass=ErrorHandlingMeta):
         self.decoded = getattr(self.config, "decoded", None)
         self.metadata = getattr(self.config, "metadata", None)
 
-    def toSupa_(self, data: object) -> None:
+        # local sinks by path, open until the end of the run (see close_sinks), and how they were opened
+        self.sinks = {}
+        self.sink_options = {}
+
+        # directory that local sinks write to (None disables them), and the toPostgres_
+        # connection string (None: $DATABASE_URL). Set by Connection, never by the spec.
+        self.output_dir = None
+        self.dsn = None
+        self.lock = threading.Lock()
+
+    def sink(self, cls: type[Sink], path: str, **kwargs) -> Sink:
+        """
+        Return the open sink for path, opening it on first use in this run.
+        Raises if path is already open with another sink or other options.
+        """
+        # writeables may run in parallel (see writers), each sink is only opened once
+        with self.lock:
+            if path not in self.sinks:
+                self.sinks[path] = cls(path, **kwargs)
+                self.sink_options[path] = (cls, kwargs)
+            elif self.sink_options[path] != (cls, kwargs):
+                opened, options = self.sink_options[path]
+                raise ValueError(f"{path} is already open as {opened.__name__} with {options} in this run")
+            return self.sinks[path]
+
+    def close_sinks(self):
+        """Flush and close all local sinks."""
+        for sink in self.sinks.values():
+            sink.close()
+        self.sinks = {}
+        self.sink_options = {}
+
+    def toNDJSON_(self, data: object, path: str, gzip: bool = False) -> dict:
+        """Write records to a newline-delimited json file, gzipped if gzip is set. The file is truncated on first use in a run."""
+        path = confine(path, self.output_dir, "output_dir")
+        sink = self.sink(NDJSONSink, path, gzip=gzip)
+        return {"path": path, "rows": sink.write(iter_records(data))}
+
+    def toCSV_(self, data: object, path: str, columns: list = None) -> dict:
+        """Write records to a CSV file. Nested values are written as json. The file is truncated on first use in a run."""
+        path = confine(path, self.output_dir, "output_dir")
+        sink = self.sink(CSVSink, path, columns=columns)
+        return {"path": path, "rows": sink.write(iter_records(data))}
+
+    def toParquet_(self, data: object, path: str) -> dict:
+        """Write records to a Parquet file, with a schema inferred from the first batch. Needs pyarrow. The file is truncated on first use in a run."""
+        path = confine(path, self.output_dir, "output_dir")
+        sink = self.sink(ParquetSink, path)
+        return {"path": path, "rows": sink.write(iter_records(data))}
+
+    def toPostgres_(
+            self,
+            data: object,
+            table: str,
+            key: str | list = None,
+            format: str = "csv",
+            batch_size: int = 10000
+            ) -> dict:
+        """
+        Bulk load records into a Postgres table with COPY (format "csv" or "binary"), batch_size
+        rows at a time. With key, batches go through a staging table and are upserted on key.
+        The database is Connection(dsn=...), or $DATABASE_URL; a spec can't choose it.
+        Needs psycopg. See postgres.PostgresSink.
+        """
+        from .postgres import PostgresSink
+
+        sink = self.sink(PostgresSink, table, dsn=self.dsn, key=key, format=format, batch_size=batch_size)
+        return {"table": table, "rows": sink.write(iter_records(data))}
+
+    def toSupa_(self, data: object, table: str = None, batch_size: int = 1000) -> None:
         """
         Upsert data to supabase table. You need a supabase session cookie. 
         Let me know if you have any trouble here, I can help.
+
+        By default the data is stored as one json blob in __<tld>.data. With table, records are
+        written as typed rows to __<tld>_<table>, in batches of batch_size. Its columns are
+        inferred from the records (see columns.ColumnLayout.ddl for the CREATE TABLE statement).
         """
 
         # TODO: add hypothesis object to request metadata in metadata table.
@@ -327,24 +544,53 @@ class Writeables(metaclass=ErrorHandlingMeta):
 
         client = AnyClient(self.decoded.token, schema="etl").client
         user_tld = client.from_("organization").select("tld").single().execute().data["tld"]
+
+        if table is not None:
+            return self.toSupaRows(client, f"__{user_tld}_{table}", data, batch_size)
+
         res = client.from_(f"__{user_tld}").insert({
             "user_id": self.decoded.sub or None,
             "run_id": self.metadata["run_id"] or None,
-            "data": json.dumps(data)
+            "data": codec.dumps(data, default=json_default)
             }, returning="representation").execute()
         
         return res
+
+    def toSupaRows(self, client: "Client", table: str, data: object, batch_size: int) -> dict:
+        """Insert records as typed rows, in bulk."""
+        records = list(iter_records(data))
+        if not records:
+            return {"table": table, "rows": 0}
+
+        # columns are only re-inferred when the shape of this connection's records changes
+        layout = infer_layout(records, key=(self.metadata.get("connection_id"), table))
+        rows = layout.rows(
+            records,
+            user_id=self.decoded.sub or None,
+            run_id=self.metadata["run_id"] or None
+            )
+        for i in range(0, len(rows), batch_size):
+            client.from_(table).insert(rows[i:i + batch_size], returning="minimal").execute()
+
+        return {"table": table, "rows": len(rows), "layout": layout.fingerprint}
     
     @add_error(f"Error calling function {__name__}", 472)
     def caller(self, func, **kwargs):
         """Flatten kwargs and call func on each instance. Return aggregate"""
-        return func(**kwargs)
+        start = time.perf_counter() if RECORDER.enabled else None
+
+        res = func(**kwargs)
+
+        if start is not None:
+            RECORDER.emit("write", func.__name__, start, records=count_records(kwargs.get("data")))
+        return res
 
 class DataOBJ():
     """Data Object.
     -> Used for logging raw response data
     """
-    def __init__(self, data=None, func=None, callables_obj: Callables=None, **kwargs):
+    def __init__(self, data=None, /, func=None, callables_obj: Callables=None, **kwargs):
+        # data is positional-only, so a data argument of func (e.g. _request) stays in kwargs
         self.data = data
         self.func = func
         self.kwargs = kwargs
@@ -352,11 +598,26 @@ class DataOBJ():
         if func is not None and callables_obj is not None:
             self.censor = callables_obj.censor
             self.config = callables_obj.config
-            self.path = "./response_cache/" + self.to_file_path()
+            self.snapshots = callables_obj.snapshots
+            self.key = self.to_file_path()
+            self.path = "./response_cache/" + self.key
+
+            if RECORDER.enabled:
+                start = time.perf_counter()
+                exists = self.path_exists()
+                RECORDER.emit("cache", "disk", start, cache="disk_hit" if exists else "disk_miss", detail=self.key)
 
             if self.path_exists():
                 print("reading cache stored at:", self.path, "\n")
                 self.data = callables_obj._fromFile(self.path)
+            elif callables_obj.memo is not None and (memo_key := self.memo_key(func.__name__, kwargs)) is not None:
+                print("[FUNCTION]", func.__name__, "(memoized)")
+
+                # identical (func, kwargs) combinations are only called once.
+                self.data = callables_obj.memo.get_or_call(
+                    memo_key,
+                    lambda: callables_obj.caller(func, **kwargs)
+                    )
             else:
                 print("[FUNCTION]", func.__name__)
 
@@ -374,14 +635,14 @@ class DataOBJ():
 
     def data_truncated(self):
         """Return a truncated string representation of the data object."""
-        lines = json.dumps(self.data, indent=2).split('\n')
+        # only the first and last few items are rendered, see preview
+        lines = preview(self.data).split('\n')
         res = '\n'.join(lines[:10]) + "\n...\n" + '\n'.join(lines[-10:]) if len(lines) > 20 else '\n'.join(lines)
         return res 
 
     def save_snapshot(self, path):
-        """Save a snapshot of the data object to a file."""
-        with open(path, "wt") as f:
-            json.dump(self.data, f)
+        """Save a snapshot of the data object to a file. Serialised and written in the background (see snapshots)."""
+        SNAPSHOT_WRITER.submit(path, self.data, self.snapshots)
 
     def path_exists(self):
         """Check if a file exists at the path."""
@@ -389,14 +650,25 @@ class DataOBJ():
 
     def to_file_path(self):
         """Return a file path for the data object"""
-        return self.hash_string(
+        return self.file_key(self.func.__name__, self.kwargs, self.censor)
+
+    @staticmethod
+    def file_key(name: str, kwargs: dict, censor) -> str:
+        """Cache file name of a call of function name with kwargs (see estimate, which looks calls up)."""
+        return DataOBJ.hash_string(
             regex.list_to_file_path(
-                [self.func.__name__] + 
-                [self.censor(str(val)) for val in self.kwargs.values()]
+                [name] + 
+                [censor(str(val)) for val in kwargs.values()]
                 )
         ) + ".json"
 
-    def hash_string(self, string):
+    @staticmethod
+    def memo_key(name: str, kwargs: dict) -> str | None:
+        """Memo key of a call of function name with kwargs (see memo.call_key). Unlike file_key, values aren't censored (or cut short)."""
+        return call_key(name, kwargs)
+
+    @staticmethod
+    def hash_string(string):
         """Hash a string with sha256. Return hexdigest."""
         return hashlib.sha256(string.encode()).hexdigest()
 
@@ -406,6 +678,18 @@ class Connection():
     def __init__(self,
         spec=None,
         debug: bool=False,
+        memo: str=None,
+        sessions: SessionPool=None,
+        tenant: str=None,
+        parse_workers: int | ParsePool=None,
+        buffer_mb: float=None,
+        transport: "HTTPAdapter"=None,
+        max_requests: int=None,
+        parse_memo: bool | float | ParseMemo=None,
+        write_workers: int | WriteExecutor=None,
+        upload_dir: str=None,
+        output_dir: str=None,
+        dsn: str=None,
         **kwargs
         ):
 
@@ -413,22 +697,125 @@ class Connection():
         self.spec = spec
         self.data = None
 
+        # memo scope: None (disabled), "run", "process" or a Memo instance
+        self.memo = memo
+
+        # number of parse processes for list-valued callables, or a shared ParsePool
+        self.parse_workers = parse_workers
+
+        # results of list-valued callables above buffer_mb spill to disk (see buffers.RecordBuffer)
+        self.buffer_limit = int(buffer_mb * MB) if buffer_mb is not None else None
+
+        # threads for list-valued writeables, or a shared WriteExecutor (see writers)
+        self.write_workers = write_workers
+        self.write_executor = None
+
+        # run() refuses specs that are estimated to send more requests (see estimate)
+        self.max_requests = max_requests
+
         # initialize configuration class with passed kwargs.
         self.config = Config(**kwargs)
 
         # instantiate Callables class instance with permanent access to config.
         self.functions = Callables(self.config)
+        self.functions.sessions = sessions
+        self.functions.tenant = tenant
+
+        # specs may come from users: local files are only read from here (see helpers.confine)
+        self.functions.upload_dir = upload_dir
+        self.functions.transport = transport
+
+        # recorded urls hide our key and password (see replay.RecordTransport)
+        if getattr(transport, "censor", False) is None:
+            transport.censor = self.functions.redact
+
+        # parsed responses by body hash: True (process-wide), a size in MB, or a ParseMemo
+        self.functions.parse_memo = get_parse_memo(parse_memo)
 
         # instantiate Writeables class instance with permanent access to config.
         self.writeables = Writeables(self.config)
 
+        # local sinks only write under output_dir (see helpers.confine), toPostgres_ only loads into dsn
+        self.writeables.output_dir = output_dir
+        self.writeables.dsn = dsn
+
+        # name -> bound method lookups for dispatch
+        self.register()
+
     def get_key(self):
         """Get the key from the user"""
         return getpass.getpass("Enter your key: ")
 
     def run(self):
         """Traverses the configuration file"""
-        return self.traverse_config()
+
+        # a "run" memo is fresh for every run, a "process" memo is shared.
+        self.functions.memo = get_memo(self.memo)
+        self.functions.bandwidth = Bandwidth()
+
+        # re-bind, in case methods were overridden on the instances since __init__
+        self.register()
+
+        if self.max_requests is not None:
+            report = self.estimate()
+            if report["requests"] > self.max_requests:
+                raise APIConnectorError(
+                    f"Spec would send ~{report['requests']} requests, more than max_requests={self.max_requests}",
+                    code=476
+                    )
+
+        self.functions.parse_pool = get_parse_pool(self.parse_workers)
+        self.write_executor = get_write_executor(self.write_workers)
+        try:
+            return self.traverse_config()
+        finally:
+            self.writeables.close_sinks()
+
+            # the response cache of this run is complete when run returns
+            self.functions.snapshots.wait()
+
+            # a pool created for this run is shut down, a shared pool is left alone
+            if self.functions.parse_pool is not None and not isinstance(self.parse_workers, ParsePool):
+                self.functions.parse_pool.shutdown()
+            self.functions.parse_pool = None
+
+            if self.write_executor is not None and not isinstance(self.write_workers, WriteExecutor):
+                self.write_executor.shutdown()
+            self.write_executor = None
+
+    def estimate(self, latency: float=None, rate: float=None, fanout: int=1) -> dict:
+        """
+        Dry run: estimate the calls, requests, writes, request depth, bytes and seconds of
+        running the spec, without calling anything. See estimate.Estimator for the arguments.
+        """
+        from .estimate import Estimator, summary
+
+        report = Estimator(self, latency=latency, rate=rate, fanout=fanout).run()
+        print("[ESTIMATE]", summary(report))
+        return report
+
+    def write_all(self, func, calls: list, executor: WriteExecutor = None, limit: int = None) -> list:
+        """
+        Call writeable func for every kwargs in calls with executor (the write executor of the
+        connection by default), at most limit calls per sink. Prints the results in order.
+        Raises PartialWriteError once all calls are done, if any failed.
+        """
+        results = (executor or self.write_executor).map(self.writeables.caller, func, calls, limit)
+
+        failed = []
+        for r in results:
+            if r.ok:
+                print(r.value)
+            else:
+                failed.append(r)
+                print(f"[WRITE] {func.__name__} #{r.index} ({r.target}) failed:", repr(getattr(r.error, "error", None) or r.error))
+
+        if failed:
+            raise PartialWriteError(
+                f"{len(failed)} of {len(results)} {func.__name__} calls failed (#{', #'.join(str(r.index) for r in failed)})",
+                code=472, error=failed[0].error, results=results
+                )
+        return results
 
     def traverse_config(self):
         """Traverses the passed configuration"""
@@ -436,62 +823,71 @@ class Connection():
         for key, value in self.spec.items():
             self.evaluate(key, value)
 
+    def register(self):
+        """Bind the registries of methods callable from config (introspection is cached per class)."""
+        self.callable_registry = Registry(self.functions, is_callable_key)
+        self.writeable_registry = Registry(self.writeables, is_writeable_key)
+
     def key_callable(self, key):
         """
         Criterium for a function to be callable from config. 
         Must start with _ and exist as a function in self.functions
         """
-        return (key in dir(self.functions)) and key[0]=="_" and key[1]!="_"
+        return key in self.callable_registry
 
     def key_writeable(self, key):
         """
         Criterium for a function to be a writer function callable from config. 
         Must end with _ and exist as a function in self.writeables.functions
         """
-        return (key in dir(self.writeables)) and key[-1]=="_" and key[-2]!="_"
+        return key in self.writeable_registry
 
     def get_callables(self):
         """Return a list of callable functions in self.functions"""
-        return [f for f in dir(self.functions) if self.key_callable(f)]
+        return self.callable_registry.names()
     
     def get_writeables(self):
         """Return a list of writeable functions in self.writeables"""
-        return [f for f in dir(self.writeables) if self.key_writeable(f)]
+        return self.writeable_registry.names()
     
     def get_callable_signature(self, func_name):
         """Return the signature of a callable function"""
-        return inspect.signature(getattr(self.functions, func_name))
+        return self.callable_registry.capabilities[func_name].signature
     
     def get_writeable_signature(self, func_name):
         """Return the signature of a writeable function"""
-        return inspect.signature(getattr(self.writeables, func_name))
+        return self.writeable_registry.capabilities[func_name].signature
     
     def get_callable_return_type(self, func_name):
         """DEPRECIATED: Return the return type of a callable function"""
-        return inspect.getfullargspec(getattr(self.functions, func_name)).annotations.get("return", None)
+        return self.callable_registry.capabilities[func_name].return_type
     
     def get_writeable_return_type(self, func_name):
         """DEPRECTIATED: Return the return type of a writeable function"""
-        return inspect.getfullargspec(getattr(self.writeables, func_name)).annotations.get("return", None)
+        return self.writeable_registry.capabilities[func_name].return_type
     
     def get_callable_description(self, func_name):
         """Return the description of a callable function"""
-        return inspect.getdoc(getattr(self.functions, func_name))
+        return self.callable_registry.capabilities[func_name].description
     
     def get_writeable_description(self, func_name):
         """Return the description of a writeable function"""
-        return inspect.getdoc(getattr(self.writeables, func_name))
+        return self.writeable_registry.capabilities[func_name].description
+
+    def capabilities(self) -> dict:
+        """Return all functions callable from config with their signatures, e.g. for the UI."""
+        return {
+            "callables": self.callable_registry.to_dict(),
+            "writeables": self.writeable_registry.to_dict()
+        }
     
     def trimargs(self, func):
         """Returns a list of arguments that can be passed to func."""    
 
         print("Trimming args for:", func.__name__)
 
-        # get function arguments
-        try:
-            args = inspect.getfullargspec(func).args
-        except:
-            args = inspect.getfullargspec(func).args
+        # get function arguments (cached per function)
+        args = function_args(func)
 
         # store evaluated args in iargs
         iargs = {}
@@ -530,17 +926,18 @@ class Connection():
         print(
             "Setting:", key, 
               "-->", type(value).__name__ + ":", 
-              self.functions.censor(json.dumps(value))
+              # large values are not serialised just to be printed
+              self.functions.censor(preview(value, indent=None))
               )
         
         self.config.__setattr__(key, value)    
 
-    @add_error(f"Error evaluating function spec. Check your syntax.", 471)
     def evaluate(self,
                  key,
                  value,
                  path=[],
-                 in_function_call: bool=False
+                 in_function_call: bool=False,
+                 whole: bool=False
                  ):
         """
         DFS on each configuration key.
@@ -550,133 +947,190 @@ class Connection():
         Config can execute ANY function in self.functions = Callables().
         """
 
-        # traverse dict recursively, while keeping track of path
-        match value:
-            case dict():
+        # errors are translated once, at the deepest node that raised them, so the
+        # happy path has no wrapper. Outer nodes re-raise the same APIConnectorError.
+        try:
+            start = time.perf_counter() if RECORDER.enabled else None
+
+            # traverse dict recursively, while keeping track of path
+            match value:
+                case dict():
 
-                # Ouch! what to do here... 
-                # we absolutely need this for our auto-flatten feature, 
-                # but it seems inefficient to calculate the cross product of all values, 
-                # if most database SDKs support bulk-uploads...
-                value = list(flatten_dict(**{
-                    k: self.evaluate(k, v, path + [k], in_function_call)
-                    for k, v in value.items()
-                }))
+                    # Ouch! what to do here... 
+                    # we absolutely need this for our auto-flatten feature, 
+                    # but it seems inefficient to calculate the cross product of all values, 
+                    # if most database SDKs support bulk-uploads...
+                    children = {
+                        k: self.evaluate(k, v, path + [k], in_function_call, binds_whole(key, k))
+                        for k, v in value.items()
+                    }
+                    value = self.flatten(children)
 
-            case list():
-                for index, item in enumerate(value):
-                    if isinstance(item, dict):
-                        for k, v in item.items():
-                            self.evaluate(
-                                    k, v, path + [index] + [k], in_function_call
-                                    )
+                case list():
+                    for index, item in enumerate(value):
+                        if isinstance(item, dict):
+                            for k, v in item.items():
+                                self.evaluate(
+                                        k, v, path + [index] + [k], in_function_call
+                                        )
 
-            case str():
+                case str():
 
-                # locate all the {escaped} variables in the string
-                variables = regex.return_escapable_variables(value)
+                    # locate all the {escaped} variables in the string
+                    variables = regex.return_escapable_variables(value)
 
-                # loop over variables that need to be unpacked
-                for variable in variables:
+                    # loop over variables that need to be unpacked
+                    for variable in variables:
 
-                    # if the variable is already defined in self.config, unpack it into a list of possible values.
-                    if hasattr(self.config, variable):
-                        value: list = self.unpack(value, variable)
+                        # if the variable is already defined in self.config, unpack it into a list of possible values.
+                        if hasattr(self.config, variable):
+                            value: list = self.unpack(value, variable, whole)
                     
-                    # otherwise, infer value(s) from dataobj.
-                    # using path as a key
-                    # and set to variable with specified name in config.
-                    else:    
-                        print("Traversing data with path:", path, "to find", variable, "- data:")
+                        # otherwise, infer value(s) from dataobj.
+                        # using path as a key
+                        # and set to variable with specified name in config.
+                        else:    
+                            print("Traversing data with path:", path, "to find", variable, "- data:")
                         
-                        extracted_data = self.locate_in_dict(path, self.data.data)
-                        print("Type of extracted data:", str(type(extracted_data)))
+                            extracted_data = self.locate_in_dict(path, self.data.data)
+                            print("Type of extracted data:", str(type(extracted_data)))
                         
-                        self.config.__setattr__(
-                            variable, extracted_data
-                            )
+                            self.config.__setattr__(
+                                variable, extracted_data
+                                )
                         
-            case bool() | int() | float():
-                pass
-            case _:
-                print("[ERROR] value:", value, "type:", type(value))
-                raise ValueError(
-                    "Invalid value type in spec. Must be dict, list, str, bool, int, or float."
-                    )
+                case bool() | int() | float():
+                    pass
+                case _:
+                    print("[ERROR] value:", value, "type:", type(value))
+                    raise ValueError(
+                        "Invalid value type in spec. Must be dict, list, str, bool, int, or float."
+                        )
 
-        # Define non-callable keys specified in config as attributes in self.config:
-        self.set_function_attribute(key, value)
+            # Define non-callable keys specified in config as attributes in self.config:
+            self.set_function_attribute(key, value)
 
-        # handle callables
-        if self.key_callable(key):            
-            # TODO: match function arguments with passed kwargs in self.config.<funcName>
-            # We need to pass qargs in case we want to use top-level flags like debug, cache, etc.
-            # qargs = self.trimargs(func)
+            # handle callables
+            if self.key_callable(key):            
+                # TODO: match function arguments with passed kwargs in self.config.<funcName>
+                # We need to pass qargs in case we want to use top-level flags like debug, cache, etc.
+                # qargs = self.trimargs(func)
 
-            func = getattr(self.functions, key)
-            iargs = getattr(self.config, key)
+                func = self.callable_registry[key]
+                iargs = getattr(self.config, key)
 
-            # self.config.<funcName> is a dictionary of arguments now, to be passed to the function.
-            # print("iargs", iargs)
+                # self.config.<funcName> is a dictionary of arguments now, to be passed to the function.
+                # print("iargs", iargs)
 
-            match iargs:
-                case dict():
-                    self.data = DataOBJ(
-                        func=func,
-                        callables_obj=self.functions,
-                        **iargs
-                        )
-                case list():
-                    # TODO: decide whether we want to permit some calls to fail.
-                    self.data = DataOBJ(
-                        data=[
-                            j for i in iargs for j in DataOBJ(
-                                func=func,
-                                callables_obj=self.functions,
-                                **i).data
-                            ])
+                match iargs:
+                    case dict():
+                        self.data = DataOBJ(
+                            func=func,
+                            callables_obj=self.functions,
+                            **iargs
+                            )
+                    case list() | RecordBuffer():
+                        # TODO: decide whether we want to permit some calls to fail.
+                        self.data = DataOBJ(self.collect(func, iargs))
                 
-            self.set_function_attribute(key, self.data.data)
-            # self.config.__setattr__(key, self.data.data)    
-            # print("Setting:", key, "-->", type(self.data.data).__name__ + ":", self.functions.censor(json.dumps(self.data.data)))
-
-            # after calling a function, we want our value (as defined in config) 
-            # to be equivalent to the data in the DataOBJ.
-            in_function_call = True
-            path=[]
-
-        # handle writeables
-        if self.key_writeable(key):
-            func = getattr(self.writeables, key)
-            iargs = getattr(self.config, key)
-
-            match iargs:
-                case dict():
-                    do = self.writeables.caller(func, **iargs)
+                self.set_function_attribute(key, self.data.data)
+                # self.config.__setattr__(key, self.data.data)    
+                # print("Setting:", key, "-->", type(self.data.data).__name__ + ":", self.functions.censor(json.dumps(self.data.data)))
+
+                # after calling a function, we want our value (as defined in config) 
+                # to be equivalent to the data in the DataOBJ.
+                in_function_call = True
+                path=[]
+
+            # handle writeables
+            if self.key_writeable(key):
+                func = self.writeable_registry[key]
+                iargs, options = split_write_options(getattr(self.config, key))
+
+                # write_workers in the spec overrides the executor of the connection for this writeable
+                executor = self.write_executor
+                if "write_workers" in options:
+                    executor = get_write_executor(options["write_workers"])
+
+                match iargs:
+                    case dict():
+                        do = self.writeables.caller(func, **iargs)
                     
-                    print(do)
-                case list():
-                    for i in iargs:
-                        do = self.writeables.caller(func, **i)
-        
                         print(do)
+                    case list() | RecordBuffer() if executor is not None:
+                        try:
+                            self.write_all(func, iargs, executor, options.get("sink_limit"))
+                        finally:
+                            if executor is not self.write_executor:
+                                executor.shutdown()
+                    case list() | RecordBuffer():
+                        for i in iargs:
+                            do = self.writeables.caller(func, **i)
         
-        return value
+                            print(do)
 
+            if start is not None:
+                RECORDER.emit("evaluate", key, start, path="/".join(str(p) for p in path))
+        
+            return value
 
-    def unpack(self, value: str | list, variable: str | list) -> list:
+        except APIConnectorError as e:
+            if e.path is None:
+                e.path = path or [key]
+            raise
+        except Exception as e:
+            raise APIConnectorError(
+                "Error evaluating function spec. Check your syntax.",
+                code=471, error=e, path=path or [key]
+                ) from e
+
+
+    def collect(self, func, iargs: list) -> list | RecordBuffer:
+        """
+        Call func for each set of arguments and collect all results, in order.
+        With a parse pool, parse_doctype returns Futures in the deferred block, so the next
+        requests are sent while earlier bodies are parsed in other processes.
+        With buffer_mb, results go into a RecordBuffer that spills to disk.
+        """
+        records = [] if self.buffer_limit is None else RecordBuffer(limit=self.buffer_limit)
+        pool = self.functions.parse_pool
+
+        # don't hold on to more results than needed to keep the parse pool busy
+        window = 2 * pool.workers if pool is not None else 0
+
+        pending = deque()
+        with self.functions.deferred:
+            for i in iargs:
+                pending.append(DataOBJ(func=func, callables_obj=self.functions, **i).data)
+                while len(pending) > window:
+                    self.extend_records(records, resolve(pending.popleft()))
+
+        while pending:
+            self.extend_records(records, resolve(pending.popleft()))
+
+        return records
+
+    def extend_records(self, records: list | RecordBuffer, results: list):
+        """Add the results of a call. A RecordBuffer (e.g. from _transform) is merged record by record."""
+        for res in results:
+            if isinstance(res, RecordBuffer):
+                records.extend(res)
+            else:
+                records.append(res)
+
+    def unpack(self, value: str | list, variable: str | list, whole: bool = False) -> list:
         """
         Returns the cross product between two str | list items, 
         replacing {escapable} parts of value with variables of the same key.
-        Always returns list.
+        Always returns list. With whole, a list variable is one value (see binds_whole).
         """
         lst = []
         print("unpacking:", value, "with", variable)
 
         # for each value
-        if isinstance(value, list):
+        if isinstance(value, list | RecordBuffer):
             for v in value:
-                lst += self.unpack(v, variable)
+                lst += self.unpack(v, variable, whole)
 
         # apply variable
         else:
@@ -684,7 +1138,13 @@ class Connection():
             # access self.'variable' through var
             var = getattr(self.config, variable)
             
-            if isinstance(var, list):
+            if whole and isinstance(var, list | RecordBuffer):
+                # joined into one body by Callables.caller
+                lst.append(var)
+            elif isinstance(var, RecordBuffer):
+                # fans out like a list, but stays a buffer: flatten_dict reads it lazily
+                return var
+            elif isinstance(var, list):
                 for item in var:
                     try:
                         # TODO: NEEDS UNIT TEST
@@ -699,6 +1159,16 @@ class Connection():
 
         return lst
 
+    def flatten(self, children: dict) -> list | RecordBuffer:
+        """
+        Cross product of the evaluated children of a dict (see flatten_dict). When a child is a
+        RecordBuffer, the product goes into a RecordBuffer too, so it isn't loaded into memory.
+        """
+        buffers = [v for v in children.values() if isinstance(v, RecordBuffer)]
+        if not buffers:
+            return list(flatten_dict(**children))
+        return RecordBuffer(flatten_dict(**children), limit=buffers[0].limit, spill_dir=buffers[0].spill_dir)
+
     @add_error("""
                Syntax Error: could not find non-secret variable. 
                If you use the brackets syntax '{name}', 
@@ -707,53 +1177,5 @@ class Connection():
     def locate_in_dict(self, path: list, dictionary: dict):
         """Locates a value in a nested dictionary."""
 
-        data = []
-
-        if path == []: return dictionary
-        if dictionary is None: return None
-
         print("path:", path, "type", str(type(dictionary)))
-        if type(path[0]) == str: print(dictionary.keys())
-
-        if len(path) == 1:
-            print("needs handling I think")
-
-        match path[0]:
-            # if path is an integer, it cannot be other than that the value is a list.
-            case int():
-
-                # so we just want to keep traversing (this snippet also flattens (?))
-                for item in dictionary:
-                    res = self.locate_in_dict(path[1:], item)
-                    if not isinstance(res, list): data.append(res)
-                    else: data += res
-
-                return data
-            
-            # if path is a string, it can be either a key or a variable.
-            case str():
-                esc_vars = regex.return_escapable_variables(path[0])
-
-                # if esc_vars is not empty, we have a variable.
-                if esc_vars != []:
-                    
-                    ls = []
-                    for k, v in dictionary.items():
-                        res = self.locate_in_dict(path[1:], v)    
-                        
-                        if isinstance(res, list):
-                            pass
-                        elif isinstance(res, dict):
-                            res[esc_vars[0]] = k
-                        elif isinstance(res, str):
-                            print("res", res[:5], "\n")
-                    
-                        ls.append(res)
-                    
-                    return {esc_vars[0] + "s": ls} 
-                
-                # if esc_vars is empty, we have a key.
-                elif esc_vars == []:
-                    return self.locate_in_dict(path[1:], dictionary[path[0]])
-                else:
-                    raise SyntaxError(f"Something went wrong. Compare your data at at \n{path}")
+        return locate_in_dict(path, dictionary)
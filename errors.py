@@ -5,13 +5,27 @@ from dataclasses import dataclass
 # custom error class for all api-connector related errors
 @dataclass
 class APIConnectorError(BaseException):
-    """Base class for APIConnector errors."""
+    """Base class for APIConnector errors.
+    error is the original exception, path the spec path at which it was raised (set once).
+    """
     message: Exception | str = None
     status: str = "error"
     code: int = 400
+    error: Exception = None
+    path: list = None
+
+# raised (code 472) when a response can't be parsed, also by deferred parses (see sharding.resolve)
+PARSE_ERROR = "Unable to parse response (hint: change the Content-Type)"
+
+@dataclass
+class PartialWriteError(APIConnectorError):
+    """Some calls of a list-valued writeable failed. results holds a writers.WriteResult per call, in order."""
+    results: list = None
 
 # add_errors decorator which takes adds a try/except block to the function, returning the error.
 # allows passing an error object consisting of a code and message to the caller.
+# APIConnectorError derives from BaseException, so errors raised by nested
+# decorated functions pass through unchanged (no re-wrapping at every level).
 
 def add_error(message, code):
     """Decorator to add error handling to a function."""
@@ -21,18 +35,34 @@ def add_error(message, code):
             try:
                 return func(*args, **kwargs)
             except Exception as e:
-                raise APIConnectorError(message, code, e) from e
+                raise APIConnectorError(message, code=code, error=e) from e
+        wrapper.__add_error__ = (message, code)
         return wrapper
     return decorator
 
+def is_config_method(name: str) -> bool:
+    """Whether a method can be called from config: _<name> (Callables) or <name>_ (Writeables)."""
+    if name.startswith("__") or name.endswith("__"):
+        return False
+    return name.startswith("_") or name.endswith("_")
+
 class ErrorHandlingMeta(type):
+    """
+    Adds error handling to methods that can be called from config.
+    Helpers (censor, caller, ...) are left alone, and methods that are already
+    decorated with add_error are not wrapped a second time.
+    """
     def __new__(cls, name, bases, attrs):
         for attr_name, attr_value in attrs.items():
-            if callable(attr_value):
+            if (
+                callable(attr_value) and
+                is_config_method(attr_name) and
+                not hasattr(attr_value, "__add_error__")
+            ):
                 attrs[attr_name] = add_error(f"Error executing {attr_name}", 472)(attr_value)
         return super().__new__(cls, name, bases, attrs)
 
 class MyClass(metaclass=ErrorHandlingMeta):
     def my_method(self):
         # method implementation
-        pass
\ No newline at end of file
+        pass
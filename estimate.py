@@ -0,0 +1,268 @@
+"""
+Dry-run cost estimates for a spec: how many calls and requests a run will make, how deep
+requests are chained, roughly how many bytes come back and how long it takes.
+
+    report = Connection(spec=spec).estimate()
+    report["requests"], report["seconds"]
+
+The spec is walked like Connection.evaluate, without calling anything. Dicts multiply (the
+flatten_dict cross product), lists count their items and {variables} fan out over the values
+they are set to. Variables extracted from a response can't be known upfront, unless the
+response is in the disk cache (./response_cache); otherwise they are assumed to have
+`fanout` values and the estimate is marked inexact.
+"""
+
+import os
+import math
+
+from . import regex, codec
+from .helpers import flatten_dict, locate_in_dict
+from .buffers import RecordBuffer
+from .instrumentation import RECORDER
+from .connection import DataOBJ, binds_whole
+
+CACHE_DIR = "./response_cache/"
+
+# seconds per request when nothing was measured yet
+DEFAULT_LATENCY = 0.25
+
+# concrete values are only kept (for cache lookups) up to this many
+MAX_VALUES = 10000
+
+class Values():
+    """
+    What evaluating a spec value will give: the value itself when it is known (and not too
+    large), otherwise only how many values a list will have.
+        count   number of values flatten_dict (or unpack) fans out over, 1 for scalars
+        depth   number of chained callables the value depends on
+        fields  the Values of each key, for dicts
+    """
+    def __init__(self, count: int = 1, value=None, known: bool = True, exact: bool = True, depth: int = 0, fields: dict = None):
+        self.count = count
+        self.value = value
+        self.known = known and count <= MAX_VALUES
+        self.exact = exact
+        self.depth = depth
+        self.fields = fields or {}
+
+    @classmethod
+    def of(cls, value, depth: int = 0) -> "Values":
+        """Values of a known value."""
+        return cls(len(value) if isinstance(value, list | RecordBuffer) else 1, value, depth=depth)
+
+class Estimator():
+    """
+    Walks a spec like Connection.evaluate and counts calls per callable and writeable.
+    latency is seconds per request (default: the mean of recorded requests, see instrumentation),
+    rate an optional limit in requests per second, fanout the assumed number of values of
+    variables extracted from responses that aren't cached.
+    """
+    def __init__(self, connection, latency: float = None, rate: float = None, fanout: int = 1):
+        self.connection = connection
+        self.latency = latency if latency is not None else measured_latency()
+        self.rate = rate
+        self.fanout = fanout
+
+        # variables known upfront: everything passed to Connection
+        self.env = {k: Values.of(v) for k, v in vars(connection.config).items()}
+        self.data = None
+        self.top = None
+
+        self.callables = []
+        self.writeables = []
+        self.assumed = []
+
+    def run(self) -> dict:
+        for key, value in self.connection.spec.items():
+            self.top = key
+            self.walk(key, value, [])
+        return self.report()
+
+    def walk(self, key, value, path: list, whole: bool = False) -> Values:
+        """Mirror of Connection.evaluate."""
+        match value:
+            case dict():
+                fields = {k: self.walk(k, v, path + [k], binds_whole(key, k)) for k, v in value.items()}
+                res = Values(
+                    math.prod(f.count for f in fields.values()),
+                    known=all(f.known for f in fields.values()),
+                    exact=all(f.exact for f in fields.values()),
+                    depth=max((f.depth for f in fields.values()), default=0),
+                    fields=fields
+                    )
+                if res.known and fields:
+                    res.value = list(flatten_dict(**{k: f.value for k, f in fields.items()}))
+                    res.count = len(res.value)
+
+            case list():
+                for index, item in enumerate(value):
+                    if isinstance(item, dict):
+                        for k, v in item.items():
+                            self.walk(k, v, path + [index] + [k])
+                res = Values.of(value)
+
+            case str():
+                res = Values.of(value)
+                for variable in regex.return_escapable_variables(value):
+                    if variable in self.env:
+                        res = self.unpack(res, variable, whole)
+                    else:
+                        self.env[variable] = self.extract(variable, path)
+
+            case _:
+                res = Values.of(value)
+
+        self.env[key] = res
+
+        if self.connection.key_callable(key):
+            res = self.env[key] = self.call(key, res, path)
+        if self.connection.key_writeable(key):
+            self.write(key, res, path)
+
+        return res
+
+    def unpack(self, res: Values, variable: str, whole: bool = False) -> Values:
+        """Mirror of Connection.unpack: values times the values of variable."""
+        var = self.env[variable]
+        if whole and (var.value is None or isinstance(var.value, list | RecordBuffer)):
+            # bound as one value, the records themselves don't matter for the estimate
+            return Values(res.count, known=False, exact=res.exact and var.exact, depth=max(res.depth, var.depth))
+        if res.known and var.known:
+            value = res.value if isinstance(res.value, list) else [res.value]
+            match var.value:
+                case list() | RecordBuffer():
+                    value = [item for v in value for item in var.value]
+                case _:
+                    value = [v.replace(f"{{{variable}}}", str(var.value)) if isinstance(v, str) else v for v in value]
+            return Values.of(value, depth=max(res.depth, var.depth))
+
+        count = res.count * (var.count if var.value is None or isinstance(var.value, list | RecordBuffer) else 1)
+        return Values(count, known=False, exact=res.exact and var.exact, depth=max(res.depth, var.depth))
+
+    def extract(self, variable: str, path: list) -> Values:
+        """A variable extracted from the last callable's data: exact when that data is cached."""
+        data = self.data
+        if data is not None and data.known:
+            try:
+                return Values.of(locate_in_dict(path, data.value), depth=data.depth)
+            except Exception:
+                pass
+
+        self.assumed.append(variable)
+        return Values(self.fanout, known=False, exact=False, depth=data.depth if data else 0)
+
+    def call(self, key: str, iargs: Values, path: list) -> Values:
+        """Count the calls of callable key and look them up in the disk cache."""
+        calls, cached, sizes, payloads = iargs.count, 0, [], []
+        unique = None
+
+        if iargs.known:
+            func = self.connection.callable_registry[key]
+            censor = self.connection.functions.censor
+            kwargs = iargs.value if isinstance(iargs.value, list) else [iargs.value]
+            keys = [DataOBJ.file_key(func.__name__, k, censor) for k in kwargs if isinstance(k, dict)]
+            unique = len(set(keys))
+
+            for file_key in keys:
+                file = CACHE_DIR + file_key
+                if os.path.exists(file):
+                    cached += 1
+                    sizes.append(os.path.getsize(file))
+                    if payloads is not None:
+                        payloads += read_cached(file)
+                else:
+                    payloads = None
+
+        sleep = max_value(iargs.fields.get("sleep"))
+        requests = calls if key == "_request" else 0
+        seconds = requests * (self.latency + sleep)
+        if self.rate:
+            seconds = max(seconds, requests / self.rate)
+
+        self.callables.append({
+            "key": key,
+            "path": self.display(key, path),
+            "calls": calls,
+            "unique": unique,
+            "requests": requests,
+            "cached": cached,
+            "exact": iargs.exact,
+            "depth": iargs.depth + 1,
+            "dimensions": {k: f.count for k, f in iargs.fields.items() if f.count != 1},
+            "bytes": int(sum(sizes) / len(sizes) * calls) if sizes else None,
+            "seconds": seconds
+        })
+
+        # one result per call, known when every call is cached. With buffer_mb, results are
+        # collected in a RecordBuffer, which fans out like a list
+        if payloads is not None and iargs.known and cached == calls:
+            self.data = Values.of(payloads, depth=iargs.depth + 1)
+        else:
+            self.data = Values(calls, known=False, exact=iargs.exact, depth=iargs.depth + 1)
+        return self.data
+
+    def write(self, key: str, iargs: Values, path: list):
+        self.writeables.append({
+            "key": key,
+            "path": self.display(key, path),
+            "writes": iargs.count,
+            "exact": iargs.exact
+        })
+
+    def display(self, key: str, path: list) -> str:
+        """Spec path of key (paths in evaluate don't include the top-level key)."""
+        return "/".join(str(p) for p in [self.top, *path]) if path else key
+
+    def report(self) -> dict:
+        sizes = [c["bytes"] for c in self.callables if c["bytes"] is not None]
+        return {
+            "calls": sum(c["calls"] for c in self.callables),
+            "requests": sum(c["requests"] for c in self.callables),
+            "writes": sum(w["writes"] for w in self.writeables),
+            "depth": max((c["depth"] for c in self.callables), default=0),
+            "exact": all(c["exact"] for c in self.callables + self.writeables),
+            "assumed": {"fanout": self.fanout, "variables": self.assumed},
+            "bytes": sum(sizes) if sizes else None,
+            "seconds": sum(c["seconds"] for c in self.callables),
+            "latency": self.latency,
+            "callables": self.callables,
+            "writeables": self.writeables
+        }
+
+def max_value(values: Values) -> float:
+    """Largest (known, numeric) value, or 0."""
+    if values is None or not values.known:
+        return 0
+    value = values.value if isinstance(values.value, list) else [values.value]
+    return max((v for v in value if isinstance(v, int | float)), default=0)
+
+def read_cached(file: str) -> list:
+    with open(file, "rb") as f:
+        return codec.loads(f.read())
+
+def measured_latency() -> float:
+    """Mean duration of the requests recorded so far, or DEFAULT_LATENCY."""
+    totals = RECORDER.summary()["stages"].get("request")
+    if totals and totals["calls"]:
+        return totals["seconds"] / totals["calls"]
+    return DEFAULT_LATENCY
+
+def summary(report: dict) -> str:
+    """Human-readable report."""
+    lines = [
+        f"{'~' if not report['exact'] else ''}{report['requests']} requests, {report['calls']} calls, "
+        f"{report['writes']} writes, depth {report['depth']}, ~{report['seconds']:.1f}s"
+        + (f", ~{report['bytes']} bytes" if report["bytes"] is not None else "")
+    ]
+    for c in report["callables"]:
+        lines.append(
+            f"  {c['path']}: {c['calls']} calls" + ("" if c["exact"] else " (estimated)")
+            + (f", {c['unique']} unique" if c["unique"] is not None and c["unique"] != c["calls"] else "")
+            + (f", {c['cached']} cached" if c["cached"] else "")
+            + (f", {c['dimensions']}" if c["dimensions"] else "")
+        )
+    for w in report["writeables"]:
+        lines.append(f"  {w['path']}: {w['writes']} writes" + ("" if w["exact"] else " (estimated)"))
+    if report["assumed"]["variables"]:
+        lines.append(f"  assumed {report['assumed']['fanout']} value(s) for: {', '.join(report['assumed']['variables'])}")
+    return "\n".join(lines)
@@ -1,8 +1,11 @@
 """Helper functions for the Connect module."""
 
+import os
 from itertools import product
 from datetime import datetime
 
+from . import regex
+
 def get_date_format(date_str):
     """Naive function to determine the format of a date string. Can be improved"""
     for fmt in [
@@ -54,9 +57,79 @@ def date_format(date_source: str, target_expression: str) -> str:
     print(formatted_date)
     return formatted_date
 
+def iter_product(values: list):
+    """itertools.product, but iterables are iterated as they go instead of being read into memory first."""
+    if not values:
+        yield ()
+        return
+    for x in values[0]:
+        for rest in iter_product(values[1:]):
+            yield (x,) + rest
+
 def flatten_dict(**d):
-    """Flatten a dictionary (one level)."""
+    """Flatten a dictionary (one level). RecordBuffers fan out like lists, read lazily."""
+    from .buffers import RecordBuffer
 
     keys, values = zip(*d.items())
-    for instance in product(*(x if isinstance(x, list) else [x] for x in values)):
+    values = [x if isinstance(x, list | RecordBuffer) else [x] for x in values]
+    instances = iter_product(values) if any(isinstance(x, RecordBuffer) for x in values) else product(*values)
+    for instance in instances:
         yield dict(list(zip(keys, instance)))
+
+def locate_in_dict(path: list, dictionary: dict):
+    """Locates a value in a nested dictionary.
+    Integers in path traverse (and flatten) lists, {variables} traverse dynamic keys.
+    """
+
+    data = []
+
+    if path == []: return dictionary
+    if dictionary is None: return None
+
+    match path[0]:
+        # if path is an integer, it cannot be other than that the value is a list.
+        case int():
+
+            # so we just want to keep traversing (this snippet also flattens (?))
+            for item in dictionary:
+                res = locate_in_dict(path[1:], item)
+                if not isinstance(res, list): data.append(res)
+                else: data += res
+
+            return data
+        
+        # if path is a string, it can be either a key or a variable.
+        case str():
+            esc_vars = regex.return_escapable_variables(path[0])
+
+            # if esc_vars is not empty, we have a variable.
+            if esc_vars != []:
+                
+                ls = []
+                for k, v in dictionary.items():
+                    res = locate_in_dict(path[1:], v)    
+                    
+                    # a copy with the key added: the data itself is never changed, so it can
+                    # be serialised in the background (see snapshots) and shared (see memo)
+                    if isinstance(res, dict):
+                        res = {**res, esc_vars[0]: k}
+                
+                    ls.append(res)
+                
+                return {esc_vars[0] + "s": ls} 
+            
+            # if esc_vars is empty, we have a key.
+            return locate_in_dict(path[1:], dictionary[path[0]])
+
+def confine(path: str, root: str | None, setting: str) -> str:
+    """
+    Resolve path (relative to root) for a local file named in a spec. Raises PermissionError
+    if root isn't configured, or if path resolves outside it (.., absolute paths, symlinks).
+    """
+    if root is None:
+        raise PermissionError(f"local file {path} needs Connection({setting}=...)")
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise PermissionError(f"{path} is outside {setting} {root}")
+    return resolved
@@ -23,7 +23,7 @@
 
 from typing import Set, Type, List, Dict, Any, Union, Optional, get_type_hints, get_origin, get_args, TypeVar, Generic
 from pydantic import BaseModel
-import json
+from . import codec
 # from .helpers import flatten_dict
 from functools import reduce, lru_cache
 from glom import T
@@ -106,7 +106,7 @@ class ComplexType():
         self.structure = structure
     
     def __repr__(self):
-        return json.dumps(
+        return codec.dumps(
             self.structure,
             indent=4,
             default=lambda x: str(x) if not isinstance(x, ComplexType) else x.structure
@@ -350,7 +350,10 @@ class Hypothesis():
             
             else:
                 new_type = self.cast_instance_to_type_unless_type_instance(v)
-                if k in self.current.structure:
+                if isinstance(self.current.structure.get(k), ComplexType):
+                    # a dictionary in one case and some other type in another, like handle_kv
+                    self.current.structure[k] = Any
+                elif k in self.current.structure:
                     self.current.structure[k] = self.current.union_types(
                         self.current.structure[k], 
                         new_type
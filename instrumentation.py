@@ -0,0 +1,203 @@
+"""
+Instrumentation for the Connect module.
+Records timing events around requests, parsing, cache lookups, spec evaluation and writes.
+
+Disabled by default. Call sites only check RECORDER.enabled (no timing, no allocation) until
+you enable it:
+
+    from Connect.instrumentation import RECORDER
+    RECORDER.enable()
+    Connection(spec=spec).run()
+    RECORDER.save_trace("trace.json")     # open in chrome://tracing or ui.perfetto.dev
+    print(RECORDER.to_prometheus())
+
+Note: "evaluate" events are emitted per spec node and include the time of their children.
+"""
+
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+
+# stages emitted by the Connect module
+STAGES = ("request", "parse", "cache", "evaluate", "write")
+
+# default number of events kept for the trace file
+DEFAULT_MAX_EVENTS = 100000
+
+@dataclass
+class Event():
+    """A single instrumented operation."""
+    stage: str
+    name: str
+    start: float
+    duration: float
+    bytes: int = None
+    wire_bytes: int = None
+    records: int = None
+    cache: str = None
+    path: str = None
+    detail: str = None
+    thread: int = None
+
+def count_records(data) -> int:
+    """Number of records in a result: list length, or 1 for anything else."""
+    if data is None:
+        return 0
+    return len(data) if isinstance(data, list) else 1
+
+class Recorder():
+    """
+    Collects events and per-stage aggregates. Subscribers are called with every event,
+    from the thread that emitted it, so keep them cheap.
+    """
+    def __init__(self, max_events: int = DEFAULT_MAX_EVENTS):
+        self.enabled = False
+        self.subscribers = []
+        self.events = deque(maxlen=max_events)
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.totals = {}
+        self.cache_outcomes = {}
+
+        # operations currently running, per stage (see active)
+        self.in_flight = {}
+
+    def enable(self):
+        """Start recording."""
+        self.enabled = True
+        return self
+
+    def disable(self):
+        """Stop recording. Recorded data is kept."""
+        self.enabled = False
+        return self
+
+    def reset(self):
+        """Forget all recorded events and aggregates."""
+        with self.lock:
+            self.events.clear()
+            self.totals = {}
+            self.cache_outcomes = {}
+            self.origin = time.perf_counter()
+
+    @contextmanager
+    def active(self, stage: str):
+        """Count the block as in flight for stage while it runs (when enabled)."""
+        if not self.enabled:
+            yield
+            return
+
+        with self.lock:
+            self.in_flight[stage] = self.in_flight.get(stage, 0) + 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.in_flight[stage] -= 1
+
+    def subscribe(self, callback):
+        """Call callback(event) for every event."""
+        self.subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        """Stop calling callback."""
+        self.subscribers.remove(callback)
+
+    def emit(self, stage: str, name: str, start: float, **fields) -> Event:
+        """Record an event that started at start (time.perf_counter()) and ends now."""
+
+        event = Event(
+            stage=stage,
+            name=name,
+            start=start,
+            duration=time.perf_counter() - start,
+            thread=threading.get_ident(),
+            **fields
+            )
+
+        with self.lock:
+            self.events.append(event)
+
+            totals = self.totals.setdefault(stage, {"calls": 0, "seconds": 0.0, "bytes": 0, "wire_bytes": 0, "records": 0})
+            totals["calls"] += 1
+            totals["seconds"] += event.duration
+            totals["bytes"] += event.bytes or 0
+            totals["wire_bytes"] += event.wire_bytes or 0
+            totals["records"] += event.records or 0
+
+            if event.cache is not None:
+                self.cache_outcomes[event.cache] = self.cache_outcomes.get(event.cache, 0) + 1
+
+        for callback in self.subscribers:
+            callback(event)
+
+        return event
+
+    def summary(self) -> dict:
+        """Return per-stage aggregates and cache outcomes."""
+        with self.lock:
+            return {
+                "stages": {k: dict(v) for k, v in self.totals.items()},
+                "cache": dict(self.cache_outcomes)
+            }
+
+    def to_prometheus(self, prefix: str = "connect") -> str:
+        """Return aggregates in the Prometheus text exposition format."""
+
+        summary = self.summary()
+        lines = []
+        for metric, kind, help_text in (
+            ("calls", "counter", "Number of instrumented calls"),
+            ("seconds", "counter", "Time spent per stage"),
+            ("bytes", "counter", "Bytes processed per stage"),
+            ("wire_bytes", "counter", "Bytes received on the wire per stage (before decompression)"),
+            ("records", "counter", "Records processed per stage"),
+        ):
+            name = f"{prefix}_stage_{metric}_total"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage, totals in summary["stages"].items():
+                lines.append(f'{name}{{stage="{stage}"}} {totals[metric]}')
+
+        name = f"{prefix}_cache_lookups_total"
+        lines.append(f"# HELP {name} Cache lookups by outcome")
+        lines.append(f"# TYPE {name} counter")
+        for outcome, count in summary["cache"].items():
+            lines.append(f'{name}{{outcome="{outcome}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+    def to_trace(self) -> dict:
+        """Return events in the Chrome trace event format."""
+        with self.lock:
+            events = list(self.events)
+
+        return {"traceEvents": [
+            {
+                "name": event.name,
+                "cat": event.stage,
+                "ph": "X",
+                "ts": (event.start - self.origin) * 1e6,
+                "dur": event.duration * 1e6,
+                "pid": 0,
+                "tid": event.thread,
+                "args": {k: v for k, v in asdict(event).items() if v is not None}
+            } for event in events
+        ]}
+
+    def save_trace(self, path: str):
+        """Write the json trace file to path."""
+        with open(path, "wt") as f:
+            json.dump(self.to_trace(), f)
+
+    def save_prometheus(self, path: str):
+        """Write the Prometheus text format to path (e.g. for the node_exporter textfile collector)."""
+        with open(path, "wt") as f:
+            f.write(self.to_prometheus())
+
+# process-wide recorder used by the Connect module
+RECORDER = Recorder()
@@ -0,0 +1,269 @@
+"""In-memory memoization of callable results and parsed responses for the Connect module."""
+
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from .instrumentation import RECORDER
+from .buffers import json_default
+from .sharding import resolve
+
+# valid values for the memo flag passed to Connection
+MEMO_SCOPES = ("run", "process")
+
+# memoized results kept by the process-wide memo, least recently used are dropped first
+DEFAULT_MEMO_ENTRIES = 1024
+
+def call_key(name: str, kwargs: dict) -> str | None:
+    """
+    Memo key of a call of function name with kwargs, hashed from the json of its values
+    (RecordBuffers as their records, Futures as their results). None if a value isn't json
+    (a session, an open file), so the call isn't memoized: its repr differs for every object.
+    """
+    try:
+        # json, not codec: the text is hashed (see codec)
+        text = json.dumps([name, {k: resolve(v) for k, v in kwargs.items()}], sort_keys=True, default=json_default)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(text.encode()).hexdigest()
+
+class Memo():
+    """
+    Memoizes callable results by key (the hash computed by DataOBJ.memo_key).
+    Concurrent calls for the same key are coalesced: the first caller executes,
+    the others wait for its result instead of firing the same request again.
+    Note: results are shared between callers, so don't mutate them in place.
+    With ttl (seconds), results expire, so a memo can be shared between scheduled runs;
+    expired results are dropped whenever a new result is stored.
+    With max_entries, the least recently used results are dropped once the memo is full.
+    """
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stored = {}
+        self.results = OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_call(self, key: str, func):
+        """Return the memoized result for key, or call func() once and store it."""
+
+        start = time.perf_counter() if RECORDER.enabled else None
+
+        with self.lock:
+            if self.ttl is not None and key in self.results and time.monotonic() - self.stored[key] > self.ttl:
+                del self.results[key]
+                del self.stored[key]
+
+            hit = key in self.results
+            if hit:
+                self.hits += 1
+                result = self.results[key]
+                self.results.move_to_end(key)
+            else:
+                event = self.in_flight.get(key)
+                owner = event is None
+                if owner:
+                    event = threading.Event()
+                    self.in_flight[key] = event
+                    self.misses += 1
+
+        if start is not None:
+            outcome = "memo_hit" if hit else "memo_miss" if owner else "memo_coalesced"
+            RECORDER.emit("cache", "memo", start, cache=outcome, detail=key)
+
+        if hit:
+            return result
+
+        if not owner:
+            event.wait()
+
+            # if the owner failed there is no result, so we try again ourselves.
+            return self.get_or_call(key, func)
+
+        try:
+            result = func()
+            with self.lock:
+                self.results[key] = result
+                # stored is kept in the order results were stored, oldest first
+                self.stored.pop(key, None)
+                self.stored[key] = time.monotonic()
+                if self.ttl is not None:
+                    self.sweep()
+                if self.max_entries is not None:
+                    while len(self.results) > self.max_entries:
+                        old, _ = self.results.popitem(last=False)
+                        del self.stored[old]
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            event.set()
+
+        return result
+
+    def sweep(self):
+        """Drop expired results. Call with the lock held."""
+        now = time.monotonic()
+        expired = []
+        for key, stored in self.stored.items():
+            if now - stored <= self.ttl:
+                break
+            expired.append(key)
+        for key in expired:
+            del self.stored[key]
+            del self.results[key]
+
+    def clear(self):
+        """Forget all memoized results."""
+        with self.lock:
+            self.results.clear()
+            self.stored.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.results)
+        }
+
+# shared by all connections in this process (scope="process")
+PROCESS_MEMO = Memo(max_entries=DEFAULT_MEMO_ENTRIES)
+
+def get_memo(scope: str | Memo = None) -> Memo | None:
+    """Return the memo for the given scope. None disables memoization, a Memo instance is used as is."""
+    match scope:
+        case Memo():
+            return scope
+        case None | False:
+            return None
+        case "run":
+            return Memo()
+        case "process":
+            return PROCESS_MEMO
+        case _:
+            raise ValueError(f"memo scope must be one of {MEMO_SCOPES}, got {scope}")
+
+# default size of the process-wide parse memo
+DEFAULT_PARSE_MEMO_BYTES = 64 * 1024 * 1024
+
+# returned by ParseMemo.get for keys that aren't memoized (None is a valid parse result)
+MISSING = object()
+
+def copy_parsed(value):
+    """Copy the dicts and lists of a parsed response. Scalars are immutable and shared."""
+    if isinstance(value, dict):
+        return {k: copy_parsed(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [copy_parsed(v) for v in value]
+    return value
+
+class ParseMemo():
+    """
+    LRU memo of parsed responses, keyed by (doctype, encoding, hash of the body), for identical bodies
+    across fan-outs (empty pages, reference endpoints). Bounded by max_bytes of response bodies;
+    the least recently used entries are evicted first.
+
+    With copy (the default), callers get their own copy of the containers, so they can't
+    change what other callers get. Copying is much cheaper than parsing xml or csv, but about
+    as expensive as json.loads; with copy=False results are shared, so don't mutate them.
+    """
+    def __init__(self, max_bytes: int = DEFAULT_PARSE_MEMO_BYTES, copy: bool = True):
+        self.max_bytes = max_bytes
+        self.copy = copy
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, body: bytes, doctype: str, encoding: str = None) -> tuple:
+        """The same body decoded with another charset parses differently, so the encoding is part of the key."""
+        return (doctype, encoding and encoding.lower(), hashlib.blake2b(body, digest_size=16).digest())
+
+    def get(self, key: tuple):
+        """The memoized result for key, or MISSING."""
+        start = time.perf_counter() if RECORDER.enabled else None
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+
+        if start is not None:
+            RECORDER.emit("cache", "parse_memo", start, cache="parse_hit" if entry else "parse_miss", detail=key[0])
+
+        if entry is None:
+            return MISSING
+        return copy_parsed(entry[0]) if self.copy else entry[0]
+
+    def put(self, key: tuple, value, size: int):
+        """Memoize value, the parse result of a body of size bytes."""
+        if size > self.max_bytes:
+            return
+        if self.copy:
+            value = copy_parsed(value)
+
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.bytes += size
+
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        """Forget all parsed responses."""
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters, the hit rate and the memoized bytes."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "size": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes
+            }
+
+# shared by all connections in this process (parse_memo=True)
+PROCESS_PARSE_MEMO = ParseMemo()
+
+def get_parse_memo(value: bool | float | ParseMemo = None) -> ParseMemo | None:
+    """
+    Return the parse memo for Connection(parse_memo=...): None disables it, True is the
+    process-wide memo, a number is the size in MB of a memo for this connection.
+    """
+    match value:
+        case ParseMemo():
+            return value
+        case None | False:
+            return None
+        case True:
+            return PROCESS_PARSE_MEMO
+        case int() | float():
+            return ParseMemo(max_bytes=int(value * 1024 * 1024))
+        case _:
+            raise ValueError(f"parse_memo must be True, a size in MB or a ParseMemo, got {value}")
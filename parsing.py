@@ -1,11 +1,26 @@
-"""Parsing methods for different data types."""
+"""
+Parsing methods for different data types.
 
-import xmltodict
+parse_bytes parses response bodies as received (bytes). JSON and XML parsers read bytes
+directly and detect the encoding themselves (json: utf-8/16/32, xml: the charset of the
+Content-Type, or its declaration), so
+the body is never decoded into an intermediate str. CSV is decoded incrementally while it is read.
+
+detect_doctype works out the doctype of a response from its Content-Type and the first bytes
+of the body, so a body reaches the right parser even if it isn't what the request asked for.
+"""
+
+import io
+import re
 import csv
 
-def parse_xml(xml: str) -> dict:
-    """Parses xml string to dict"""
-    obj = xmltodict.parse(xml)
+from . import codec
+
+def parse_xml(xml: str | bytes, encoding: str = None) -> dict:
+    """Parses xml string (or bytes) to dict. encoding overrides the xml declaration of bytes."""
+    # imported on first use, most runs never parse xml
+    import xmltodict
+    obj = xmltodict.parse(xml, encoding=encoding) if encoding and isinstance(xml, bytes) else xmltodict.parse(xml)
     return obj
 
 def parse_html(html: str) -> dict:
@@ -15,4 +30,141 @@ def parse_html(html: str) -> dict:
 def parse_csv(text: str) -> list:
     return list(
         csv.DictReader(text.splitlines())
-    )
\ No newline at end of file
+    )
+
+NDJSON = "application/x-ndjson"
+
+# doctypes whose parsers take bytes and work out the encoding themselves
+BYTES_DOCTYPES = ("application/json", "application/xml", NDJSON)
+
+# response media types -> doctype. +json and +xml suffixes are handled in media_doctype
+MEDIA_TYPES = {
+    "application/json": "application/json",
+    "text/json": "application/json",
+    "application/xml": "application/xml",
+    "text/xml": "application/xml",
+    "text/csv": "text/csv",
+    "application/csv": "text/csv",
+    "text/html": "application/html",
+    "application/html": "application/html",
+    "application/x-ndjson": NDJSON,
+    "application/ndjson": NDJSON,
+    "application/jsonl": NDJSON,
+    "application/jsonlines": NDJSON,
+    "application/x-jsonlines": NDJSON,
+    "application/json-lines": NDJSON,
+}
+
+# bytes looked at by sniff
+SNIFF_BYTES = 512
+
+# how far sniff looks for the end of the first line of json
+SNIFF_LINE_BYTES = 64 * 1024
+
+def media_doctype(content_type: str | None) -> str | None:
+    """Doctype of a Content-Type header, None for missing or generic ones (text/plain, octet-stream)."""
+    if not content_type:
+        return None
+    media = content_type.split(";", 1)[0].strip().lower()
+    if media in MEDIA_TYPES:
+        return MEDIA_TYPES[media]
+    if media.endswith("+json"):
+        return "application/json"
+    if media.endswith("+xml"):
+        return "application/xml"
+    return None
+
+def sniff(body: bytes) -> str | None:
+    """
+    Doctype from the first bytes of body: json, ndjson (a complete value on the first line,
+    followed by another one), xml or html. None if it's none of those (csv, text, empty).
+    """
+    head = body[:SNIFF_BYTES].removeprefix(b"\xef\xbb\xbf").lstrip()
+    if not head:
+        return None
+
+    match head[:1]:
+        case b"{" | b"[":
+            end = body.find(b"\n", 0, SNIFF_LINE_BYTES)
+            if end != -1:
+                first = body[:end].strip().removeprefix(b"\xef\xbb\xbf")
+                following = body[end + 1:end + 1 + SNIFF_BYTES].lstrip()[:1]
+                if first[-1:] in (b"}", b"]") and following in (b"{", b"["):
+                    return NDJSON
+            return "application/json"
+        case b"<":
+            start = head[:64].lower()
+            if start.startswith((b"<!doctype html", b"<html")):
+                return "application/html"
+            return "application/xml"
+    return None
+
+def detect_doctype(content_type: str | None, body: bytes, fallback: str = None) -> str:
+    """
+    Doctype of a response. The body wins when it clearly is json, ndjson, xml or html, e.g. an
+    html error page served as application/json, or ndjson served as json. Otherwise the response
+    Content-Type is used, then fallback (the Content-Type of the request). Declared html is only
+    overridden by json, never by xml.
+    """
+    declared = media_doctype(content_type)
+    if declared == "text/csv":
+        # csv can start with anything
+        return declared
+
+    sniffed = sniff(body)
+    if declared == NDJSON and sniffed == "application/json":
+        # a single line
+        return declared
+    if declared == "application/html" and sniffed not in ("application/json", NDJSON):
+        # fragments and pages starting with a comment look like xml, but aren't
+        return declared
+    return sniffed or declared or fallback
+
+def parse_ndjson(body: bytes) -> list:
+    """Parse newline-delimited json (JSON lines), one line at a time."""
+    return [codec.loads(line) for line in io.BytesIO(body) if line.strip()]
+
+def declared_charset(content_type: str | None) -> str | None:
+    """The charset declared in a Content-Type header, if any."""
+    if content_type:
+        match = re.search(r'charset=["\']?([\w.:-]+)', content_type, re.IGNORECASE)
+        if match:
+            return match.group(1)
+    return None
+
+def needs_charset(doctype: str) -> bool:
+    """Whether a body of doctype has to be decoded with a known charset (and sniffed without one)."""
+    return doctype not in BYTES_DOCTYPES
+
+def parse_csv_bytes(body: bytes, encoding: str = None) -> list:
+    """Parse a CSV body, decoding it line by line instead of all at once."""
+    # BytesIO shares the buffer of body until written to, so this doesn't copy
+    stream = io.TextIOWrapper(io.BytesIO(body), encoding=encoding or "utf-8", errors="replace", newline="")
+    return list(csv.DictReader(stream))
+
+def parse_bytes(body: bytes | memoryview, doctype: str, encoding: str = None) -> dict | list | str:
+    """
+    Parse a response body (as received) according to its doctype. encoding is only used for
+    doctypes that need it (see needs_charset), utf-8 by default. Unknown doctypes are returned as str.
+    """
+    if isinstance(body, memoryview):
+        body = body.tobytes()
+
+    # json is utf-8 (or -16/-32) by definition, other declared charsets are decoded first
+    if doctype == "application/json" and encoding and not encoding.lower().startswith("utf"):
+        body = body.decode(encoding, errors="replace")
+
+    match doctype:
+        case "application/xml":
+            # a charset in the Content-Type takes precedence over the xml declaration
+            return parse_xml(body, encoding)
+        case "application/json":
+            try: return codec.loads(body)
+            except ValueError: return body if isinstance(body, str) else body.decode(encoding or "utf-8", errors="replace")
+        case "application/x-ndjson":
+            try: return parse_ndjson(body)
+            except ValueError: return body.decode(encoding or "utf-8", errors="replace")
+        case "text/csv":
+            return parse_csv_bytes(body, encoding)
+        case _:
+            return body.decode(encoding or "utf-8", errors="replace")
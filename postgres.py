@@ -0,0 +1,247 @@
+"""
+Bulk loads into Postgres with COPY FROM STDIN, for backfills that are too slow through PostgREST.
+
+Records are mapped to typed rows with a columns.ColumnLayout, and streamed per batch with COPY,
+as CSV or in Postgres' binary format. The layout is inferred from the first batch and checked
+against every following one: keys that first appear later are added as columns, and columns
+that get values of another type are widened (bigint to double precision, otherwise jsonb). Without a key, rows are
+copied straight into the table. With a key, each batch is copied into a temporary staging table
+and merged with INSERT ... ON CONFLICT (key) DO UPDATE, so re-running a backfill upserts.
+
+    with PostgresSink("contacts", dsn="postgresql://localhost/connect", key="id") as sink:
+        sink.write(records)
+
+Needs the optional psycopg (3) package. The table (and the unique index on the key) are
+created if they don't exist.
+"""
+
+import os
+
+from . import codec
+from .sinks import Sink, DEFAULT_BATCH_SIZE
+from .columns import infer_layout, get_layout, Column, ColumnLayout, JSONB, SQL_TYPES
+from .buffers import json_default
+from .schemas import SchemaRegistry
+
+FORMATS = ("csv", "binary")
+
+# bytes per COPY write
+COPY_CHUNK_SIZE = 1 << 20
+
+def widen(old: str, new: str) -> str:
+    """A type that holds the values of both column types."""
+    if {old, new} == {SQL_TYPES[int], SQL_TYPES[float]}:
+        return SQL_TYPES[float]
+    return JSONB
+
+def quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def dumps_json(value) -> str:
+    return codec.dumps(value, default=json_default)
+
+def csv_value(value, jsonb: bool = False) -> str:
+    """
+    A CSV field for COPY: NULL is an unquoted empty field, strings are always quoted.
+    Values of jsonb columns are always json, whatever their python type ('abc' is '"abc"').
+    """
+    match value:
+        case None:
+            return ""
+        case _ if jsonb:
+            return '"' + dumps_json(value).replace('"', '""') + '"'
+        case bool():
+            return "true" if value else "false"
+        case int() | float():
+            return repr(value)
+        case str():
+            return '"' + value.replace('"', '""') + '"'
+        case _:
+            return '"' + dumps_json(value).replace('"', '""') + '"'
+
+def iter_csv(rows: list, types: list, chunk_size: int = COPY_CHUNK_SIZE):
+    """Encode rows (tuples) as CSV, in chunks of about chunk_size bytes. types are the column types."""
+    jsonb = [t == JSONB for t in types]
+    lines, size = [], 0
+    for row in rows:
+        line = ",".join(csv_value(v, j) for v, j in zip(row, jsonb)) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield "".join(lines).encode()
+            lines, size = [], 0
+    if lines:
+        yield "".join(lines).encode()
+
+class PostgresSink(Sink):
+    """
+    Streams records into a Postgres table with COPY, batch_size rows per COPY (and transaction).
+        table   table name, created from the inferred layout if it doesn't exist
+        dsn     connection string, defaults to $DATABASE_URL
+        key     column name(s) to upsert on. Without a key, rows are appended.
+        format  "csv" or "binary"
+        layout  a fixed columns.ColumnLayout. Without one, the layout is inferred and evolves.
+    """
+
+    def __init__(self,
+            table: str,
+            dsn: str = None,
+            schema: str = "public",
+            key: str | list = None,
+            format: str = "csv",
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            layout: ColumnLayout = None,
+            ):
+        try:
+            import psycopg
+        except ImportError as e:
+            raise ImportError("toPostgres_ needs psycopg: pip install 'psycopg[binary]'") from e
+
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}")
+
+        super().__init__(table, batch_size)
+        self.table = table
+        self.schema = schema
+        self.key = [key] if isinstance(key, str) else key
+        self.format = format
+        self.layout = layout
+        self.fixed = layout is not None
+        self.inferred = None
+
+        # fingerprints every record of a batch (not a sample), so no new key goes unnoticed
+        self.registry = SchemaRegistry(sample_size=batch_size)
+        self.connection = psycopg.connect(dsn or os.environ["DATABASE_URL"])
+        self.staging = None
+        self.prepared = False
+
+    @property
+    def target(self) -> str:
+        return f"{quote_ident(self.schema)}.{quote_ident(self.table)}"
+
+    def prepare(self, batch: list):
+        """Infer the layout, create the table, the unique index on the key and the staging table."""
+        if self.layout is None:
+            self.layout = self.infer(batch)
+
+        names = [c.name for c in self.layout.columns]
+        missing = set(self.key or []) - set(names)
+        if missing:
+            raise ValueError(f"key column(s) {sorted(missing)} not found in records")
+
+        with self.connection.cursor() as cur:
+            cur.execute(self.layout.ddl(self.table, schema=self.schema))
+            if self.key:
+                index = quote_ident(f"{self.table}_{'_'.join(self.key)}_key")
+                cur.execute(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {index} ON {self.target} "
+                    f"({', '.join(quote_ident(k) for k in self.key)})"
+                )
+                # per session, emptied after every merge
+                self.staging = quote_ident(f"_stage_{self.table}")
+                cur.execute(
+                    f"CREATE TEMP TABLE IF NOT EXISTS {self.staging} "
+                    f"(LIKE {self.target} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+                )
+        self.connection.commit()
+        self.prepared = True
+
+    def infer(self, batch: list) -> ColumnLayout:
+        """The layout of batch (cached, see columns.infer_layout)."""
+        layout = infer_layout(batch, key=(self.schema, self.table), registry=self.registry)
+        self.inferred = layout.fingerprint
+        return layout
+
+    def evolve(self, batch: list):
+        """Add the columns of keys that first appear in batch and widen columns whose type changed."""
+        layout = self.infer(batch)
+
+        columns = {c.name: c for c in self.layout.columns}
+        if all(c in self.layout.columns for c in layout.columns):
+            return
+
+        statements = []
+        for c in layout.columns:
+            old = columns.get(c.name)
+            if old is None:
+                columns[c.name] = c
+                statements.append(f"ADD COLUMN IF NOT EXISTS {quote_ident(c.name)} {c.type}")
+            elif old.type != c.type and old.type != JSONB:
+                t = widen(old.type, c.type)
+                columns[c.name] = Column(old.name, old.path, t)
+                using = f"to_jsonb({quote_ident(c.name)})" if t == JSONB else f"{quote_ident(c.name)}::{t}"
+                statements.append(f"ALTER COLUMN {quote_ident(c.name)} TYPE {t} USING {using}")
+        if not statements:
+            return
+
+        print(f"[POSTGRES] {self.target}:", "; ".join(statements))
+        self.layout = get_layout(list(columns.values()))
+        with self.connection.cursor() as cur:
+            cur.execute(f"ALTER TABLE {self.target} " + ", ".join(statements))
+            if self.staging is not None:
+                # recreated from the altered table
+                cur.execute(f"DROP TABLE IF EXISTS {self.staging}")
+                cur.execute(
+                    f"CREATE TEMP TABLE {self.staging} "
+                    f"(LIKE {self.target} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+                )
+        self.connection.commit()
+
+    def copy(self, cur, table: str, rows: list):
+        """COPY rows into table."""
+        columns = self.layout.columns
+        names = ", ".join(quote_ident(c.name) for c in columns)
+
+        with cur.copy(f"COPY {table} ({names}) FROM STDIN (FORMAT {self.format})") as copy:
+            if self.format == "csv":
+                for chunk in iter_csv(rows, [c.type for c in columns]):
+                    copy.write(chunk)
+                return
+
+            from psycopg.types.json import Jsonb
+
+            copy.set_types([c.type for c in columns])
+            jsonb = [i for i, c in enumerate(columns) if c.type == JSONB]
+            for row in rows:
+                if jsonb:
+                    row = list(row)
+                    for i in jsonb:
+                        if row[i] is not None:
+                            row[i] = Jsonb(row[i], dumps=dumps_json)
+                copy.write_row(row)
+
+    def merge(self, cur):
+        """Upsert the staging table into the target. The last row of a key in a batch wins."""
+        names = [quote_ident(c.name) for c in self.layout.columns]
+        keys = [quote_ident(k) for k in self.key]
+        key = ", ".join(keys)
+        updates = ", ".join(f"{n} = EXCLUDED.{n}" for n in names if n not in keys)
+
+        cur.execute(
+            f"INSERT INTO {self.target} ({', '.join(names)}) "
+            f"SELECT DISTINCT ON ({key}) {', '.join(names)} FROM {self.staging} ORDER BY {key}, ctid DESC "
+            f"ON CONFLICT ({key}) DO " + (f"UPDATE SET {updates}" if updates else "NOTHING")
+        )
+
+    def write_batch(self, batch: list):
+        if not self.prepared:
+            self.prepare(batch)
+        elif not self.fixed:
+            self.evolve(batch)
+
+        compiled = self.layout.compiled
+        rows = [tuple(get(record) for _, get in compiled) for record in batch]
+
+        with self.connection.cursor() as cur:
+            if self.key:
+                self.copy(cur, self.staging, rows)
+                self.merge(cur)
+            else:
+                self.copy(cur, self.target, rows)
+        self.connection.commit()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.connection.close()
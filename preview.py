@@ -0,0 +1,98 @@
+"""
+Previews of response data for logging.
+
+preview() renders json-like text of only the first and last few items of every list and dict
+(and a limited depth), so printing a result costs the same for 10 records as for 10 million.
+Elided items show up as a "... n more" line. RecordBuffers are previewed like lists, without
+reading the spilled records in between; Futures (see sharding) as their result once done.
+
+    print(preview(records))             indented, like json.dumps(records, indent=2)
+    print(preview(records, indent=None))  on one line
+"""
+
+from concurrent.futures import Future
+from itertools import islice
+
+from . import codec
+from .buffers import RecordBuffer
+
+# items shown at the start and the end of every list and dict
+HEAD = 3
+TAIL = 2
+
+# containers nested deeper than this are summarised
+MAX_DEPTH = 4
+
+# strings are cut after this many characters
+MAX_STRING = 200
+
+def scalar(value) -> str:
+    match value:
+        case str():
+            if len(value) > MAX_STRING:
+                value = value[:MAX_STRING] + f"...({len(value) - MAX_STRING} more chars)"
+            return codec.dumps(value)
+        case bool() | int() | float() | None:
+            return codec.dumps(value)
+        case _:
+            return codec.dumps(repr(value))
+
+def edges(value: dict | list | tuple | RecordBuffer, head: int, tail: int) -> tuple:
+    """(first head items, number elided, last tail items) of a container."""
+    n = len(value)
+    if n <= head + tail:
+        items = list(value.items()) if isinstance(value, dict) else list(value)
+        return items, 0, []
+
+    if isinstance(value, dict):
+        first = list(islice(value.items(), head))
+        last = list(islice(reversed(value.items()), tail))[::-1]
+    else:
+        # indexed, so spilled records of a RecordBuffer in between are never read
+        first = [value[i] for i in range(head)]
+        last = [value[i] for i in range(n - tail, n)]
+    return first, n - head - tail, last
+
+def render(value, head: int, tail: int, depth: int, indent: int | None, level: int = 0) -> str:
+    if isinstance(value, Future):
+        if not value.done():
+            return codec.dumps("<pending>")
+        value = value.result()
+
+    match value:
+        case dict():
+            opening, closing, unit = "{", "}", "keys"
+        case list() | tuple() | RecordBuffer():
+            opening, closing, unit = "[", "]", "items"
+        case _:
+            return scalar(value)
+
+    if len(value) == 0:
+        return opening + closing
+    if level >= depth:
+        return f"{opening}...{len(value)} {unit}{closing}"
+
+    def item(v):
+        return render(v, head, tail, depth, indent, level + 1)
+
+    first, elided, last = edges(value, head, tail)
+    if isinstance(value, dict):
+        parts = [f"{codec.dumps(str(k))}: {item(v)}" for k, v in first]
+        tail_parts = [f"{codec.dumps(str(k))}: {item(v)}" for k, v in last]
+    else:
+        parts = [item(v) for v in first]
+        tail_parts = [item(v) for v in last]
+    if elided:
+        parts.append(f"... {elided} more {unit}")
+    parts += tail_parts
+
+    if indent is None:
+        return opening + ", ".join(parts) + closing
+
+    pad = " " * indent * level
+    inner = pad + " " * indent
+    return opening + "\n" + ",\n".join(inner + p for p in parts) + "\n" + pad + closing
+
+def preview(data, head: int = HEAD, tail: int = TAIL, depth: int = MAX_DEPTH, indent: int | None = 2) -> str:
+    """Text of data with at most head + tail items per container and depth levels."""
+    return render(data, head, tail, depth, indent)
@@ -0,0 +1,101 @@
+"""
+Registry of the methods that can be called from config.
+Introspection (dir, signatures, return annotations) runs once per class,
+so dispatching a key during Connection.evaluate is a dict lookup.
+"""
+
+import inspect
+from dataclasses import dataclass
+from functools import cache
+
+def is_callable_key(name: str) -> bool:
+    """Callables are designated with _<function_name>"""
+    return len(name) > 1 and name[0] == "_" and name[1] != "_"
+
+def is_writeable_key(name: str) -> bool:
+    """Writeables are designated with <function_name>_"""
+    return len(name) > 1 and name[-1] == "_" and name[-2] != "_"
+
+@dataclass(frozen=True)
+class Capability():
+    """Introspected metadata of a method callable from config."""
+    name: str
+    signature: inspect.Signature
+    args: tuple
+    return_type: object
+    description: str
+
+    def to_dict(self) -> dict:
+        """Json-serialisable representation, e.g. for the UI."""
+        return {
+            "name": self.name,
+            "signature": str(self.signature),
+            "args": list(self.args),
+            "return_type": None if self.return_type is None else str(self.return_type),
+            "description": self.description
+        }
+
+def strip_self(signature: inspect.Signature) -> inspect.Signature:
+    """Remove the self parameter from an unbound method signature."""
+    parameters = list(signature.parameters.values())
+    if parameters and parameters[0].name == "self":
+        parameters = parameters[1:]
+    return signature.replace(parameters=parameters)
+
+# parameters that config values are passed to, like getfullargspec().args
+POSITIONAL = (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+
+@cache
+def function_capability(func) -> Capability:
+    """
+    Introspect a function once. Follows add_error wrappers via __wrapped__. args are the
+    positional parameters (no *args, **kwargs or keyword-only ones), return_type is None
+    when the function isn't annotated.
+    """
+    signature = strip_self(inspect.signature(func))
+    return_type = signature.return_annotation
+    return Capability(
+        name=func.__name__,
+        signature=signature,
+        args=tuple(name for name, parameter in signature.parameters.items() if parameter.kind in POSITIONAL),
+        return_type=None if return_type is inspect.Signature.empty else return_type,
+        description=inspect.getdoc(func)
+        )
+
+@cache
+def class_registry(cls: type, predicate) -> dict:
+    """Return {name: Capability} for all methods of cls whose name satisfies predicate."""
+    return {
+        name: function_capability(getattr(cls, name))
+        for name in dir(cls)
+        if predicate(name) and callable(getattr(cls, name))
+    }
+
+def function_args(func) -> tuple:
+    """Return the positional argument names of a (bound) function, excluding self. Cached per function."""
+    return function_capability(getattr(func, "__func__", func)).args
+
+class Registry():
+    """Bound methods of an instance that can be called from config, by name."""
+    def __init__(self, obj, predicate):
+        self.capabilities = class_registry(type(obj), predicate)
+
+        # getattr on the instance, so instance overrides are picked up.
+        self.bound = {name: getattr(obj, name) for name in self.capabilities}
+
+    def __contains__(self, name) -> bool:
+        return name in self.bound
+
+    def __getitem__(self, name):
+        return self.bound[name]
+
+    def __iter__(self):
+        return iter(self.bound)
+
+    def names(self) -> list:
+        """Return the names of all registered methods."""
+        return list(self.bound)
+
+    def to_dict(self) -> dict:
+        """Return {name: capability dict}, e.g. for the UI."""
+        return {name: capability.to_dict() for name, capability in self.capabilities.items()}
@@ -0,0 +1,178 @@
+"""
+Record/replay transport for Callables._request.
+
+RecordTransport sends requests as usual and appends every request/response pair to a log.
+ReplayTransport answers requests from such a log without touching the network, at full speed
+or with the recorded latency. Both are requests transport adapters:
+
+    Connection(spec=spec, transport=RecordTransport("run.log")).run()
+    Connection(spec=spec, transport=ReplayTransport("run.log", latency=True)).run()
+
+The log is append-only: per exchange, a json header line followed by the raw response body
+as received on the wire (still compressed), so replayed responses are decoded like real ones.
+Requests are matched on method, url and a hash of the body. Identical requests are replayed
+in recorded order; once they run out, the last response is repeated.
+
+Logs don't contain credentials: values of secret query parameters (SECRET_PARAMETERS) and
+the connection's key and password (see Callables.redact) are replaced in urls by <hidden>,
+and credential headers (REDACTED_HEADERS) are left out of recorded responses. Replayed
+requests are redacted the same way before they are matched.
+"""
+
+import io
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import deque
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError
+from urllib3 import HTTPResponse
+
+# query parameters whose values are replaced in recorded urls
+SECRET_PARAMETERS = (
+    "key", "api_key", "apikey", "access_key", "token", "access_token", "refresh_token",
+    "auth", "password", "secret", "client_secret", "signature", "sig"
+)
+
+# response headers left out of the log
+REDACTED_HEADERS = ("set-cookie", "set-cookie2", "authorization", "proxy-authorization", "cookie", "x-api-key")
+
+SECRET_QUERY = re.compile(
+    r"([?&](?:" + "|".join(map(re.escape, SECRET_PARAMETERS)) + r")=)[^&#]*",
+    re.IGNORECASE
+)
+
+def redact_url(url: str, censor=None) -> str:
+    """url with secret query parameters and, with censor (a str -> str callable), other secrets hidden."""
+    url = SECRET_QUERY.sub(r"\1<hidden>", url)
+    return censor(url) if censor is not None else url
+
+def redact_headers(headers) -> dict:
+    """Response headers without credentials."""
+    return {k: v for k, v in headers.items() if k.lower() not in REDACTED_HEADERS}
+
+def body_hash(body) -> str | None:
+    """Hash of a request body. Streamed bodies (generators, files) can't be hashed and match any body."""
+    if body is None:
+        return ""
+    if isinstance(body, str):
+        body = body.encode()
+    if isinstance(body, bytes):
+        return hashlib.sha1(body).hexdigest()
+    return None
+
+def exchange_key(method: str, url: str, body: str | None) -> tuple:
+    return (method, url, body)
+
+def read_log(path: str):
+    """Yield (header, offset of the body) for every exchange in a log."""
+    with open(path, "rb") as f:
+        while line := f.readline():
+            header = json.loads(line)
+            offset = f.tell()
+            f.seek(header["length"], io.SEEK_CUR)
+            yield header, offset
+
+def make_raw(body: bytes, header: dict, method: str) -> HTTPResponse:
+    """urllib3 response over a recorded body, decoded on read like a live one."""
+    return HTTPResponse(
+        body=io.BytesIO(body),
+        headers=header["headers"],
+        status=header["status"],
+        reason=header["reason"],
+        request_method=method,
+        preload_content=False,
+        decode_content=True
+    )
+
+class RecordTransport(HTTPAdapter):
+    """
+    Sends requests over the network and appends the exchanges to a log.
+    censor hides secrets in urls; by default, Connection sets it to its Callables.redact.
+    """
+
+    def __init__(self, path: str, censor=None, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.censor = censor
+        self.lock = threading.Lock()
+        self.recorded = 0
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        res = super().send(request, **{**kwargs, "stream": True})
+
+        # raw bytes as received, still encoded
+        body = res.raw.read(decode_content=False)
+        latency = time.perf_counter() - start
+
+        header = {
+            "method": request.method,
+            "url": redact_url(request.url, self.censor),
+            "body": body_hash(request.body),
+            "status": res.status_code,
+            "reason": res.reason,
+            "headers": redact_headers(res.raw.headers),
+            "latency": latency,
+            "length": len(body)
+        }
+        with self.lock:
+            with open(self.path, "ab") as f:
+                f.write(json.dumps(header).encode() + b"\n")
+                f.write(body)
+            self.recorded += 1
+
+        return self.build_response(request, make_raw(body, header, request.method))
+
+class ReplayTransport(HTTPAdapter):
+    """
+    Answers requests from a log. With latency, each response takes as long as when it was recorded.
+    censor should hide the same secrets as when the log was recorded (see RecordTransport).
+    """
+
+    def __init__(self, path: str, latency: bool = False, censor=None, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.censor = censor
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.replayed = 0
+
+        # key -> recorded (header, offset) in order, bodies are read on demand
+        self.exchanges = {}
+        for header, offset in read_log(path):
+            key = exchange_key(header["method"], header["url"], header["body"])
+            self.exchanges.setdefault(key, deque()).append((header, offset))
+
+    def lookup(self, request) -> tuple:
+        """Next recorded exchange for request."""
+        digest = body_hash(request.body)
+        url = redact_url(request.url, self.censor)
+        keys = [exchange_key(request.method, url, digest)]
+        if digest is None:
+            keys += [k for k in self.exchanges if k[:2] == (request.method, url)]
+
+        with self.lock:
+            for key in keys:
+                recorded = self.exchanges.get(key)
+                if recorded:
+                    self.replayed += 1
+                    return recorded.popleft() if len(recorded) > 1 else recorded[0]
+
+        raise ConnectionError(f"No recorded response for {request.method} {url}", request=request)
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        header, offset = self.lookup(request)
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            body = f.read(header["length"])
+
+        if self.latency:
+            time.sleep(max(0.0, header["latency"] - (time.perf_counter() - start)))
+
+        return self.build_response(request, make_raw(body, header, request.method))
@@ -0,0 +1,292 @@
+"""
+Scheduler for running many connector specs on a shared worker pool.
+
+    scheduler = Scheduler(workers=8, per_host=4, per_tenant=2)
+    scheduler.add(Job("hubspot-contacts", spec, interval="15m", tenant="acme", priority=1))
+    scheduler.start()
+    ...
+    print(scheduler.metrics())
+    scheduler.stop()
+
+Jobs are dispatched by due time and priority (lower runs first). A job is only dispatched when
+a worker is free and its tenant and all hosts it talks to are below their concurrency limits;
+otherwise it stays queued (and counts towards queue depth and lag). A job never overlaps itself.
+Runs of a tenant share keep-alive sessions (see SessionPool) and a memo, whose results expire
+after cache_ttl seconds. Nothing is shared between tenants.
+"""
+
+import re
+import time
+import heapq
+import threading
+import itertools
+from urllib.parse import urlparse
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+
+from . import regex
+from .memo import Memo
+from .sessions import SessionPool
+from .connection import Connection
+
+INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+INTERVAL_ALIASES = {"@minutely": 60, "@hourly": 3600, "@daily": 86400, "@weekly": 604800}
+
+def parse_interval(interval: int | float | str) -> float:
+    """Parse an interval: seconds, "<n>[s|m|h|d]", "@every <n>[s|m|h|d]", "@hourly", "@daily", ..."""
+
+    if isinstance(interval, int | float):
+        return float(interval)
+
+    interval = interval.strip()
+    if interval in INTERVAL_ALIASES:
+        return float(INTERVAL_ALIASES[interval])
+
+    match = re.fullmatch(r"(?:@every\s+)?(\d+(?:\.\d+)?)\s*([smhd]?)", interval)
+    if match is None:
+        raise ValueError(f"Invalid interval: {interval}. Use e.g. 30, '5m', '@every 1h' or '@daily'")
+    return float(match.group(1)) * INTERVAL_UNITS[match.group(2) or "s"]
+
+def spec_hosts(spec) -> set:
+    """Return the hosts of all literal urls in a spec. Templated hosts ({var}) can't be known upfront."""
+    match spec:
+        case dict():
+            return set().union(*(spec_hosts(v) for v in spec.values()))
+        case list():
+            return set().union(*(spec_hosts(v) for v in spec))
+        case str() if regex.is_url(spec):
+            host = urlparse(spec).netloc
+            return {host} if host and "{" not in host else set()
+        case _:
+            return set()
+
+@dataclass(eq=False)
+class Job():
+    """A connector spec that runs every interval."""
+    name: str
+    spec: dict
+    interval: int | float | str = 3600
+    tenant: str = "default"
+    priority: int = 0
+    kwargs: dict = field(default_factory=dict)
+
+    # bookkeeping, set by the Scheduler
+    next_run: float = 0.0
+    hosts: set = field(default_factory=set)
+    runs: int = 0
+    failures: int = 0
+    last_error: BaseException = None
+    last_duration: float = None
+
+    def __post_init__(self):
+        self.interval = parse_interval(self.interval)
+        self.hosts = spec_hosts(self.spec)
+
+class Scheduler():
+    """Runs jobs on a shared thread pool, with per-host and per-tenant concurrency limits."""
+
+    def __init__(self,
+        workers: int = 8,
+        per_host: int = 4,
+        per_tenant: int = 4,
+        cache_ttl: float = 60,
+        resolution: float = 0.05,
+        ):
+        self.workers = workers
+        self.per_host = per_host
+        self.per_tenant = per_tenant
+        self.cache_ttl = cache_ttl
+        self.resolution = resolution
+
+        self.queue = []
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="connect-worker")
+
+        # shared between runs
+        self.sessions = SessionPool()
+        self.memos = {}
+
+        # concurrency bookkeeping
+        self.running = set()
+        self.running_hosts = {}
+        self.running_tenants = {}
+
+        # metrics
+        self.dispatched = 0
+        self.completed = 0
+        self.failed = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+
+    def add(self, job: Job, start_at: float = None) -> Job:
+        """Schedule a job. By default it is due immediately."""
+        job.next_run = time.time() if start_at is None else start_at
+        with self.lock:
+            heapq.heappush(self.queue, (job.next_run, job.priority, next(self.sequence), job))
+        return job
+
+    def remove(self, name: str):
+        """Unschedule all jobs with this name. Running jobs finish."""
+        with self.lock:
+            self.queue = [item for item in self.queue if item[3].name != name]
+            heapq.heapify(self.queue)
+
+    def admit(self, job: Job) -> bool:
+        """Whether job can run now, given the concurrency limits. Call with self.lock held."""
+        return (
+            job not in self.running and
+            len(self.running) < self.workers and
+            self.running_tenants.get(job.tenant, 0) < self.per_tenant and
+            all(self.running_hosts.get(host, 0) < self.per_host for host in job.hosts)
+        )
+
+    def tick(self, now: float = None) -> int:
+        """Dispatch all due jobs that can run now. Returns the number of dispatched jobs."""
+
+        now = time.time() if now is None else now
+        dispatched = 0
+
+        with self.lock:
+            due = []
+            while self.queue and self.queue[0][0] <= now:
+                due.append(heapq.heappop(self.queue))
+
+            # highest priority first, then the longest waiting
+            due.sort(key=lambda item: (item[1], item[0]))
+
+            deferred = []
+            for item in due:
+                job = item[3]
+                if not self.admit(job):
+                    deferred.append(item)
+                    continue
+
+                self.acquire(job)
+                lag = now - job.next_run
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+                self.total_lag += lag
+                self.dispatched += 1
+                dispatched += 1
+
+                # next run is one interval after the scheduled time, but never in the past
+                job.next_run = max(job.next_run + job.interval, now)
+                heapq.heappush(self.queue, (job.next_run, job.priority, next(self.sequence), job))
+                self.pool.submit(self.execute, job)
+
+            for item in deferred:
+                heapq.heappush(self.queue, item)
+
+        return dispatched
+
+    def acquire(self, job: Job):
+        """Take concurrency slots for job. Call with self.lock held."""
+        self.running.add(job)
+        self.running_tenants[job.tenant] = self.running_tenants.get(job.tenant, 0) + 1
+        for host in job.hosts:
+            self.running_hosts[host] = self.running_hosts.get(host, 0) + 1
+
+    def release(self, job: Job):
+        """Give back concurrency slots of job."""
+        with self.lock:
+            self.running.discard(job)
+            self.running_tenants[job.tenant] -= 1
+            for host in job.hosts:
+                self.running_hosts[host] -= 1
+
+    def memo(self, tenant: str) -> Memo:
+        """Memo shared by all runs of a tenant."""
+        with self.lock:
+            if tenant not in self.memos:
+                self.memos[tenant] = Memo(ttl=self.cache_ttl)
+            return self.memos[tenant]
+
+    def execute(self, job: Job):
+        """Run a job on a worker."""
+        start = time.perf_counter()
+        try:
+            Connection(
+                spec=job.spec,
+                memo=self.memo(job.tenant),
+                sessions=self.sessions,
+                tenant=job.tenant,
+                **job.kwargs
+                ).run()
+            job.last_error = None
+            with self.lock:
+                self.completed += 1
+        except BaseException as e:
+            print(f"[SCHEDULER] job {job.name} failed:", repr(e))
+            job.failures += 1
+            job.last_error = e
+            with self.lock:
+                self.failed += 1
+        finally:
+            job.runs += 1
+            job.last_duration = time.perf_counter() - start
+            self.release(job)
+
+            # slots were freed, so deferred jobs may run now
+            if not self.stopped.is_set():
+                self.tick()
+
+    def loop(self):
+        """Dispatch due jobs until stopped."""
+        while not self.stopped.is_set():
+            self.tick()
+            self.stopped.wait(self.resolution)
+
+    def start(self):
+        """Run the scheduler in a background thread."""
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.loop, daemon=True, name="connect-scheduler")
+        self.thread.start()
+        return self
+
+    def stop(self, wait: bool = True):
+        """Stop dispatching. With wait, block until running jobs finish."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.pool.shutdown(wait=wait)
+        self.sessions.close()
+
+    def metrics(self, now: float = None) -> dict:
+        """Queue depth, lag and concurrency metrics."""
+        now = time.time() if now is None else now
+        with self.lock:
+            due = [item for item in self.queue if item[0] <= now]
+            return {
+                "scheduled": len(self.queue),
+                "queue_depth": len(due),
+                "oldest_due_lag": max((now - item[0] for item in due), default=0.0),
+                "last_lag": self.last_lag,
+                "max_lag": self.max_lag,
+                "mean_lag": self.total_lag / self.dispatched if self.dispatched else 0.0,
+                "running": len(self.running),
+                "running_per_tenant": {k: v for k, v in self.running_tenants.items() if v},
+                "running_per_host": {k: v for k, v in self.running_hosts.items() if v},
+                "dispatched": self.dispatched,
+                "completed": self.completed,
+                "failed": self.failed,
+                "sessions": self.sessions.stats()
+            }
+
+    def to_prometheus(self, prefix: str = "connect_scheduler") -> str:
+        """Return numeric metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, value in self.metrics().items():
+            if isinstance(value, dict):
+                label = "tenant" if name == "running_per_tenant" else "host"
+                for k, v in value.items():
+                    if name == "sessions":
+                        lines.append(f"{prefix}_sessions_{k} {v}")
+                    else:
+                        lines.append(f'{prefix}_{name}{{{label}="{k}"}} {v}')
+            else:
+                lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,197 @@
+"""
+Schema registry: skips re-inference on endpoints whose shape hasn't changed.
+
+Inferring a schema with Hypothesis walks every record. The registry keeps the inferred
+ComplexType per key (e.g. connection and endpoint) together with a structural fingerprint of a
+small sample of records. Full inference only runs when the fingerprint changes; a changed
+fingerprint for a known key is recorded as a drift event.
+
+    schema = SCHEMAS.schema(("connection-id", "contacts"), records)
+
+A sample can miss rare keys, so a shape change that only shows up outside the sample is only
+picked up once it reaches the sample. Callers that can't afford that (e.g. column layouts,
+where a missed key is a dropped column) fingerprint every record with sample_size.
+"""
+
+import time
+import json
+import hashlib
+import threading
+from itertools import islice
+from dataclasses import dataclass, field
+
+from .instrumentation import RECORDER
+
+# records in a fingerprint sample
+SAMPLE_SIZE = 16
+
+# kept drift events per registry
+MAX_DRIFT_EVENTS = 1000
+
+def sample(records, size: int = SAMPLE_SIZE) -> list:
+    """Evenly spaced records from a list, or the first size records of any other iterable."""
+    if isinstance(records, dict):
+        return [records]
+    if isinstance(records, list):
+        step = max(1, len(records) // size)
+        return records[::step][:size]
+    return list(islice(records, size))
+
+def shape(value, prefix: str = "", paths: set = None) -> set:
+    """
+    Add the "<path>:<type>" strings of value to paths. Nulls are skipped, list items share
+    a path ("[]"), and dicts of dicts are treated as dynamic keys, like Hypothesis.collapse_nested_dicts.
+    """
+    paths = set() if paths is None else paths
+    match value:
+        case None:
+            pass
+        case dict() if value and all(isinstance(v, dict) for v in value.values()):
+            paths.add(f"{prefix}:dynamic")
+            for v in value.values():
+                shape(v, prefix + ".{name}", paths)
+        case dict():
+            paths.add(f"{prefix}:dict")
+            for k, v in value.items():
+                shape(v, f"{prefix}.{k}", paths)
+        case list():
+            paths.add(f"{prefix}:list")
+            for v in value:
+                shape(v, prefix + "[]", paths)
+        case _:
+            paths.add(f"{prefix}:{type(value).__name__}")
+    return paths
+
+def fingerprint(records, size: int = SAMPLE_SIZE) -> tuple[str, set]:
+    """Structural fingerprint of a sample of records. Returns (hash, paths)."""
+    paths = set()
+    for record in sample(records, size):
+        shape(record, "", paths)
+    return hashlib.sha1(json.dumps(sorted(paths)).encode()).hexdigest(), paths
+
+def infer_schema(records):
+    """Full inference with Hypothesis."""
+    from .inference import Hypothesis
+
+    hypothesis = Hypothesis()
+    for record in ([records] if isinstance(records, dict) else records):
+        hypothesis.update(record)
+    return hypothesis.current
+
+@dataclass
+class SchemaEntry():
+    """The inferred schema of a key and the fingerprint it was inferred for."""
+    fingerprint: str
+    paths: set
+    schema: object
+    inferred_at: float
+    hits: int = 0
+
+@dataclass
+class DriftEvent():
+    """A changed fingerprint for a known key."""
+    key: str
+    time: float
+    old: str
+    new: str
+    added: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "key": self.key,
+            "time": self.time,
+            "old": self.old,
+            "new": self.new,
+            "added": self.added,
+            "removed": self.removed
+        }
+
+class SchemaRegistry():
+    """Inferred schemas by key, re-inferred only when the fingerprint of the data changes."""
+
+    def __init__(self, sample_size: int = SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self.entries = {}
+        self.drift = []
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def entry_key(key) -> str:
+        return key if isinstance(key, str) else "/".join(str(k) for k in key)
+
+    def schema(self, key, records, infer=infer_schema, sample_size: int = None):
+        """
+        Return the schema of records for key. infer(records) is only called when the
+        fingerprint differs from the one the stored schema was inferred for.
+        sample_size overrides the registry's sample size for this call.
+        """
+        key = self.entry_key(key)
+        start = time.perf_counter() if RECORDER.enabled else None
+        digest, paths = fingerprint(records, sample_size or self.sample_size)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.fingerprint == digest:
+                entry.hits += 1
+                self.hits += 1
+                hit = True
+            else:
+                self.misses += 1
+                hit = False
+
+        if start is not None:
+            RECORDER.emit("cache", "schema", start, cache="schema_hit" if hit else "schema_miss", detail=key)
+        if hit:
+            return entry.schema
+
+        schema = infer(records)
+        with self.lock:
+            self.entries[key] = SchemaEntry(digest, paths, schema, time.time())
+
+        if entry is not None:
+            self.record_drift(key, entry, digest, paths)
+        return schema
+
+    def record_drift(self, key: str, entry: SchemaEntry, new: str, paths: set):
+        """Record a drift event."""
+        event = DriftEvent(
+            key=key,
+            time=time.time(),
+            old=entry.fingerprint,
+            new=new,
+            added=sorted(paths - entry.paths),
+            removed=sorted(entry.paths - paths)
+        )
+        print("[SCHEMA] drift in", key, "added:", event.added, "removed:", event.removed)
+
+        with self.lock:
+            self.drift.append(event)
+            del self.drift[:-MAX_DRIFT_EVENTS]
+
+        if RECORDER.enabled:
+            RECORDER.emit("schema", "drift", time.perf_counter(), detail=json.dumps(event.to_dict()))
+
+    def get(self, key):
+        """Return the stored entry for key, or None."""
+        return self.entries.get(self.entry_key(key))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.drift.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss/drift counters."""
+        return {
+            "schemas": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "drift": len(self.drift)
+        }
+
+# process-wide registry
+SCHEMAS = SchemaRegistry()
@@ -0,0 +1,55 @@
+"""Shared pool of requests sessions for the Connect module."""
+
+import json
+import threading
+
+class SessionPool():
+    """
+    requests sessions shared by (tenant, auth, headers), so runs that talk to the same API
+    reuse connections (keep-alive) instead of opening new ones for every request.
+    Sessions (and their cookies) are never shared between tenants.
+    Sessions are shared between threads; don't change their auth or headers.
+    """
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    @staticmethod
+    def session_key(auth, headers: dict, tenant: str = None) -> str:
+        """Key for a session configuration."""
+        return json.dumps([tenant, auth, headers], sort_keys=True, default=str)
+
+    def get(self, auth, headers: dict, tenant: str = None):
+        """Return the session for (tenant, auth, headers), creating it on first use."""
+        import requests
+
+        key = self.session_key(auth, headers, tenant)
+        with self.lock:
+            session = self.sessions.get(key)
+            if session is not None:
+                self.reused += 1
+                return session
+
+            session = requests.Session()
+            session.auth = auth
+            session.headers.update(headers)
+            self.sessions[key] = session
+            self.created += 1
+            return session
+
+    def close(self):
+        """Close all sessions."""
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
+    def stats(self) -> dict:
+        """Return created/reused counters."""
+        return {
+            "sessions": len(self.sessions),
+            "created": self.created,
+            "reused": self.reused
+        }
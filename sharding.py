@@ -0,0 +1,112 @@
+"""
+Process-pool parsing for large fan-outs.
+
+Parsing big XML or CSV bodies (xmltodict, csv.DictReader) is CPU-bound, so threads don't help.
+ParsePool hands raw response bodies to worker processes. Bodies are passed through spool files
+(on tmpfs /dev/shm when available) instead of being pickled. Workers are started with
+forkserver (spawn where it isn't available), so they don't inherit the sessions, locks and
+threads of the connector.
+
+The connector uses it for list-valued callables: Connection(spec, parse_workers=4).
+"""
+
+import os
+import tempfile
+import threading
+from concurrent.futures import Future
+
+from . import parsing
+from .errors import APIConnectorError, PARSE_ERROR
+
+# spool directory for response bodies. /dev/shm is memory-backed on linux.
+SPOOL_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+def parse_spooled(file_path: str, encoding: str, doctype: str):
+    """Worker: read a spooled body and parse it."""
+    with open(file_path, "rb") as f:
+        body = f.read()
+    return parsing.parse_bytes(body, doctype, encoding)
+
+def result(future: Future):
+    """Result of a deferred parse. Errors are raised like Callables.parse_doctype raises them."""
+    try:
+        return future.result()
+    except Exception as e:
+        raise APIConnectorError(PARSE_ERROR, code=472, error=e) from e
+
+def resolve(data):
+    """Replace Futures in a list (as returned by Callables.caller) with their results, in order."""
+    if isinstance(data, Future):
+        return result(data)
+    if isinstance(data, list):
+        return [result(item) if isinstance(item, Future) else item for item in data]
+    return data
+
+class ParsePool():
+    """Parses response bodies in worker processes."""
+
+    def __init__(self, workers: int = None):
+        # imported here, multiprocessing is slow to import and most runs don't need it
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import get_context, get_all_start_methods
+
+        # a forked worker would copy the locks and sessions of the connector's threads
+        method = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+        self.workers = workers or os.cpu_count()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context(method))
+
+    def spool(self, body: bytes) -> str:
+        """Write body to a spool file. Returns its path."""
+        fd, file_path = tempfile.mkstemp(prefix="connect-", suffix=".body", dir=SPOOL_DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        return file_path
+
+    def submit(self, body: bytes, doctype: str, encoding: str = None) -> Future:
+        """Parse body in a worker. The spool file is removed once the worker is done."""
+        file_path = self.spool(body)
+        future = self.executor.submit(parse_spooled, file_path, encoding, doctype)
+        future.add_done_callback(lambda _: os.remove(file_path))
+        return future
+
+    def shutdown(self):
+        """Wait for running parses and stop the workers."""
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+class DeferredParsing():
+    """
+    Context in which Callables.parse_doctype hands bodies to the parse pool and returns
+    Futures, so that the next requests are sent while earlier bodies are being parsed.
+    The flag is per thread.
+    """
+    def __init__(self):
+        self.local = threading.local()
+
+    @property
+    def active(self) -> bool:
+        return getattr(self.local, "active", False)
+
+    def __enter__(self):
+        self.local.active = True
+        return self
+
+    def __exit__(self, *exc):
+        self.local.active = False
+
+def get_parse_pool(parse_workers: int | ParsePool = None) -> ParsePool | None:
+    """Return a ParsePool for the parse_workers flag passed to Connection. None disables it."""
+    match parse_workers:
+        case ParsePool():
+            return parse_workers
+        case None | 0 | False:
+            return None
+        case int():
+            return ParsePool(parse_workers)
+        case _:
+            raise ValueError(f"parse_workers must be an int or a ParsePool, got {parse_workers}")
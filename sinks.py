@@ -0,0 +1,209 @@
+"""
+Streaming local sinks for staging and backfills: NDJSON (optionally gzipped), CSV and Parquet.
+
+Records are encoded and written in large batches. Sinks stay open for the duration of a run
+(see Writeables.sink), so fanned-out writeable calls append to the same file. Files are
+created, or truncated, when a run first writes to them: every run writes them afresh.
+Writeables only open paths under Connection(output_dir=...) (see helpers.confine).
+Parquet needs the optional pyarrow package; its schema is inferred with inference.Hypothesis.
+"""
+
+import io
+import csv
+import importlib.util
+import gzip as gzip_module
+from types import NoneType, UnionType
+from typing import get_args
+
+from . import codec
+from .buffers import RecordBuffer, json_default
+
+# records per write
+DEFAULT_BATCH_SIZE = 10000
+
+def iter_records(data):
+    """Iterate the records in data: a list or RecordBuffer of records, or a single record."""
+    if isinstance(data, list | tuple | RecordBuffer):
+        yield from data
+    elif data is not None:
+        yield data
+
+def batched(records, size: int):
+    """Yield lists of up to size records."""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def to_cell(value):
+    """Nested values are stored as json text in flat formats."""
+    if isinstance(value, dict | list | RecordBuffer):
+        return codec.dumps(value, default=json_default)
+    return value
+
+class Sink():
+    """Base class: buffers records and writes them in batches."""
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch = []
+        self.rows = 0
+
+    def write(self, records) -> int:
+        """Add records. Returns the number of records added."""
+        count = 0
+        for record in records:
+            self.batch.append(record)
+            count += 1
+            if len(self.batch) >= self.batch_size:
+                self.flush()
+        return count
+
+    def flush(self):
+        """Write the buffered batch."""
+        if self.batch:
+            self.write_batch(self.batch)
+            self.rows += len(self.batch)
+            self.batch = []
+
+    def write_batch(self, batch: list):
+        raise NotImplementedError
+
+    def close(self):
+        """Flush and close the file."""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class NDJSONSink(Sink):
+    """Newline-delimited json, optionally gzipped."""
+
+    def __init__(self, path: str, gzip: bool = False, batch_size: int = DEFAULT_BATCH_SIZE):
+        super().__init__(path, batch_size)
+        self.file = gzip_module.open(path, "wb", compresslevel=6) if gzip else open(path, "wb")
+
+    def write_batch(self, batch: list):
+        lines = b"\n".join(codec.dumpb(record, default=json_default) for record in batch)
+        self.file.write(lines + b"\n")
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+class CSVSink(Sink):
+    """
+    CSV with a header row. Columns are the top-level keys of the first batch (or columns),
+    nested values are written as json. Keys that first appear later are ignored.
+    """
+
+    def __init__(self, path: str, columns: list = None, batch_size: int = DEFAULT_BATCH_SIZE):
+        super().__init__(path, batch_size)
+        self.columns = columns
+        self.file = open(path, "wt", newline="")
+        self.writer = None
+
+    def write_batch(self, batch: list):
+        if self.writer is None:
+            if self.columns is None:
+                self.columns = list(dict.fromkeys(k for record in batch for k in record))
+            self.writer = csv.DictWriter(self.file, self.columns, extrasaction="ignore")
+            self.writer.writeheader()
+
+        # encode the whole batch in memory, then write it in one go
+        out = io.StringIO()
+        writer = csv.DictWriter(out, self.columns, extrasaction="ignore")
+        writer.writerows({k: to_cell(v) for k, v in record.items()} for record in batch)
+        self.file.write(out.getvalue())
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+def to_text(value):
+    """Values of string columns: nested values as json, mixed scalars as str."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, dict | list | RecordBuffer):
+        return to_cell(value)
+    return str(value)
+
+def arrow_type(t):
+    """Map a type inferred by Hypothesis to a pyarrow type. Nested and mixed types become json strings."""
+    import pyarrow as pa
+
+    if isinstance(t, UnionType):
+        args = set(get_args(t)) - {NoneType}
+        if args == {int, float}:
+            return pa.float64()
+        if len(args) == 1:
+            return arrow_type(args.pop())
+        return pa.string()
+
+    return {
+        bool: pa.bool_(),
+        int: pa.int64(),
+        float: pa.float64(),
+        str: pa.string(),
+    }.get(t, pa.string())
+
+def infer_arrow_schema(records: list):
+    """Infer a flat pyarrow schema from records with inference.Hypothesis."""
+    import pyarrow as pa
+    from .inference import Hypothesis
+
+    # only top-level columns are needed, so Hypothesis gets the type of each value
+    # (nested values end up as json strings anyway, and inferring them is slow)
+    hypothesis = Hypothesis()
+    for record in records:
+        hypothesis.update({k: type(v) for k, v in record.items()})
+
+    return pa.schema([
+        (name, arrow_type(t)) for name, t in hypothesis.current.items()
+    ])
+
+class ParquetSink(Sink):
+    """
+    Parquet (columnar), one row group per batch. Needs pyarrow.
+    The schema is inferred from the first batch; keys that first appear later are ignored.
+    """
+
+    def __init__(self, path: str, schema=None, batch_size: int = DEFAULT_BATCH_SIZE):
+        # fail before the run writes anything, pyarrow itself is imported in write_batch
+        if importlib.util.find_spec("pyarrow") is None:
+            raise ImportError("toParquet_ needs pyarrow: pip install pyarrow")
+
+        super().__init__(path, batch_size)
+        self.schema = schema
+        self.writer = None
+
+    def write_batch(self, batch: list):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.schema is None:
+            self.schema = infer_arrow_schema(batch)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+
+        columns = {}
+        for field in self.schema:
+            values = [record.get(field.name) for record in batch]
+            if pa.types.is_string(field.type):
+                values = [to_text(v) for v in values]
+            columns[field.name] = values
+
+        self.writer.write_table(pa.table(columns, schema=self.schema))
+
+    def close(self):
+        super().close()
+        if self.writer is not None:
+            self.writer.close()
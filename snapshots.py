@@ -0,0 +1,115 @@
+"""
+Serialises and writes response cache snapshots (see DataOBJ.save_snapshot) in a background
+thread, so neither encoding nor writing a large response delays the next call.
+
+The writer owns the data it is given: the connector doesn't change response data after the
+call (variables are extracted into copies, see helpers.locate_in_dict), so it can be encoded
+after submit returns. Encoding still holds the GIL, but overlaps with the next requests'
+network time instead of adding to it. The queue is bounded: once max_pending snapshots are
+waiting, submit blocks until the writer catches up. Snapshots are written to a temporary file
+and renamed, so a cache file is either complete or missing. Each connection waits for its own
+snapshots (see Pending) when its run ends.
+"""
+
+import os
+import time
+import queue
+import atexit
+import threading
+
+from . import codec
+from .buffers import json_default
+from .sharding import resolve
+from .instrumentation import RECORDER
+
+# snapshots waiting to be written before submit blocks
+DEFAULT_MAX_PENDING = 8
+
+class Pending():
+    """Snapshots of one connection that are queued or being written."""
+
+    def __init__(self):
+        self.count = 0
+        self.condition = threading.Condition()
+
+    def add(self):
+        with self.condition:
+            self.count += 1
+
+    def done(self):
+        with self.condition:
+            self.count -= 1
+            if self.count == 0:
+                self.condition.notify_all()
+
+    def wait(self):
+        """Wait until all snapshots are written."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.count == 0)
+
+class SnapshotWriter():
+    """A single writer thread fed by a bounded queue of (path, data, pending)."""
+
+    def __init__(self, max_pending: int = DEFAULT_MAX_PENDING):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.written = 0
+        self.failed = 0
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.loop, daemon=True, name="connect-snapshots")
+                self.thread.start()
+
+    def submit(self, path: str, data, pending: Pending = None):
+        """Queue data (bytes, or anything serialise takes) to be written to path. Blocks while the queue is full."""
+        self.start()
+        if pending is not None:
+            pending.add()
+        self.queue.put((path, data, pending))
+
+    def serialise(self, data) -> bytes:
+        """JSON of data, with parse Futures resolved and RecordBuffers as lists."""
+        if isinstance(data, bytes):
+            return data
+        return codec.dumpb(resolve(data), default=json_default)
+
+    def loop(self):
+        while True:
+            path, data, pending = self.queue.get()
+            try:
+                self.write(path, self.serialise(data))
+            except Exception as e:
+                self.failed += 1
+                print("[SNAPSHOT] failed to write", path + ":", repr(e))
+            finally:
+                if pending is not None:
+                    pending.done()
+                self.queue.task_done()
+
+    def write(self, path: str, body: bytes):
+        start = time.perf_counter() if RECORDER.enabled else None
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+        self.written += 1
+
+        if start is not None:
+            RECORDER.emit("cache", "snapshot", start, bytes=len(body), detail=os.path.basename(path))
+
+    def pending(self) -> int:
+        return self.queue.unfinished_tasks
+
+    def flush(self):
+        """Wait until every submitted snapshot (of any connection) is written."""
+        if self.thread is not None:
+            self.queue.join()
+
+SNAPSHOT_WRITER = SnapshotWriter()
+
+# don't lose queued snapshots when the interpreter exits
+atexit.register(SNAPSHOT_WRITER.flush)
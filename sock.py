@@ -1,22 +1,365 @@
-from typing_extensions import Unpack
-from pydantic import BaseModel, ConfigDict
+"""
+Live run monitoring over WebSocket, without external services or dependencies.
+
+Socket serves socket.html on http://localhost:10432/ and streams run statistics on
+ws://localhost:10432/ws: requests in flight, records/sec, bytes/sec, cache hits, retries and
+the current spec path, plus the latest events.
+
+    with Socket():
+        Connection(spec=spec).run()
+
+Events are taken from the instrumentation RECORDER (which the socket enables). The subscriber
+only updates counters; a background thread sends one batched message per interval, however
+many events the run emits, so monitoring doesn't slow the run down.
+
+Browsers let any page open a WebSocket to localhost, so /ws only accepts handshakes addressed
+to a local host name from a local origin (see allowed_origin); checking the Host header too
+keeps out pages that rebind their own DNS name to 127.0.0.1. Frames from clients are capped at
+MAX_FRAME_SIZE.
+"""
+
+import os
+import time
+import base64
+import struct
+import hashlib
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import codec
+from .instrumentation import RECORDER, Event
+
+DEFAULT_HOST = "localhost"
+DEFAULT_PORT = 10432
+
+# seconds between messages
+DEFAULT_INTERVAL = 0.5
+
+# events per message, the rest is only counted
+MAX_EVENTS_PER_MESSAGE = 50
+
+# host names /ws may be reached at, and origins may be on (see Socket(allowed_hosts=...))
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+# largest client frame we read. Clients only send control frames (at most 125 bytes)
+MAX_FRAME_SIZE = 64 * 1024
+
+# RFC 6455
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x8, 0x9, 0xA
+CLOSE_NORMAL, CLOSE_TOO_BIG = 1000, 1009
+
+class FrameTooLarge(ValueError):
+    """A client frame is longer than MAX_FRAME_SIZE."""
+
+def accept_key(key: str) -> str:
+    """Sec-WebSocket-Accept for a Sec-WebSocket-Key."""
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+def hostname(netloc: str | None) -> str | None:
+    """Host name of a Host header ("localhost:10432", "[::1]:10432")."""
+    try:
+        return urlsplit("//" + netloc).hostname if netloc else None
+    except ValueError:
+        return None
+
+def allowed_origin(origin: str | None, host: str | None, hosts: tuple = LOCAL_HOSTS) -> bool:
+    """
+    Whether a handshake with these Origin and Host headers may connect: Host must name one of
+    hosts, and so must Origin. Browsers always send Origin; other clients (scripts, curl)
+    usually don't and only need the Host.
+    """
+    if hostname(host) not in hosts:
+        return False
+    if origin is None:
+        return True
+    try:
+        return urlsplit(origin).hostname in hosts
+    except ValueError:
+        return False
+
+def encode_frame(payload: bytes, opcode: int = OP_TEXT) -> bytes:
+    """A single unmasked (server to client) frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+def read_frame(rfile, max_size: int = MAX_FRAME_SIZE) -> tuple[int, bytes]:
+    """Read a (masked, client to server) frame. Returns (opcode, payload). Raises FrameTooLarge over max_size."""
+    first, second = rfile.read(2)
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", rfile.read(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", rfile.read(8))
+
+    # checked before the payload is read
+    if length > max_size:
+        raise FrameTooLarge(length)
+
+    mask = rfile.read(4) if second & 0x80 else b"\0\0\0\0"
+    payload = bytes(b ^ mask[i % 4] for i, b in enumerate(rfile.read(length)))
+    return first & 0x0F, payload
 
 class Endpoint():
     """
-    Endpoint class
+    Endpoint class: the monitoring page
     """
     html: str = None
-    
+
     def __init__(self, html: str = None) -> None:
         self.html = html or self.get_html()
 
     def get_html(self):
-        with open("./Connect/socket.html", "r") as f:
+        with open(os.path.join(os.path.dirname(__file__), "socket.html"), "r") as f:
             return f.read()
 
+class Client():
+    """A connected WebSocket client."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.lock = threading.Lock()
+        self.open = True
+
+    def send(self, payload: bytes, opcode: int = OP_TEXT):
+        with self.lock:
+            self.wfile.write(encode_frame(payload, opcode))
+            self.wfile.flush()
+
+class SocketHandler(BaseHTTPRequestHandler):
+    """Serves the page on / and upgrades /ws to a WebSocket."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        """Silence default request logging."""
+
+    def do_GET(self):
+        if self.path == "/ws" and self.headers.get("Upgrade", "").lower() == "websocket":
+            return self.websocket()
+
+        body = self.server.endpoint.html.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def websocket(self):
+        if not allowed_origin(self.headers.get("Origin"), self.headers.get("Host"), self.server.monitor.allowed_hosts):
+            self.send_error(403, "Origin or Host not allowed")
+            return
+
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept_key(self.headers["Sec-WebSocket-Key"]))
+        self.end_headers()
+        self.wfile.flush()
+
+        client = Client(self.wfile)
+        self.server.monitor.add(client)
+        try:
+            # messages from the browser are ignored, only control frames are handled
+            while client.open:
+                opcode, payload = read_frame(self.rfile)
+                if opcode == OP_CLOSE:
+                    client.send(payload[:2], OP_CLOSE)
+                    break
+                if opcode == OP_PING:
+                    client.send(payload, OP_PONG)
+        except FrameTooLarge:
+            client.send(struct.pack("!H", CLOSE_TOO_BIG), OP_CLOSE)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.server.monitor.remove(client)
+            self.close_connection = True
+
 class Socket():
     """
-    Socket class
+    Socket class: streams batched run statistics to WebSocket clients.
     """
-    def __init__(self, ) -> None:
-        pass
\ No newline at end of file
+    def __init__(self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        interval: float = DEFAULT_INTERVAL,
+        recorder = RECORDER,
+        allowed_hosts: tuple = LOCAL_HOSTS,
+        ) -> None:
+        self.host = host
+        self.port = port
+
+        # host names the WebSocket may be reached at (and its clients' origins), see allowed_origin
+        self.allowed_hosts = tuple(allowed_hosts)
+        self.interval = interval
+        self.recorder = recorder
+
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.server = None
+        self.threads = []
+        self.was_enabled = None
+        self.reset()
+
+    def reset(self):
+        """Reset the counters."""
+        self.started = time.time()
+        self.totals = {"records": 0, "bytes": 0, "wire_bytes": 0, "requests": 0, "retries": 0}
+        self.cache = {}
+        self.path = None
+        self.events = deque(maxlen=MAX_EVENTS_PER_MESSAGE)
+        self.dropped = 0
+        self.last = (time.perf_counter(), dict(self.totals))
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    def add(self, client: Client):
+        with self.lock:
+            self.clients.add(client)
+
+    def remove(self, client: Client):
+        client.open = False
+        with self.lock:
+            self.clients.discard(client)
+
+    def on_event(self, event: Event):
+        """Recorder subscriber: only updates counters, called from the emitting thread."""
+        with self.lock:
+            totals = self.totals
+
+            # bytes of responses and records parsed from them
+            match event.stage:
+                case "request":
+                    totals["requests"] += 1
+                    totals["bytes"] += event.bytes or 0
+                    totals["wire_bytes"] += event.wire_bytes or 0
+                case "parse":
+                    totals["records"] += event.records or 0
+                case "retry":
+                    totals["retries"] += 1
+                case "evaluate" if event.path:
+                    self.path = event.path
+
+            if event.cache is not None:
+                self.cache[event.cache] = self.cache.get(event.cache, 0) + 1
+
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+
+    def snapshot(self) -> dict:
+        """Current statistics and the events since the last snapshot."""
+        now = time.perf_counter()
+        with self.lock:
+            last_time, last_totals = self.last
+            elapsed = max(now - last_time, 1e-9)
+            totals = dict(self.totals)
+            events = list(self.events)
+            dropped = self.dropped
+            self.events.clear()
+            self.dropped = 0
+            self.last = (now, totals)
+            cache = dict(self.cache)
+            path = self.path
+
+        with self.recorder.lock:
+            in_flight = {k: v for k, v in self.recorder.in_flight.items() if v}
+
+        return {
+            "time": time.time(),
+            "uptime": time.time() - self.started,
+            "in_flight": in_flight,
+            "records_per_sec": (totals["records"] - last_totals["records"]) / elapsed,
+            "bytes_per_sec": (totals["bytes"] - last_totals["bytes"]) / elapsed,
+            "wire_bytes_per_sec": (totals["wire_bytes"] - last_totals["wire_bytes"]) / elapsed,
+            "requests_per_sec": (totals["requests"] - last_totals["requests"]) / elapsed,
+            "totals": totals,
+            "cache": cache,
+            "path": path,
+            "events": [
+                {"stage": e.stage, "name": e.name, "duration": e.duration, "records": e.records, "bytes": e.bytes, "path": e.path}
+                for e in events
+            ],
+            "dropped_events": dropped
+        }
+
+    def broadcast(self, message: dict):
+        """Send message to all clients. Clients that fail are dropped."""
+        payload = codec.dumpb(message, default=str)
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.send(payload)
+            except (OSError, ValueError):
+                # ValueError: the handler closed the connection in the meantime
+                self.remove(client)
+
+    def loop(self):
+        """Send a snapshot every interval, while there are clients."""
+        while not self.stopped.wait(self.interval):
+            if self.clients:
+                self.broadcast(self.snapshot())
+
+    def start(self):
+        """Serve the page and the WebSocket, and subscribe to the recorder."""
+        self.server = ThreadingHTTPServer((self.host, self.port), SocketHandler)
+        self.server.daemon_threads = True
+        self.server.endpoint = Endpoint()
+        self.server.monitor = self
+        self.port = self.server.server_address[1]
+
+        self.was_enabled = self.recorder.enabled
+        self.recorder.subscribe(self.on_event)
+        self.recorder.enable()
+
+        self.stopped.clear()
+        self.threads = [
+            threading.Thread(target=self.server.serve_forever, daemon=True, name="connect-socket"),
+            threading.Thread(target=self.loop, daemon=True, name="connect-socket-broadcast")
+        ]
+        for thread in self.threads:
+            thread.start()
+
+        print("[SOCKET] monitoring on", self.url)
+        return self
+
+    def stop(self):
+        """Send a last snapshot, close all clients and stop serving."""
+        if self.clients:
+            self.broadcast(self.snapshot())
+
+        self.stopped.set()
+        self.recorder.unsubscribe(self.on_event)
+        if not self.was_enabled:
+            self.recorder.disable()
+
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.send(struct.pack("!H", CLOSE_NORMAL), OP_CLOSE)
+            except (OSError, ValueError):
+                pass
+            self.remove(client)
+
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
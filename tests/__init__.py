@@ -0,0 +1 @@
+"""Tests for the Connect module. Run with python -m pytest from the parent directory of the package."""
@@ -0,0 +1,39 @@
+"""
+RecordBuffer: records past the memory limit are spilled to disk and read back in order.
+"""
+
+import os
+
+from ..buffers import RecordBuffer
+
+def make_records(n: int) -> list:
+    return [{"id": i, "name": f"record {i}"} for i in range(n)]
+
+def test_spills_past_the_limit_and_reads_back():
+    records = make_records(1000)
+    buffer = RecordBuffer(limit=4096)
+    buffer.extend(iter(records))
+
+    assert 0 < len(buffer.memory) < 1000
+    assert len(buffer.offsets) == 1000 - len(buffer.memory)
+    assert os.path.exists(buffer.path)
+
+    # iterated more than once, and indexed across the threshold
+    assert list(buffer) == records
+    assert list(buffer) == records
+    assert len(buffer) == 1000
+    threshold = len(buffer.memory)
+    assert [buffer[i] for i in (threshold - 1, threshold, -1)] == [records[threshold - 1], records[threshold], records[-1]]
+
+    # appending after a read keeps the order
+    buffer.append({"id": 1000})
+    assert buffer[-1] == {"id": 1000} and len(buffer.to_list()) == 1001
+
+    path = buffer.path
+    buffer.close()
+    assert not os.path.exists(path)
+
+def test_small_buffers_stay_in_memory():
+    with RecordBuffer(make_records(10)) as buffer:
+        assert buffer.file is None
+        assert buffer.to_list() == make_records(10)
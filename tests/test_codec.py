@@ -0,0 +1,43 @@
+"""
+Every JSON backend gives the same values back as the stdlib json, including the edge cases
+where they differ by default: NaN, big integers and non-string keys.
+"""
+
+import math
+from datetime import date
+
+import pytest
+
+from ..codec import BACKENDS, CODECS, available_backends
+
+@pytest.fixture(params=BACKENDS)
+def codec(request):
+    if request.param not in available_backends():
+        pytest.skip(f"{request.param} isn't installed")
+    return CODECS[request.param]()
+
+def test_nan_and_infinity(codec):
+    text = codec.dumps({"a": math.nan, "b": [math.inf, -math.inf], "c": 1.5})
+    assert codec.loads(text) == {"a": None, "b": [None, None], "c": 1.5}
+
+    # json accepts them on input, so every backend does
+    parsed = codec.loads(b'{"a": NaN, "b": Infinity}')
+    assert math.isnan(parsed["a"]) and parsed["b"] == math.inf
+
+def test_big_integers(codec):
+    big = {"id": 2 ** 70, "negative": -(2 ** 64)}
+    assert codec.dumps(big) == '{"id":1180591620717411303424,"negative":-18446744073709551616}'
+    assert codec.loads(codec.dumpb(big)) == big
+
+def test_non_string_keys(codec):
+    obj = {1: "int", 1.5: "float", None: "none"}
+    assert codec.loads(codec.dumps(obj)) == {"1": "int", "1.5": "float", "null": "none"}
+    # True == 1, so it needs a dict of its own
+    assert codec.loads(codec.dumps({True: "bool", False: "bool"})) == {"true": "bool", "false": "bool"}
+
+def test_default_and_indent(codec):
+    obj = {"day": date(2024, 1, 2), "name": "café"}
+    assert codec.loads(codec.dumps(obj, default=str)) == {"day": "2024-01-02", "name": "café"}
+    assert codec.dumps({"a": [1]}, indent=2) == '{\n  "a": [\n    1\n  ]\n}'
+    with pytest.raises(TypeError):
+        codec.dumps(obj)
@@ -0,0 +1,58 @@
+"""
+Typed rows: cached column layouts are only reused for batches of exactly their shape.
+"""
+
+from types import SimpleNamespace
+
+from ..columns import infer_layout
+from ..connection import Config, Writeables
+from ..schemas import SchemaRegistry, SAMPLE_SIZE
+
+class FakeClient():
+    """Records the rows inserted with client.from_(table).insert(rows).execute()."""
+
+    def __init__(self):
+        self.rows = []
+
+    def from_(self, table):
+        return self
+
+    def insert(self, rows, returning=None):
+        self.rows.extend(rows)
+        return self
+
+    def execute(self):
+        return self
+
+def make_records(n: int) -> list:
+    return [{"id": i, "name": f"item-{i}"} for i in range(n)]
+
+def test_key_outside_the_sample_gets_a_column():
+    registry = SchemaRegistry()
+    first = infer_layout(make_records(40), key=("c", "t"), registry=registry)
+    assert {c.name: c.type for c in first.columns} == {"id": "bigint", "name": "text"}
+
+    # past every record a sample of SAMPLE_SIZE would look at
+    records = make_records(4 * SAMPLE_SIZE)
+    records[-1] = {"id": "abc", "name": "late", "email": "a@b.c"}
+    layout = infer_layout(records, key=("c", "t"), registry=registry)
+
+    assert layout is not first
+    assert {c.name: c.type for c in layout.columns} == {c.name: c.type for c in infer_layout(records).columns}
+    assert {c.name: c.type for c in layout.columns} == {"id": "jsonb", "name": "text", "email": "text"}
+
+def test_supa_rows_keep_late_keys():
+    config = Config(
+        metadata={"connection_id": "test-connection", "run_id": "run"},
+        decoded=SimpleNamespace(sub="user")
+    )
+    writeables = Writeables(config)
+    client = FakeClient()
+
+    writeables.toSupaRows(client, "late_keys", make_records(40), 1000)
+    records = make_records(4 * SAMPLE_SIZE)
+    records[-1] = {"id": 7, "name": "late", "email": "a@b.c"}
+    result = writeables.toSupaRows(client, "late_keys", records, 1000)
+
+    assert result["rows"] == len(records)
+    assert client.rows[-1]["email"] == "a@b.c"
@@ -0,0 +1,121 @@
+"""
+Memoization of callable results (Memo) and of parsed responses (ParseMemo).
+"""
+
+import time
+import threading
+from concurrent.futures import Future
+
+from requests import Response, Session
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from ..buffers import RecordBuffer
+from ..connection import Callables, DataOBJ
+from ..memo import Memo, ParseMemo, MISSING
+
+def make_response(body: bytes, content_type: str) -> Response:
+    res = Response()
+    res._content = body
+    res.status_code = 200
+    res.headers = CaseInsensitiveDict({"Content-Type": content_type})
+    # set by the transport adapter for real responses
+    res.encoding = get_encoding_from_headers(res.headers)
+    return res
+
+def test_concurrent_identical_calls_are_coalesced():
+    memo = Memo()
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(memo.get_or_call("key", call))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["result"] * 4
+    assert memo.stats()["misses"] == 1
+
+def test_memo_ttl_and_lru():
+    memo = Memo(ttl=0.1)
+    memo.get_or_call("key", lambda: 1)
+    assert memo.get_or_call("key", lambda: 2) == 1
+    time.sleep(0.15)
+    assert memo.get_or_call("key", lambda: 3) == 3
+
+    memo = Memo(max_entries=2)
+    for key in ("a", "b"):
+        memo.get_or_call(key, lambda: key)
+    memo.get_or_call("a", lambda: None)
+    memo.get_or_call("c", lambda: "c")
+
+    # b was the least recently used
+    assert memo.get_or_call("a", lambda: None) == "a"
+    assert memo.get_or_call("c", lambda: None) == "c"
+    assert memo.get_or_call("b", lambda: "again") == "again"
+
+def test_memo_key_uses_values():
+    def buffer():
+        records = RecordBuffer()
+        records.extend([{"id": 1}, {"id": 2}])
+        return records
+
+    future = Future()
+    future.set_result([{"id": 1}])
+
+    # equal values in different objects give the same key
+    assert DataOBJ.memo_key("f", {"data": buffer(), "url": "u"}) == DataOBJ.memo_key("f", {"url": "u", "data": buffer()})
+    assert DataOBJ.memo_key("f", {"data": future}) == DataOBJ.memo_key("f", {"data": [{"id": 1}]})
+    assert DataOBJ.memo_key("f", {"data": [1]}) != DataOBJ.memo_key("f", {"data": [2]})
+
+    # objects that aren't json aren't memoized
+    assert DataOBJ.memo_key("f", {"session": Session()}) is None
+
+def test_parse_memo_hits_return_copies():
+    memo = ParseMemo()
+    key = memo.key(b'{"items": [1]}', "application/json")
+    memo.put(key, {"items": [1]}, 14)
+
+    first = memo.get(key)
+    first["items"].append(2)
+    assert memo.get(key) == {"items": [1]}
+    assert memo.stats()["hits"] == 2
+
+def test_parse_memo_evicts_by_bytes():
+    memo = ParseMemo(max_bytes=10)
+    keys = [memo.key(bytes([i]), "text/csv") for i in range(3)]
+    memo.put(keys[0], [0], 4)
+    memo.put(keys[1], [1], 4)
+    memo.get(keys[0])
+    memo.put(keys[2], [2], 4)
+
+    # keys[1] was the least recently used
+    assert memo.get(keys[1]) is MISSING
+    assert memo.get(keys[0]) == [0] and memo.get(keys[2]) == [2]
+    assert memo.stats()["bytes"] == 8 and memo.stats()["evictions"] == 1
+
+    # bodies bigger than the memo aren't kept
+    memo.put(memo.key(b"big", "text/csv"), [], 11)
+    assert memo.stats()["size"] == 2
+
+def test_parse_memo_keys_the_charset():
+    functions = Callables()
+    functions.parse_memo = ParseMemo()
+    body = "name\ncafé\n".encode("utf-8")
+
+    utf8 = functions.parse_doctype(make_response(body, "text/csv; charset=utf-8"))
+    latin1 = functions.parse_doctype(make_response(body, "text/csv; charset=latin-1"))
+
+    assert utf8 == [{"name": "café"}]
+    assert latin1 == [{"name": "cafÃ©"}]
+    assert functions.parse_memo.stats()["misses"] == 2
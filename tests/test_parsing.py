@@ -0,0 +1,41 @@
+"""
+detect_doctype: the response body wins over a wrong Content-Type when it clearly is something else.
+"""
+
+import pytest
+
+from ..parsing import detect_doctype, parse_bytes, NDJSON
+
+JSON, XML, HTML, CSV = "application/json", "application/xml", "application/html", "text/csv"
+
+@pytest.mark.parametrize("content_type, body, fallback, doctype", [
+    # json served as text, or without a Content-Type
+    ("text/plain", b'{"id": 1}', None, JSON),
+    (None, b'\xef\xbb\xbf  [1, 2]', None, JSON),
+    ("application/vnd.api+json; charset=utf-8", b'{"id": 1}', None, JSON),
+    # ndjson served as json, and a single line served as ndjson
+    (JSON, b'{"id": 1}\n{"id": 2}\n', None, NDJSON),
+    ("application/jsonl", b'{"id": 1}', None, NDJSON),
+    # pretty-printed json isn't ndjson
+    (JSON, b'{\n  "id": 1\n}\n', None, JSON),
+    (JSON, b'[{"id": 1},\n{"id": 2}]', None, JSON),
+    # an html error page served as json
+    (JSON, b"<!DOCTYPE html><html><body>502</body></html>", None, HTML),
+    # xml served as json or as text
+    (JSON, b'<?xml version="1.0"?><items/>', None, XML),
+    ("text/plain", b"<items><item>1</item></items>", None, XML),
+    # declared html stays html unless it's json
+    ("text/html", b"<!-- comment --><div>fragment</div>", None, HTML),
+    ("text/html", b'{"error": "not found"}', None, JSON),
+    # csv can start with anything
+    ("text/csv", b'{"a"},b\n1,2\n', None, CSV),
+    # nothing to go on: the Content-Type of the request
+    ("application/octet-stream", b"id,name\n1,a\n", CSV, CSV),
+    (None, b"", JSON, JSON),
+])
+def test_detect_doctype(content_type, body, fallback, doctype):
+    assert detect_doctype(content_type, body, fallback) == doctype
+
+def test_detected_bodies_parse_once():
+    body = b'{"id": 1}\n{"id": 2}\n'
+    assert parse_bytes(body, detect_doctype(JSON, body)) == [{"id": 1}, {"id": 2}]
@@ -0,0 +1,75 @@
+"""
+toPostgres_ against a real database: COPY in both formats and upserts.
+Runs when $DATABASE_URL points at a Postgres instance (and psycopg is installed), e.g.
+
+    DATABASE_URL=postgresql://localhost/connect python -m pytest Connect/tests/test_postgres.py
+"""
+
+import os
+import uuid
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+from ..postgres import PostgresSink, quote_ident
+
+DSN = os.environ.get("DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not DSN, reason="DATABASE_URL is not set")
+
+def make_records(n: int, version: int = 0) -> list:
+    return [
+        {
+            "id": i,
+            "name": f"item-{i}-v{version}",
+            "price": i * 1.5,
+            "tags": ["a", "b"],
+            "meta": {"active": i % 2 == 0},
+            # mixed types, inferred as jsonb
+            "value": "abc" if i % 2 else i,
+        } for i in range(n)
+    ]
+
+@pytest.fixture
+def table():
+    name = f"test_{uuid.uuid4().hex[:8]}"
+    yield name
+    with psycopg.connect(DSN) as connection:
+        connection.execute(f"DROP TABLE IF EXISTS public.{quote_ident(name)}")
+
+def fetch(table: str) -> list:
+    with psycopg.connect(DSN) as connection:
+        return connection.execute(
+            f'SELECT id, name, price, tags, meta__active, value FROM public.{quote_ident(table)} ORDER BY id'
+        ).fetchall()
+
+@pytest.mark.parametrize("format", ["csv", "binary"])
+def test_copy(table, format):
+    with PostgresSink(table, dsn=DSN, format=format, batch_size=7) as sink:
+        sink.write(make_records(20))
+
+    rows = fetch(table)
+    assert len(rows) == 20
+    assert rows[3] == (3, "item-3-v0", 4.5, ["a", "b"], False, "abc")
+    assert rows[4][5] == 4
+
+@pytest.mark.parametrize("format", ["csv", "binary"])
+def test_upsert_twice(table, format):
+    for version in (0, 1):
+        with PostgresSink(table, dsn=DSN, key="id", format=format, batch_size=25) as sink:
+            # duplicate keys within a batch: the last one wins
+            sink.write(make_records(20, version) + make_records(3, version + 10))
+
+    rows = fetch(table)
+    assert len(rows) == 20
+    assert rows[0][1] == "item-0-v11"
+    assert rows[19][1] == "item-19-v1"
+
+def test_new_keys_add_columns(table):
+    with PostgresSink(table, dsn=DSN, key="id", batch_size=2) as sink:
+        sink.write([{"id": 1, "a": 1}, {"id": 2, "a": 2}, {"id": 3, "a": 1.5, "b": "x"}, {"id": 4, "a": "s"}])
+
+    with psycopg.connect(DSN) as connection:
+        rows = connection.execute(f'SELECT id, a, b FROM public.{quote_ident(table)} ORDER BY id').fetchall()
+    assert rows == [(1, 1, None), (2, 2, None), (3, 1.5, "x"), (4, "s", None)]
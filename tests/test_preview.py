@@ -0,0 +1,29 @@
+"""
+preview only renders the first and last items, and doesn't read the spilled records in between.
+"""
+
+from ..buffers import RecordBuffer
+from ..preview import preview, HEAD, TAIL
+
+def test_preview_of_a_spilled_buffer(monkeypatch):
+    buffer = RecordBuffer(({"id": i} for i in range(10000)), limit=256)
+    assert len(buffer.offsets) > HEAD + TAIL
+
+    reads = []
+    read = RecordBuffer.read
+
+    def counted(self, f, offset):
+        reads.append(offset)
+        return read(self, f, offset)
+
+    def iterate(self):
+        raise AssertionError("the whole buffer was read")
+
+    monkeypatch.setattr(RecordBuffer, "read", counted)
+    monkeypatch.setattr(RecordBuffer, "__iter__", iterate)
+
+    text = preview(buffer, indent=None)
+
+    assert text == '[{"id": 0}, {"id": 1}, {"id": 2}, ... 9995 more items, {"id": 9998}, {"id": 9999}]'
+    assert len(reads) <= HEAD + TAIL
+    buffer.close()
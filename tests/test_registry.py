@@ -0,0 +1,26 @@
+"""
+The registry keeps the contract of getfullargspec: positional argument names only, and a
+None return type for functions without a return annotation.
+"""
+
+from ..errors import add_error
+from ..registry import Registry, is_callable_key, function_args
+
+class Functions():
+    def _annotated(self, a, b=1, *args, c=2, **kwargs) -> list:
+        return [a, b, args, c, kwargs]
+
+    @add_error("Error calling function", 472)
+    def _plain(self, url, /, method=None):
+        return url, method
+
+def test_function_args():
+    functions = Functions()
+    assert function_args(functions._annotated) == ("a", "b")
+    assert function_args(functions._plain) == ("url", "method")
+
+def test_return_types():
+    registry = Registry(Functions(), is_callable_key)
+    assert registry.capabilities["_annotated"].return_type is list
+    assert registry.capabilities["_plain"].return_type is None
+    assert registry.to_dict()["_plain"]["return_type"] is None
@@ -0,0 +1,37 @@
+"""
+Record/replay against the local mock server: logs don't contain credentials, and still replay.
+"""
+
+from ..benchmarks.mock_server import MockAPIServer
+from ..connection import Connection
+from ..replay import RecordTransport, ReplayTransport, read_log, redact_headers
+
+def make_spec(base: str) -> dict:
+    return {
+        "_request": {
+            "url": f"{base}/json?n=2&api_key=abc&q=sekret",
+            "method": "GET",
+            "headers": {
+                "Content-Type": "application/json"
+            }
+        }
+    }
+
+def test_recorded_urls_are_redacted_and_replay(tmp_path):
+    path = str(tmp_path / "run.log")
+    with MockAPIServer() as server:
+        Connection(spec=make_spec(server.url), transport=RecordTransport(path), key="sekret").run()
+        base = server.url
+
+    (header, _), = read_log(path)
+    assert header["url"] == f"{base}/json?n=2&api_key=<hidden>&q=<hidden>"
+    assert b"sekret" not in open(path, "rb").read()
+
+    # the server is gone, so this is answered from the log
+    c = Connection(spec=make_spec(base), transport=ReplayTransport(path), key="sekret")
+    c.run()
+    assert c.functions.config._request[0]["data"][1]["name"] == "item-1"
+
+def test_credential_headers_are_dropped():
+    headers = {"Content-Type": "application/json", "Set-Cookie": "session=1", "authorization": "Bearer x"}
+    assert redact_headers(headers) == {"Content-Type": "application/json"}
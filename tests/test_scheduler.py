@@ -0,0 +1,60 @@
+"""
+Scheduler runs against the local mock server: sessions and memos are shared within a tenant only.
+"""
+
+import time
+
+import pytest
+
+from ..benchmarks.mock_server import MockAPIServer
+from ..scheduler import Scheduler, Job
+from ..sessions import SessionPool
+
+def make_spec(base: str) -> dict:
+    return {
+        "_request": {
+            "url": f"{base}/json?n=3",
+            "method": "GET",
+            "headers": {
+                "Content-Type": "application/json"
+            }
+        }
+    }
+
+def run_all(scheduler: Scheduler, jobs: int, timeout: float = 10):
+    """Dispatch due jobs until jobs runs have finished."""
+    deadline = time.monotonic() + timeout
+    while scheduler.completed + scheduler.failed < jobs:
+        assert time.monotonic() < deadline, "jobs didn't finish"
+        scheduler.tick()
+        time.sleep(0.01)
+
+@pytest.fixture
+def server():
+    with MockAPIServer() as server:
+        yield server
+
+def test_pool_keys_sessions_by_tenant():
+    pool = SessionPool()
+    acme = pool.get(None, {"Accept": "application/json"}, tenant="acme")
+    assert pool.get(None, {"Accept": "application/json"}, tenant="acme") is acme
+    assert pool.get(None, {"Accept": "application/json"}, tenant="globex") is not acme
+    assert pool.stats() == {"sessions": 2, "created": 2, "reused": 1}
+    pool.close()
+
+def test_scheduler_shares_sessions_within_a_tenant(server):
+    scheduler = Scheduler(workers=4, cache_ttl=0)
+    for name, tenant in (("a1", "acme"), ("a2", "acme"), ("g1", "globex")):
+        scheduler.add(Job(name, make_spec(server.url), interval=3600, tenant=tenant))
+
+    try:
+        run_all(scheduler, 3)
+    finally:
+        scheduler.stop()
+
+    assert scheduler.failed == 0
+    assert server.hits["/json"] == 3
+
+    # one session per tenant, with the same auth and headers
+    assert scheduler.metrics()["sessions"]["created"] == 2
+    assert set(scheduler.memos) == {"acme", "globex"}
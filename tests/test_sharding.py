@@ -0,0 +1,36 @@
+"""
+Deferred parsing (Connection(parse_workers=...)) raises parse errors like parsing in the caller,
+and its workers aren't forked from the connector.
+"""
+
+import pytest
+
+from ..benchmarks.mock_server import MockAPIServer
+from ..connection import Connection
+from ..errors import APIConnectorError, PARSE_ERROR
+from ..sharding import ParsePool
+
+@pytest.mark.parametrize("parse_workers", [None, 1])
+def test_parse_errors_have_the_same_code(parse_workers):
+    with MockAPIServer() as server:
+        # the echo endpoint returns the invalid xml body
+        spec = {
+            "_request": {
+                "url": [f"{server.url}/echo/1", f"{server.url}/echo/2"],
+                "method": "POST",
+                "data": "<items><item>1</item",
+                "headers": {
+                    "Content-Type": "application/xml"
+                }
+            }
+        }
+        with pytest.raises(APIConnectorError) as info:
+            Connection(spec=spec, parse_workers=parse_workers).run()
+
+    assert info.value.code == 472
+    assert info.value.message == PARSE_ERROR
+
+def test_workers_arent_forked():
+    with ParsePool(workers=1) as pool:
+        assert pool.executor._mp_context.get_start_method() in ("forkserver", "spawn")
+        assert pool.submit(b'{"id": 1}', "application/json").result() == {"id": 1}
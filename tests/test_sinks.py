@@ -0,0 +1,57 @@
+"""
+Local sinks: calls in a run append to the open file, every run writes it afresh,
+and nothing is written outside Connection(output_dir=...).
+"""
+
+import os
+
+import pytest
+
+from ..connection import Connection, Writeables
+from ..errors import APIConnectorError
+from ..sinks import NDJSONSink
+
+@pytest.fixture
+def writeables(tmp_path):
+    writeables = Writeables()
+    writeables.output_dir = str(tmp_path)
+    yield writeables
+    writeables.close_sinks()
+
+def test_runs_truncate_and_calls_append(writeables, tmp_path):
+    for _ in range(2):
+        writeables.toNDJSON_([{"id": 1}, {"id": 2}], "out.ndjson")
+        writeables.toNDJSON_({"id": 3}, "out.ndjson")
+        writeables.close_sinks()
+
+        with open(tmp_path / "out.ndjson") as f:
+            assert f.read().splitlines() == ['{"id":1}', '{"id":2}', '{"id":3}']
+
+def test_reopening_with_other_options_raises(writeables, tmp_path):
+    path = str(tmp_path / "out.ndjson")
+
+    assert writeables.sink(NDJSONSink, path) is writeables.sink(NDJSONSink, path)
+    with pytest.raises(ValueError):
+        writeables.sink(NDJSONSink, path, gzip=True)
+
+@pytest.mark.parametrize("path", ["../out.ndjson", "/tmp/out.ndjson"])
+def test_paths_outside_output_dir_are_refused(writeables, tmp_path, path):
+    with pytest.raises(APIConnectorError):
+        writeables.toCSV_([{"id": 1}], path)
+    assert not os.path.exists(tmp_path.parent / "out.ndjson")
+
+def test_sinks_need_an_output_dir():
+    with pytest.raises(APIConnectorError):
+        Writeables().toNDJSON_([{"id": 1}], "out.ndjson")
+
+def test_spec_cant_choose_the_database(tmp_path):
+    spec = {
+        "toPostgres_": {
+            "data": [{"id": 1}],
+            "table": "contacts",
+            "dsn": "postgresql://elsewhere/db"
+        }
+    }
+    with pytest.raises(APIConnectorError) as info:
+        Connection(spec=spec, dsn="postgresql://localhost/connect").run()
+    assert isinstance(info.value.error, TypeError)
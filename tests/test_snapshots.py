@@ -0,0 +1,49 @@
+"""
+Snapshots are serialised and written by the writer thread: submit only blocks on the queue bound.
+"""
+
+import json
+import time
+import threading
+
+from ..helpers import locate_in_dict
+from ..snapshots import SnapshotWriter, Pending
+
+def test_submit_doesnt_wait_for_serialisation(tmp_path, monkeypatch):
+    writer = SnapshotWriter(max_pending=2)
+    release = threading.Event()
+    serialise = writer.serialise
+
+    def slow(data):
+        # stands in for encoding a large response
+        release.wait(5)
+        return serialise(data)
+
+    monkeypatch.setattr(writer, "serialise", slow)
+    pending = Pending()
+    records = [{"id": i} for i in range(1000)]
+
+    start = time.perf_counter()
+    # one being serialised, two waiting in the queue
+    for i in range(3):
+        writer.submit(str(tmp_path / f"{i}.json"), records, pending)
+    assert time.perf_counter() - start < 0.5
+
+    # the queue is full: the next submit waits for the writer
+    blocked = threading.Thread(target=writer.submit, args=(str(tmp_path / "3.json"), records, pending))
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive()
+
+    release.set()
+    blocked.join(5)
+    pending.wait()
+    for i in range(4):
+        assert json.loads((tmp_path / f"{i}.json").read_text()) == records
+
+def test_extraction_doesnt_change_the_data():
+    data = {"contacts": {"ann": {"age": 1}, "bob": {"age": 2}}}
+    extracted = locate_in_dict(["contacts", "{name}"], data)
+
+    assert extracted == {"names": [{"age": 1, "name": "ann"}, {"age": 2, "name": "bob"}]}
+    assert data == {"contacts": {"ann": {"age": 1}, "bob": {"age": 2}}}
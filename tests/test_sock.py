@@ -0,0 +1,74 @@
+"""
+The monitoring WebSocket: handshakes from other sites (or rebound DNS names) are refused,
+and oversized client frames close the connection.
+"""
+
+import io
+import socket
+import struct
+
+import pytest
+
+from ..sock import Socket, allowed_origin, read_frame, FrameTooLarge, CLOSE_TOO_BIG, OP_CLOSE
+
+@pytest.mark.parametrize("origin, host, allowed", [
+    (None, "localhost:10432", True),
+    ("http://localhost:10432", "localhost:10432", True),
+    ("http://127.0.0.1:3000", "127.0.0.1:10432", True),
+    ("http://[::1]:3000", "[::1]:10432", True),
+    ("https://evil.example", "localhost:10432", False),
+    # DNS rebinding: the attacker's name resolves to 127.0.0.1, Origin and Host match
+    ("http://evil.example:10432", "evil.example:10432", False),
+    (None, "evil.example:10432", False),
+    ("null", "localhost:10432", False),
+    (None, None, False),
+])
+def test_allowed_origin(origin, host, allowed):
+    assert allowed_origin(origin, host) is allowed
+
+def masked_frame(opcode: int, length: int) -> bytes:
+    """Header of a masked client frame with a 64-bit length."""
+    return struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, length) + b"\0\0\0\0"
+
+def test_read_frame_refuses_huge_lengths():
+    with pytest.raises(FrameTooLarge):
+        read_frame(io.BytesIO(masked_frame(0x1, 1 << 62)))
+
+def handshake(port: int, host: str) -> socket.socket:
+    conn = socket.create_connection(("127.0.0.1", port), timeout=5)
+    conn.sendall((
+        "GET /ws HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        "Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+        "Sec-WebSocket-Version: 13\r\n\r\n"
+    ).encode())
+    return conn
+
+def read_response(conn: socket.socket) -> bytes:
+    response = b""
+    while b"\r\n\r\n" not in response:
+        response += conn.recv(1024)
+    return response
+
+def test_oversized_frames_close_with_1009():
+    with Socket(port=0, interval=60) as monitor:
+        refused = handshake(monitor.port, f"evil.example:{monitor.port}")
+        assert read_response(refused).startswith(b"HTTP/1.1 403")
+        refused.close()
+
+        conn = handshake(monitor.port, f"localhost:{monitor.port}")
+        assert read_response(conn).startswith(b"HTTP/1.1 101")
+        conn.sendall(masked_frame(0x1, 1 << 40))
+
+        # the first frame the server sends back may be a stats message; read until the close frame
+        data = b""
+        while True:
+            chunk = conn.recv(4096)
+            assert chunk, "connection closed without a close frame"
+            data += chunk
+            close = bytes([0x80 | OP_CLOSE, 2]) + struct.pack("!H", CLOSE_TOO_BIG)
+            if close in data:
+                break
+        conn.close()
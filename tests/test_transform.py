@@ -0,0 +1,53 @@
+"""
+_transform gets all records of a variable in one call, and transforms them in batches.
+"""
+
+from functools import wraps
+
+import pytest
+
+from ..benchmarks.mock_server import MockAPIServer
+from ..buffers import RecordBuffer
+from ..connection import Connection, Callables
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Types of the records passed to _transform, one per call."""
+    calls = []
+    original = Callables._transform
+
+    # keeps the name, which decides how arguments are bound (see binds_whole)
+    @wraps(original)
+    def spy(self, records, spec, batch_size=1000):
+        calls.append(type(records))
+        return original(self, records, spec, batch_size)
+
+    monkeypatch.setattr(Callables, "_transform", spy)
+    return calls
+
+@pytest.mark.parametrize("buffer_mb, received", [(None, list), (1, RecordBuffer)])
+def test_one_call_for_all_records(calls, buffer_mb, received):
+    with MockAPIServer() as server:
+        spec = {
+            "_request": {
+                "url": [f"{server.url}/ndjson?n=3&page={p}" for p in (1, 2)],
+                "method": "GET",
+                "headers": {
+                    "Content-Type": "application/json"
+                }
+            },
+            "_transform": {
+                "records": "{_request}",
+                "spec": {"key": "name"},
+                "batch_size": 2
+            }
+        }
+        c = Connection(spec=spec, buffer_mb=buffer_mb)
+        c.run()
+
+    assert calls == [received]
+
+    # a list of results per call, or the records themselves in a RecordBuffer (see Connection.collect)
+    res = c.functions.config._transform
+    records = list(res) if isinstance(res, RecordBuffer) else [r for result in res for r in result]
+    assert records == [{"key": f"item-{i}"} for i in (0, 1, 2)] * 2
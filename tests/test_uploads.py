@@ -0,0 +1,59 @@
+"""
+Uploads only read local files from under Connection(upload_dir=...).
+"""
+
+import os
+from contextlib import ExitStack
+
+import pytest
+
+from ..benchmarks.mock_server import MockAPIServer
+from ..connection import Connection
+from ..errors import APIConnectorError
+from ..uploads import request_body
+
+@pytest.fixture
+def upload_dir(tmp_path):
+    root = tmp_path / "uploads"
+    root.mkdir()
+    (root / "records.csv").write_bytes(b"id,name\n1,a\n")
+    (tmp_path / "secret.txt").write_bytes(b"secret")
+    return root
+
+@pytest.mark.parametrize("path", ["../secret.txt", "{tmp}/secret.txt", "link.txt"])
+def test_paths_outside_upload_dir_are_refused(upload_dir, path):
+    os.symlink(upload_dir.parent / "secret.txt", upload_dir / "link.txt")
+    path = path.format(tmp=upload_dir.parent)
+
+    with ExitStack() as stack:
+        with pytest.raises(PermissionError):
+            request_body(stack, upload=path, upload_dir=str(upload_dir))
+        with pytest.raises(PermissionError):
+            request_body(stack, files={"file": path}, upload_dir=str(upload_dir))
+
+def test_files_need_an_upload_dir(upload_dir):
+    with ExitStack() as stack:
+        with pytest.raises(PermissionError):
+            request_body(stack, upload=str(upload_dir / "records.csv"))
+
+def make_spec(base: str, path: str) -> dict:
+    return {
+        "_request": {
+            "url": f"{base}/echo",
+            "method": "POST",
+            "upload": path,
+            "headers": {
+                "Content-Type": "text/csv"
+            }
+        }
+    }
+
+def test_spec_uploads(upload_dir):
+    with MockAPIServer() as server:
+        c = Connection(spec=make_spec(server.url, "records.csv"), upload_dir=str(upload_dir))
+        c.run()
+        assert c.functions.config._request == [[{"id": "1", "name": "a"}]]
+
+        with pytest.raises(APIConnectorError):
+            Connection(spec=make_spec(server.url, "../secret.txt"), upload_dir=str(upload_dir)).run()
+        assert server.hits.get("/echo") == 1
@@ -0,0 +1,92 @@
+"""
+Concurrent writes: results come back in order, every call is attempted, and a spec can set
+the concurrency of one writeable.
+"""
+
+import threading
+import time
+
+import pytest
+
+from ..connection import Connection
+from ..errors import APIConnectorError
+from ..writers import WriteExecutor, split_write_options
+
+def test_results_are_ordered_and_failures_reported():
+    def write(table: str, delay: float):
+        time.sleep(delay)
+        if table == "b":
+            raise ValueError("b is read-only")
+        return table
+
+    def caller(func, **kwargs):
+        return func(**kwargs)
+
+    # later calls finish first
+    calls = [{"table": table, "delay": 0.05 * (3 - i)} for i, table in enumerate("abc")]
+    executor = WriteExecutor(3)
+    results = executor.map(caller, write, calls)
+    executor.shutdown()
+
+    assert [r.index for r in results] == [0, 1, 2]
+    assert [r.value for r in results] == ["a", None, "c"]
+    assert [r.ok for r in results] == [True, False, True]
+    assert isinstance(results[1].error, ValueError)
+
+def test_sink_limit():
+    running, peak = [], []
+    lock = threading.Lock()
+
+    def write(table: str, i: int):
+        with lock:
+            running.append(i)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(i)
+
+    calls = [{"table": "a", "i": i} for i in range(6)]
+    executor = WriteExecutor(4)
+    executor.map(lambda func, **kwargs: func(**kwargs), write, calls, limit=2)
+    executor.shutdown()
+    assert max(peak) == 2
+
+def test_split_write_options():
+    calls = [{"path": "a", "write_workers": 2}, {"path": "b", "write_workers": 2}]
+    assert split_write_options(calls) == ([{"path": "a"}, {"path": "b"}], {"write_workers": 2})
+    assert split_write_options({"path": "a"}) == ({"path": "a"}, {})
+
+    with pytest.raises(ValueError):
+        split_write_options([{"path": "a", "sink_limit": 1}, {"path": "b", "sink_limit": 2}])
+
+def test_spec_sets_the_concurrency(tmp_path, monkeypatch):
+    used = []
+    original = WriteExecutor.map
+
+    def spy(self, caller, func, calls, limit=None):
+        used.append((self.workers, limit))
+        return original(self, caller, func, calls, limit)
+
+    monkeypatch.setattr(WriteExecutor, "map", spy)
+    spec = {
+        "toNDJSON_": {
+            "data": {"id": 1},
+            "path": ["a.ndjson", "b.ndjson"],
+            "write_workers": 2,
+            "sink_limit": 1
+        }
+    }
+    c = Connection(spec=spec, output_dir=str(tmp_path))
+    c.run()
+
+    assert used == [(2, 1)]
+    assert (tmp_path / "a.ndjson").read_text() == (tmp_path / "b.ndjson").read_text() == '{"id":1}\n'
+
+    # 0 writes one call after the other, even with write_workers on the connection
+    spec["toNDJSON_"]["write_workers"] = 0
+    Connection(spec=spec, output_dir=str(tmp_path), write_workers=4).run()
+    assert len(used) == 1
+
+    spec["toNDJSON_"]["unknown"] = 1
+    with pytest.raises(APIConnectorError):
+        Connection(spec=spec, output_dir=str(tmp_path)).run()
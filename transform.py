@@ -1,6 +1,106 @@
-from glom import glom
-from collections import deque
+"""
+Compiled glom transformations.
 
+compile_spec turns a glom spec into a function of one record. Paths ("a.b.c") and dicts, lists
+and tuples of them are compiled to plain python; anything else (T, Coalesce, callables, ...)
+is left to glom. Compiled specs are cached by the hash of the spec, so each spec is only
+compiled once per process.
 
-o = glom([1,2,3], lambda x: deque(x, 10))
-print(o)
\ No newline at end of file
+    for batch in transform_batches(records, {"id": "id", "city": "address.city"}):
+        ...
+
+Records are consumed lazily, so generators and RecordBuffers are never loaded into memory whole.
+"""
+
+import json
+import hashlib
+import threading
+from itertools import islice
+
+# records per batch
+DEFAULT_BATCH_SIZE = 1000
+
+def spec_hash(spec) -> str:
+    """Hash of a spec. Specs that aren't json (T, Coalesce, ...) are hashed by their repr."""
+    try:
+        key = json.dumps(spec, sort_keys=True)
+    except TypeError:
+        key = repr(spec)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def compile_glom(spec):
+    """Leave a spec to glom."""
+    from glom import glom
+    return lambda target: glom(target, spec)
+
+def compile_path(spec: str):
+    """Compile a path of dict keys and list indices. Anything else (attributes, missing keys) is left to glom."""
+    keys = [(key, int(key) if key.isdigit() else None) for key in spec.split(".")]
+    fallback = compile_glom(spec)
+
+    def get(target):
+        value = target
+        for key, index in keys:
+            if type(value) is dict and key in value:
+                value = value[key]
+            elif type(value) is list and index is not None and index < len(value):
+                value = value[index]
+            else:
+                return fallback(target)
+        return value
+    return get
+
+def compile_node(spec) -> tuple:
+    """Compile a spec. Returns (function, native), native is False if the spec is left to glom."""
+    match spec:
+        case str() if "\\" not in spec:
+            return compile_path(spec), True
+
+        case dict() if all(isinstance(k, str) for k in spec):
+            children = {k: compile_node(v) for k, v in spec.items()}
+            if all(native for _, native in children.values()):
+                funcs = [(k, f) for k, (f, _) in children.items()]
+                return (lambda target: {k: f(target) for k, f in funcs}), True
+
+        case [subspec]:
+            f, native = compile_node(subspec)
+            if native:
+                fallback = compile_glom(spec)
+                return (lambda target: [f(t) for t in target] if type(target) is list else fallback(target)), True
+
+        case tuple() if spec:
+            steps = [compile_node(s) for s in spec]
+            if all(native for _, native in steps):
+                funcs = [f for f, _ in steps]
+
+                def chain(target):
+                    for f in funcs:
+                        target = f(target)
+                    return target
+                return chain, True
+
+    return compile_glom(spec), False
+
+# compiled specs by hash
+COMPILED = {}
+COMPILED_LOCK = threading.Lock()
+
+def compile_spec(spec):
+    """Return the compiled function for spec, compiling it on first use."""
+    key = spec_hash(spec)
+    with COMPILED_LOCK:
+        if key not in COMPILED:
+            COMPILED[key] = compile_node(spec)[0]
+        return COMPILED[key]
+
+def transform_batches(records, spec, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Transform an iterable of records, yielding lists of up to batch_size transformed records."""
+    func = compile_spec(spec)
+    records = iter(records)
+    while batch := list(islice(records, batch_size)):
+        yield [func(record) for record in batch]
+
+def transform(records, spec, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Transform an iterable of records lazily, in batches."""
+    for batch in transform_batches(records, spec, batch_size):
+        yield from batch
@@ -0,0 +1,134 @@
+"""
+Request bodies for Callables._request: form data, JSON, NDJSON, multipart and raw file uploads.
+
+Records (lists, RecordBuffers, generators) and files are streamed in chunks with chunked
+transfer encoding, so a large batch goes out in a single request with bounded memory.
+Specs may come from users, so files are only read from under Connection(upload_dir=...).
+
+    with ExitStack() as stack:
+        kwargs = request_body(stack, json=records)
+        session.request("POST", url, **kwargs)
+"""
+
+import os
+import uuid
+from itertools import islice, chain
+from collections.abc import Iterator
+from contextlib import ExitStack
+
+from . import codec
+from .buffers import RecordBuffer, json_default
+from .helpers import confine
+
+# bytes per chunk read from files
+CHUNK_SIZE = 64 * 1024
+
+# records per chunk of a streamed JSON or NDJSON body
+RECORDS_PER_CHUNK = 1000
+
+# arguments of _request that take records: a {variable} with a list of results is sent as
+# one body (see join_results), instead of fanning out into one request per result
+RECORD_ARGUMENTS = ("json", "ndjson")
+
+def is_stream(value) -> bool:
+    """Whether value is a stream of records: a RecordBuffer or an iterator (generator)."""
+    return isinstance(value, RecordBuffer | Iterator)
+
+def join_results(results: list | RecordBuffer):
+    """
+    One body from the results of a callable (one result per call): a single result as is,
+    otherwise the records of all results, with lists concatenated. A RecordBuffer of results
+    gives a new RecordBuffer, so the records aren't loaded into memory.
+    """
+    if len(results) == 1:
+        return results[0]
+    records = chain.from_iterable(r if isinstance(r, list | RecordBuffer) else [r] for r in results)
+    if isinstance(results, RecordBuffer):
+        return RecordBuffer(records, limit=results.limit, spill_dir=results.spill_dir)
+    return list(records)
+
+def as_records(records):
+    """A single record (dict) is a list of one record."""
+    return [records] if isinstance(records, dict) else records
+
+def iter_json_array(records, per_chunk: int = RECORDS_PER_CHUNK):
+    """Encode records as a JSON array, per_chunk records at a time."""
+    records = iter(as_records(records))
+    separator = b"["
+    while chunk := list(islice(records, per_chunk)):
+        yield separator + b",".join(codec.dumpb(r, default=json_default) for r in chunk)
+        separator = b","
+    yield b"]" if separator == b"," else b"[]"
+
+def iter_ndjson(records, per_chunk: int = RECORDS_PER_CHUNK):
+    """Encode records as newline-delimited JSON, per_chunk records at a time."""
+    records = iter(as_records(records))
+    while chunk := list(islice(records, per_chunk)):
+        yield b"".join(codec.dumpb(r, default=json_default) + b"\n" for r in chunk)
+
+def iter_file(f, chunk_size: int = CHUNK_SIZE):
+    """Read an open binary file in chunks."""
+    while chunk := f.read(chunk_size):
+        yield chunk
+
+def iter_multipart(stack: ExitStack, boundary: str, fields: dict, files: dict):
+    """Encode fields and files as multipart/form-data. Files are opened lazily and read in chunks."""
+    for name, value in (fields or {}).items():
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n"
+        ).encode()
+
+    for name, path in files.items():
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"; filename="{os.path.basename(path)}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        yield from iter_file(stack.enter_context(open(path, "rb")))
+        yield b"\r\n"
+
+    yield f"--{boundary}--\r\n".encode()
+
+def request_body(
+        stack: ExitStack,
+        data=None,
+        json=None,
+        ndjson=None,
+        files: dict = None,
+        upload: str = None,
+        upload_dir: str = None,
+        ) -> dict:
+    """
+    Return the body and headers kwargs for session.request. Opened files are closed with stack.
+        data    form fields or a raw body, as before. The form fields of a multipart body with files.
+        json    a JSON body. Records streams are sent as a JSON array in chunks.
+        ndjson  records, sent as newline-delimited JSON in chunks.
+        files   {field: path}: a multipart/form-data body, streamed from the files.
+        upload  path of a file to send as the raw body (streamed, with Content-Length).
+    Paths of files and upload are relative to upload_dir, and refused outside it (see helpers.confine).
+    """
+    if sum(x is not None for x in (json, ndjson, files, upload)) > 1:
+        raise ValueError("use only one of json, ndjson, files or upload")
+
+    # checked before anything is read or sent
+    if files is not None:
+        files = {name: confine(path, upload_dir, "upload_dir") for name, path in files.items()}
+    if upload is not None:
+        upload = confine(upload, upload_dir, "upload_dir")
+
+    if files is not None:
+        boundary = uuid.uuid4().hex
+        return {
+            "data": iter_multipart(stack, boundary, data, files),
+            "headers": {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        }
+    if upload is not None:
+        return {"data": stack.enter_context(open(upload, "rb"))}
+    if ndjson is not None:
+        return {"data": iter_ndjson(ndjson), "headers": {"Content-Type": "application/x-ndjson"}}
+    if json is not None:
+        body = iter_json_array(json) if is_stream(json) else codec.dumpb(json, default=json_default)
+        return {"data": body, "headers": {"Content-Type": "application/json"}}
+    return {"data": data} if data is not None else {}
@@ -0,0 +1,148 @@
+"""
+Concurrent dispatch of list-valued writeables.
+
+A writeable whose arguments flatten to a list (e.g. "toSupa_": {"data": ..., "table": ["a", "b"]})
+is called once per item, one call after the other. With Connection(write_workers=...), the calls
+run in a thread pool, so writing to many tables or partitions takes about the longest round trip
+instead of the sum:
+
+    Connection(spec=spec, write_workers=8).run()
+    Connection(spec=spec, write_workers=WriteExecutor(8, limits={"toSupa_": 2})).run()
+
+Calls are grouped by sink: the writeable and its target (the path or table argument). At most
+limits[name] (default DEFAULT_SINK_LIMIT) calls run against the same sink at a time. Writeables
+that append to an open local sink (files, Postgres COPY) always get one call at a time per sink.
+
+A spec can set both for one writeable with the write options, which aren't passed to it:
+
+    "toSupa_": {"data": "{_request}", "table": ["a", "b"], "write_workers": 4, "sink_limit": 2}
+
+Results come back in the order of the arguments. Every call is attempted; if some fail, the
+failures are reported together afterwards (see Connection.write_all and PartialWriteError).
+"""
+
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .errors import APIConnectorError
+
+DEFAULT_WORKERS = 8
+
+# concurrent calls per sink
+DEFAULT_SINK_LIMIT = 4
+
+# spec keys of a writeable that set how its calls are dispatched: threads (0 runs them one after
+# the other) and concurrent calls per sink. They override Connection(write_workers=...).
+WRITE_OPTIONS = ("write_workers", "sink_limit")
+
+# writeables that share an open sink per target (see Writeables.sink), which isn't thread-safe
+SERIAL_WRITEABLES = ("toNDJSON_", "toCSV_", "toParquet_", "toPostgres_")
+
+@dataclass
+class WriteResult():
+    """Outcome of one writeable call. index is the position of its arguments in the list."""
+    index: int
+    target: str = None
+    value: object = None
+    error: BaseException = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+def sink_key(name: str, kwargs: dict) -> tuple:
+    """(writeable, target) of a call. Calls without a path or table share one sink per writeable."""
+    target = kwargs.get("path", kwargs.get("table"))
+    return (name, None if target is None else str(target))
+
+class WriteExecutor():
+    """Runs writeable calls in a thread pool, with a concurrency limit per sink."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, limits: dict = None):
+        self.workers = workers
+        self.limits = limits or {}
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def get_pool(self) -> ThreadPoolExecutor:
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="connect-write")
+            return self.pool
+
+    def limit(self, name: str, limit: int = None) -> int:
+        """Concurrent calls per sink of writeable name. limit (the sink_limit of a spec) overrides limits."""
+        if name in SERIAL_WRITEABLES:
+            return 1
+        return max(1, limit or self.limits.get(name, DEFAULT_SINK_LIMIT))
+
+    def map(self, caller, func, calls: list, limit: int = None) -> list:
+        """Call caller(func, **kwargs) for every kwargs in calls. Returns a WriteResult per call, in order."""
+        name = func.__name__
+        results = [WriteResult(i, target=sink_key(name, kwargs)[1]) for i, kwargs in enumerate(calls)]
+
+        sinks = {}
+        for i, kwargs in enumerate(calls):
+            sinks.setdefault(sink_key(name, kwargs), deque()).append(i)
+
+        def lane(queue: deque):
+            # a lane works through the calls of one sink; limit lanes run per sink
+            while True:
+                try:
+                    i = queue.popleft()
+                except IndexError:
+                    return
+                start = time.perf_counter()
+                try:
+                    results[i].value = caller(func, **calls[i])
+                except (Exception, APIConnectorError) as e:
+                    results[i].error = e
+                results[i].seconds = time.perf_counter() - start
+
+        pool = self.get_pool()
+        wait([
+            pool.submit(lane, queue)
+            for queue in sinks.values()
+            for _ in range(min(self.limit(name, limit), len(queue)))
+        ])
+        return results
+
+    def shutdown(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+
+def get_write_executor(workers: int | WriteExecutor = None) -> WriteExecutor | None:
+    """Return the executor for Connection(write_workers=...): None (sequential), a number of threads or a WriteExecutor."""
+    match workers:
+        case WriteExecutor():
+            return workers
+        case None | 0:
+            return None
+        case int():
+            return WriteExecutor(workers)
+        case _:
+            raise ValueError(f"write_workers must be a number of threads or a WriteExecutor, got {workers}")
+
+def split_write_options(iargs: dict | list) -> tuple:
+    """
+    Take the write options out of the arguments of a writeable: a dict, or the list of dicts it
+    flattens to. Returns (arguments, options). Options must have one value per writeable.
+    """
+    calls = [iargs] if isinstance(iargs, dict) else iargs
+    first = next(iter(calls), {})
+    if not any(option in first for option in WRITE_OPTIONS):
+        return iargs, {}
+
+    options = {option: first[option] for option in WRITE_OPTIONS if option in first}
+    stripped = []
+    for kwargs in calls:
+        if any(kwargs.get(option) != value for option, value in options.items()):
+            raise ValueError(f"{', '.join(WRITE_OPTIONS)} must be the same for all calls of a writeable")
+        stripped.append({k: v for k, v in kwargs.items() if k not in WRITE_OPTIONS})
+    return (stripped[0] if isinstance(iargs, dict) else stripped), options